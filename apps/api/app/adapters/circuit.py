@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Literal
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """Track consecutive upstream failures and short-circuit calls while open.
+
+    Once ``reset_timeout_s`` has passed, :meth:`allow` lets exactly one probe
+    through; everyone else sees the circuit as open until the probe reports
+    back (or, if it never does, for another ``reset_timeout_s``).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_s = reset_timeout_s
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started_at: float | None = None
+
+    @property
+    def state(self) -> CircuitState:
+        """The current state; reading it never claims the half-open probe."""
+        if self._opened_at is None:
+            return "closed"
+        now = time.monotonic()
+        probing = self._probe_started_at is not None
+        if probing and now - self._probe_started_at < self._reset_timeout_s:
+            return "open"
+        if now - self._opened_at >= self._reset_timeout_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return whether an upstream call may be attempted right now.
+
+        In the half-open state this claims the single probe, so the caller
+        must report the outcome with :meth:`record_success` or
+        :meth:`record_failure`.
+        """
+        state = self.state
+        if state == "half_open":
+            self._probe_started_at = time.monotonic()
+        return state != "open"
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_started_at = None
+        if self._failures >= self._failure_threshold:
+            # Re-arm the timer so a failed half-open probe keeps the circuit open.
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"state": self.state, "failures": self._failures}
@@ -1,4 +1,15 @@
-from .base import LLMAdapter
+from .base import LLMAdapter, LLMBackend, LLMBackendError
+from .google_ai import GoogleAIAdapter
 from .gpt_oss import GPTOssAdapter
+from .openai import OpenAIAdapter
+from .router import LLMRouter
 
-__all__ = ["LLMAdapter", "GPTOssAdapter"]
+__all__ = [
+    "LLMAdapter",
+    "LLMBackend",
+    "LLMBackendError",
+    "GPTOssAdapter",
+    "GoogleAIAdapter",
+    "LLMRouter",
+    "OpenAIAdapter",
+]
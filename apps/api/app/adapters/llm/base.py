@@ -1,8 +1,49 @@
 from __future__ import annotations
 
+import json
 from abc import ABC, abstractmethod
+from typing import Any, TypeVar
 
-from app.schemas import AIPlanRequest, AIPlanResponse
+from pydantic import BaseModel, ValidationError
+
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.llm.output import OutputValidators
+from app.executor import CPUExecutor, run_cpu
+from app.schemas import (
+    AIPlanFragmentRequest,
+    AIPlanFragmentResponse,
+    AIPlanRequest,
+    AIPlanResponse,
+    Plan,
+    PlanDay,
+    PlanSegment,
+    PlaceItem,
+)
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+PLAN_SYSTEM_PROMPT = (
+    "You plan scenic road trips in Japan. Reply with a single JSON object of the form "
+    '{"plan": {"origin": str, "destination": str, "route_label": str, "days": '
+    '[{"date": "YYYY-MM-DD", "summary": str, "segments": [{"start_time": "HH:MM", '
+    '"end_time": "HH:MM", "title": str, "description": str, "travel_mode": '
+    '"drive" | "walk" | "stop", "poi": {"id": str, "name": str, "lat": float, '
+    '"lng": float} | null}]}]}} and nothing else. Write titles and descriptions in Japanese.'
+)
+
+FRAGMENT_SYSTEM_PROMPT = (
+    "You revise part of one day of a road-trip plan in Japan. The request lists the "
+    "segments before and after the part being revised (keep them as they are), the "
+    "current segments, what changed, and measured drive times between stops; use "
+    "those drive times. Fit the new segments between the end of 'before' and the "
+    "start of 'after' where possible. Reply with a single JSON object "
+    '{"segments": [...], "summary": str | null} whose segments use the same shape as '
+    "the input segments, and nothing else. Write titles and descriptions in Japanese."
+)
+
+
+class LLMBackendError(RuntimeError):
+    """A backend could not produce a valid plan; another backend may be tried."""
 
 
 class LLMAdapter(ABC):
@@ -12,3 +53,133 @@ class LLMAdapter(ABC):
     async def generate_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
         """Generate an itinerary response."""
         raise NotImplementedError
+
+    async def generate_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        """Regenerate part of a day; adapters without support keep the edited segments."""
+        return fallback_fragment(payload)
+
+
+class LLMBackend(LLMAdapter):
+    """A single inference endpoint.
+
+    :meth:`request_plan` raises :class:`LLMBackendError` so a router can fail
+    over; used on its own, :meth:`generate_plan` degrades to the sample plan.
+    """
+
+    name: str
+    circuit: CircuitBreaker
+    # Compiled shared-schema validators; plain pydantic validation without them.
+    output: OutputValidators | None = None
+    # Ask the server to decode against the output schema.
+    constrained: bool = False
+    _executor: CPUExecutor | None = None
+
+    @abstractmethod
+    async def request_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+        """Call the upstream, raising :class:`LLMBackendError` on any failure."""
+
+    async def request_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        """Like :meth:`request_plan`, for partial regeneration."""
+        raise LLMBackendError(f"{self.name}: partial regeneration is not supported")
+
+    def output_schema(self, model: type[BaseModel]) -> dict[str, Any] | None:
+        """JSON Schema to send for constrained decoding, if enabled."""
+        if not self.constrained or self.output is None:
+            return None
+        return self.output.for_model(model).json_schema()
+
+    async def parse_output(self, content: bytes | str, model: type[ResponseT]) -> ResponseT:
+        """Validate (and if needed repair) raw model output off the event loop."""
+        try:
+            if self.output is None:
+                return await run_cpu(
+                    self._executor,
+                    model.model_validate_json,
+                    content,
+                    size=len(content),
+                    label="llm_validate",
+                )
+            return await run_cpu(
+                self._executor,
+                self.output.for_model(model).parse,
+                content,
+                size=len(content),
+                label="llm_validate",
+                picklable=False,
+            )
+        except (ValidationError, ValueError) as exc:
+            raise LLMBackendError(f"{self.name}: invalid plan output: {exc}") from exc
+
+    async def generate_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+        if not self.circuit.allow():
+            return fallback_plan(payload)
+        try:
+            return await self.request_plan(payload)
+        except LLMBackendError:
+            # TODO: surface an explicit error response once GPT-OSS integration is production ready.
+            return fallback_plan(payload)
+
+    async def generate_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        if not self.circuit.allow():
+            return fallback_fragment(payload)
+        try:
+            return await self.request_fragment(payload)
+        except LLMBackendError:
+            return fallback_fragment(payload)
+
+
+def json_schema_format(schema: dict[str, Any]) -> dict[str, Any]:
+    """OpenAI-style ``response_format`` asking for output matching ``schema``."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.get("title", "output"), "schema": schema},
+    }
+
+
+def plan_user_prompt(payload: BaseModel) -> str:
+    """Request details for chat-style providers, as compact JSON."""
+    return json.dumps(payload.model_dump(mode="json", exclude_none=True), ensure_ascii=False)
+
+
+def fallback_fragment(payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+    """Keep the mechanically edited segments when no backend can revise them."""
+    return AIPlanFragmentResponse(segments=payload.current, summary=payload.day_summary)
+
+
+def fallback_plan(payload: AIPlanRequest) -> AIPlanResponse:
+    """Canned itinerary returned when no backend can answer."""
+    scenic_stop = PlaceItem(
+        id="p1",
+        name="長崎鼻灯台",
+        lat=31.238,
+        lng=130.501,
+        summary="開聞岳と東シナ海を望む絶景ポイント",
+    )
+    day_plan = PlanDay(
+        date=payload.date or "2024-01-01",
+        summary="海沿いドライブと絶景巡り",
+        segments=[
+            PlanSegment(
+                start_time="09:00",
+                end_time="10:30",
+                title="鹿児島中央駅を出発",
+                description="レンタカーを借りて枕崎へ向かうドライブ開始。",
+                travel_mode="drive",
+            ),
+            PlanSegment(
+                start_time="11:00",
+                end_time="12:30",
+                title="長崎鼻灯台でフォトストップ",
+                description="展望台からの眺めを楽しみ、カフェで休憩。",
+                poi=scenic_stop,
+                travel_mode="stop",
+            ),
+        ],
+    )
+    plan = Plan(
+        origin=payload.origin,
+        destination=payload.destination,
+        route_label="海沿い",
+        days=[day_plan],
+    )
+    return AIPlanResponse(plan=plan)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+from pydantic import BaseModel
+
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.llm.base import (
+    FRAGMENT_SYSTEM_PROMPT,
+    PLAN_SYSTEM_PROMPT,
+    LLMBackend,
+    LLMBackendError,
+    ResponseT,
+    plan_user_prompt,
+)
+from app.adapters.llm.output import OutputValidators
+from app.executor import CPUExecutor
+from app.schemas import AIPlanFragmentRequest, AIPlanFragmentResponse, AIPlanRequest, AIPlanResponse
+
+
+class GoogleAIAdapter(LLMBackend):
+    """Adapter for the Gemini ``generateContent`` API."""
+
+    _BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        client: httpx.AsyncClient,
+        model: str = "gemini-1.5-flash",
+        base_url: str | None = None,
+        circuit: CircuitBreaker | None = None,
+        executor: CPUExecutor | None = None,
+        output: OutputValidators | None = None,
+        constrained: bool = False,
+        name: str = "google_ai",
+    ) -> None:
+        self._api_key = api_key
+        self._client = client
+        self._model = model
+        self._base_url = (base_url or self._BASE_URL).rstrip("/")
+        self.name = name
+        self.circuit = circuit or CircuitBreaker(name)
+        self._executor = executor
+        self.output = output
+        self.constrained = constrained
+
+    async def request_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+        """Ask Gemini for a plan with a JSON response MIME type."""
+        return await self._generate(PLAN_SYSTEM_PROMPT, payload, AIPlanResponse)
+
+    async def request_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        """Ask Gemini to revise part of a day."""
+        return await self._generate(FRAGMENT_SYSTEM_PROMPT, payload, AIPlanFragmentResponse)
+
+    async def _generate(
+        self, system_prompt: str, payload: BaseModel, model: type[ResponseT]
+    ) -> ResponseT:
+        if not self._api_key:
+            raise LLMBackendError(f"{self.name}: no API key configured")
+
+        generation_config: dict[str, Any] = {"responseMimeType": "application/json"}
+        schema = self.output_schema(model)
+        if schema is not None:
+            generation_config["responseJsonSchema"] = schema
+        request_body: dict[str, Any] = {
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"role": "user", "parts": [{"text": plan_user_prompt(payload)}]}],
+            "generationConfig": generation_config,
+        }
+        headers = {"x-goog-api-key": self._api_key}
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/models/{self._model}:generateContent",
+                json=request_body,
+                headers=headers,
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            self.circuit.record_failure()
+            raise LLMBackendError(f"{self.name}: {exc!r}") from exc
+        self.circuit.record_success()
+
+        try:
+            content = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            raise LLMBackendError(f"{self.name}: unexpected response shape") from exc
+        return await self.parse_output(content, model)
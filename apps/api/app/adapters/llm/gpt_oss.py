@@ -3,13 +3,21 @@ from __future__ import annotations
 from typing import Any
 
 import httpx
-from pydantic import ValidationError
+from pydantic import BaseModel
 
-from app.adapters.llm.base import LLMAdapter
-from app.schemas import AIPlanRequest, AIPlanResponse, Plan, PlanDay, PlanSegment, PlaceItem
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.llm.base import (
+    LLMBackend,
+    LLMBackendError,
+    ResponseT,
+    json_schema_format,
+)
+from app.adapters.llm.output import OutputValidators
+from app.executor import CPUExecutor
+from app.schemas import AIPlanFragmentRequest, AIPlanFragmentResponse, AIPlanRequest, AIPlanResponse
 
 
-class GPTOssAdapter(LLMAdapter):
+class GPTOssAdapter(LLMBackend):
     """Adapter talking to a self-hosted GPT-OSS endpoint."""
 
     def __init__(
@@ -18,65 +26,50 @@ class GPTOssAdapter(LLMAdapter):
         base_url: str,
         api_key: str | None,
         client: httpx.AsyncClient,
+        circuit: CircuitBreaker | None = None,
+        executor: CPUExecutor | None = None,
+        output: OutputValidators | None = None,
+        constrained: bool = False,
+        name: str = "gpt_oss",
     ) -> None:
         self._base_url = base_url.rstrip("/")
         self._api_key = api_key
         self._client = client
+        self.name = name
+        self.circuit = circuit or CircuitBreaker(name)
+        self._executor = executor
+        self.output = output
+        self.constrained = constrained
 
-    async def generate_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+    async def request_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
         """Call GPT-OSS backend to produce a plan."""
+        return await self._call("/v1/plan", payload, AIPlanResponse)
+
+    async def request_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        """Call GPT-OSS backend to revise part of a day."""
+        return await self._call("/v1/plan/fragment", payload, AIPlanFragmentResponse)
+
+    async def _call(self, path: str, payload: BaseModel, model: type[ResponseT]) -> ResponseT:
         if not self._base_url:
-            return self._fallback(payload)
+            raise LLMBackendError(f"{self.name}: no base URL configured")
 
-        url = f"{self._base_url}/v1/plan"
+        url = f"{self._base_url}{path}"
         headers = {"Content-Type": "application/json"}
         if self._api_key:
             headers["Authorization"] = f"Bearer {self._api_key}"
 
         request_body: dict[str, Any] = payload.model_dump(mode="json")
+        schema = self.output_schema(model)
+        if schema is not None:
+            # vLLM and llama.cpp servers compile this into a decoding grammar.
+            request_body["response_format"] = json_schema_format(schema)
 
         try:
             response = await self._client.post(url, json=request_body, headers=headers)
             response.raise_for_status()
-            data = response.json()
-            return AIPlanResponse.model_validate(data)
-        except (httpx.HTTPError, ValidationError, ValueError):
-            # TODO: surface an explicit error response once GPT-OSS integration is production ready.
-            return self._fallback(payload)
+        except httpx.HTTPError as exc:
+            self.circuit.record_failure()
+            raise LLMBackendError(f"{self.name}: {exc!r}") from exc
+        self.circuit.record_success()
 
-    def _fallback(self, payload: AIPlanRequest) -> AIPlanResponse:
-        scenic_stop = PlaceItem(
-            id="p1",
-            name="長崎鼻灯台",
-            lat=31.238,
-            lng=130.501,
-            summary="開聞岳と東シナ海を望む絶景ポイント",
-        )
-        day_plan = PlanDay(
-            date=payload.date or "2024-01-01",
-            summary="海沿いドライブと絶景巡り",
-            segments=[
-                PlanSegment(
-                    start_time="09:00",
-                    end_time="10:30",
-                    title="鹿児島中央駅を出発",
-                    description="レンタカーを借りて枕崎へ向かうドライブ開始。",
-                    travel_mode="drive",
-                ),
-                PlanSegment(
-                    start_time="11:00",
-                    end_time="12:30",
-                    title="長崎鼻灯台でフォトストップ",
-                    description="展望台からの眺めを楽しみ、カフェで休憩。",
-                    poi=scenic_stop,
-                    travel_mode="stop",
-                ),
-            ],
-        )
-        plan = Plan(
-            origin=payload.origin,
-            destination=payload.destination,
-            route_label="海沿い",
-            days=[day_plan],
-        )
-        return AIPlanResponse(plan=plan)
+        return await self.parse_output(response.content, model)
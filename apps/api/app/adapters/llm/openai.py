@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+from pydantic import BaseModel
+
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.llm.base import (
+    FRAGMENT_SYSTEM_PROMPT,
+    PLAN_SYSTEM_PROMPT,
+    LLMBackend,
+    LLMBackendError,
+    ResponseT,
+    json_schema_format,
+    plan_user_prompt,
+)
+from app.adapters.llm.output import OutputValidators
+from app.executor import CPUExecutor
+from app.schemas import AIPlanFragmentRequest, AIPlanFragmentResponse, AIPlanRequest, AIPlanResponse
+
+
+class OpenAIAdapter(LLMBackend):
+    """Adapter for OpenAI-compatible Chat Completions endpoints.
+
+    ``base_url`` also accepts any compatible server (vLLM, a local mock).
+    """
+
+    _BASE_URL = "https://api.openai.com/v1"
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        client: httpx.AsyncClient,
+        model: str = "gpt-4o-mini",
+        base_url: str | None = None,
+        circuit: CircuitBreaker | None = None,
+        executor: CPUExecutor | None = None,
+        output: OutputValidators | None = None,
+        constrained: bool = False,
+        name: str = "openai",
+    ) -> None:
+        self._api_key = api_key
+        self._client = client
+        self._model = model
+        self._base_url = (base_url or self._BASE_URL).rstrip("/")
+        self.name = name
+        self.circuit = circuit or CircuitBreaker(name)
+        self._executor = executor
+        self.output = output
+        self.constrained = constrained
+
+    async def request_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+        """Ask the chat model for a plan in JSON mode."""
+        return await self._complete(PLAN_SYSTEM_PROMPT, payload, AIPlanResponse)
+
+    async def request_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        """Ask the chat model to revise part of a day."""
+        return await self._complete(FRAGMENT_SYSTEM_PROMPT, payload, AIPlanFragmentResponse)
+
+    async def _complete(
+        self, system_prompt: str, payload: BaseModel, model: type[ResponseT]
+    ) -> ResponseT:
+        if not self._api_key:
+            raise LLMBackendError(f"{self.name}: no API key configured")
+
+        schema = self.output_schema(model)
+        response_format = json_schema_format(schema) if schema is not None else {"type": "json_object"}
+        request_body: dict[str, Any] = {
+            "model": self._model,
+            "response_format": response_format,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": plan_user_prompt(payload)},
+            ],
+        }
+        headers = {"Authorization": f"Bearer {self._api_key}"}
+
+        try:
+            response = await self._client.post(
+                f"{self._base_url}/chat/completions", json=request_body, headers=headers
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            self.circuit.record_failure()
+            raise LLMBackendError(f"{self.name}: {exc!r}") from exc
+        self.circuit.record_success()
+
+        try:
+            content = response.json()["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            raise LLMBackendError(f"{self.name}: unexpected response shape") from exc
+        return await self.parse_output(content, model)
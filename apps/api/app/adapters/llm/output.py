@@ -0,0 +1,464 @@
+"""Validation and cheap repair of LLM output against the shared JSON schemas.
+
+``packages/shared/schemas`` is the contract the frontend relies on. Each
+schema is compiled once into a tree of :class:`_Node` objects with ``$ref``
+resolved, enums turned into sets and required keys into tuples, so checking a
+response is a single walk. Output that fails is repaired where the fix is
+mechanical (truncated JSON, ``9時`` instead of ``09:00``, unknown fields,
+``null`` for optional fields) instead of throwing the inference away.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Generic, TypeVar
+from uuid import UUID
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+from app.schemas import AIPlanFragmentResponse, AIPlanResponse
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+PLAN_OUTPUT_SCHEMA = "ai_plan_output.schema.json"
+
+# The fragment response has no file of its own; its segments share the plan's definition.
+FRAGMENT_OUTPUT_SCHEMA: dict[str, Any] = {
+    "title": "AIPlanFragmentOutput",
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["segments"],
+    "properties": {
+        "segments": {
+            "type": "array",
+            "items": {"$ref": "./plan.schema.json#/$defs/PlanSegment"},
+        },
+        "summary": {"type": ["string", "null"]},
+    },
+}
+
+_MAX_REPORTED_ERRORS = 5
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+_ANNOTATIONS = {"$schema", "$id", "$defs", "definitions", "title", "description", "$comment"}
+
+_TIME_RE = re.compile(r"^(\d{1,2})(?:[:.時](\d{1,2})?分?)?(?::(\d{2}))?$")
+_DATE_RE = re.compile(r"^(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})日?(?:[T ].*)?$")
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+class OutputError(ValueError):
+    """LLM output that does not satisfy the schema even after repair."""
+
+    def __init__(self, schema: str, errors: list[str]) -> None:
+        self.errors = errors
+        shown = "; ".join(errors[:_MAX_REPORTED_ERRORS])
+        more = f" (+{len(errors) - _MAX_REPORTED_ERRORS} more)" if len(errors) > _MAX_REPORTED_ERRORS else ""
+        super().__init__(f"{schema}: {shown}{more}")
+
+
+def default_schema_dir() -> Path:
+    """The image's bundled ``/app/schemas``, else ``packages/shared/schemas`` in a checkout."""
+    # apps/api/Dockerfile copies the schemas next to the ``app`` package.
+    bundled = Path(__file__).resolve().parents[3] / "schemas"
+    if bundled.is_dir():
+        return bundled
+    for parent in Path(__file__).resolve().parents:
+        candidate = parent / "packages" / "shared" / "schemas"
+        if candidate.is_dir():
+            return candidate
+    raise FileNotFoundError("packages/shared/schemas not found; set SHARED_SCHEMA_DIR")
+
+
+def normalize_time(value: str) -> str:
+    """``9:00``, ``09:00:00``, ``９時３０分`` -> ``HH:MM``; anything else is returned as is."""
+    match = _TIME_RE.match(unicodedata.normalize("NFKC", value).strip())
+    if not match:
+        return value
+    hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+    if hours > 24 or minutes > 59:
+        return value
+    return f"{hours:02d}:{minutes:02d}"
+
+
+def normalize_date(value: str) -> str:
+    """``2024/5/1``, ``2024年5月1日``, ``2024-05-01T09:00`` -> ``YYYY-MM-DD``."""
+    match = _DATE_RE.match(unicodedata.normalize("NFKC", value).strip())
+    if not match:
+        return value
+    try:
+        return date(*(int(part) for part in match.groups())).isoformat()
+    except ValueError:
+        return value
+
+
+# Properties the plan schema leaves as free strings but the app treats as times.
+_FIELD_NORMALIZERS: dict[str, Callable[[str], str]] = {
+    "start_time": normalize_time,
+    "end_time": normalize_time,
+}
+_FORMAT_NORMALIZERS: dict[str, Callable[[str], str]] = {"date": normalize_date}
+
+
+def _is_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return len(value) == 10
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+_FORMAT_CHECKS: dict[str, Callable[[str], bool]] = {"date": _is_date, "uuid": _is_uuid}
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    for name, kind in _JSON_TYPES.items():
+        if isinstance(value, kind):
+            return name
+    return type(value).__name__
+
+
+class _Node:
+    """One compiled schema; ``check`` reports problems, ``repair`` fixes what it can."""
+
+    __slots__ = (
+        "types",
+        "enum",
+        "min_length",
+        "format",
+        "normalizer",
+        "properties",
+        "required",
+        "additional",
+        "items",
+    )
+
+    def __init__(self) -> None:
+        self.types: frozenset[str] | None = None
+        self.enum: frozenset[Any] | None = None
+        self.min_length: int | None = None
+        self.format: str | None = None
+        self.normalizer: Callable[[str], str] | None = None
+        self.properties: dict[str, _Node] = {}
+        self.required: tuple[str, ...] = ()
+        self.additional = True
+        self.items: _Node | None = None
+
+    def _type_ok(self, value: Any) -> bool:
+        if self.types is None:
+            return True
+        name = _type_name(value)
+        return name in self.types or (name == "integer" and "number" in self.types)
+
+    def check(self, value: Any, path: str, errors: list[str]) -> None:
+        if not self._type_ok(value):
+            errors.append(f"{path}: expected {'|'.join(sorted(self.types or ()))}, got {_type_name(value)}")
+            return
+        if self.enum is not None and (isinstance(value, (dict, list)) or value not in self.enum):
+            errors.append(f"{path}: {value!r} is not one of {sorted(map(str, self.enum))}")
+        if isinstance(value, str):
+            if self.min_length is not None and len(value) < self.min_length:
+                errors.append(f"{path}: shorter than {self.min_length}")
+            check = _FORMAT_CHECKS.get(self.format or "")
+            if check is not None and not check(value):
+                errors.append(f"{path}: not a valid {self.format}")
+            if self.normalizer is not None and self.normalizer(value) != value:
+                errors.append(f"{path}: {value!r} is not normalized")
+        elif isinstance(value, dict):
+            for key in self.required:
+                if key not in value:
+                    errors.append(f"{path}: missing {key!r}")
+            for key, item in value.items():
+                node = self.properties.get(key)
+                if node is not None:
+                    node.check(item, f"{path}.{key}", errors)
+                elif not self.additional:
+                    errors.append(f"{path}: unexpected {key!r}")
+        elif isinstance(value, list) and self.items is not None:
+            for index, item in enumerate(value):
+                self.items.check(item, f"{path}[{index}]", errors)
+
+    def repair(self, value: Any, truncated: bool) -> Any:
+        if isinstance(value, str):
+            if self.normalizer is not None:
+                value = self.normalizer(value)
+            if self.enum is not None and value not in self.enum:
+                folded = value.strip().lower()
+                value = folded if folded in self.enum else value
+            if self.types is not None and "string" not in self.types:
+                if self.types & {"number", "integer"}:
+                    try:
+                        return float(value) if "number" in self.types else int(value)
+                    except ValueError:
+                        return value
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if self.types is not None and "string" in self.types and not self._type_ok(value):
+                return str(value)
+            return value
+        if isinstance(value, dict):
+            repaired: dict[str, Any] = {}
+            for key, item in value.items():
+                node = self.properties.get(key)
+                if node is None:
+                    if self.additional:
+                        repaired[key] = item
+                    continue
+                item = node.repair(item, truncated)
+                if key not in self.required:
+                    # An optional field that is still wrong (a POI without
+                    # coordinates, ``null``) costs less to lose than the plan.
+                    errors: list[str] = []
+                    node.check(item, "", errors)
+                    if errors:
+                        continue
+                repaired[key] = item
+            return repaired
+        if isinstance(value, list) and self.items is not None:
+            items = [self.items.repair(item, truncated) for item in value]
+            if truncated and items:
+                # The cut-off tail of a truncated response is usually half an object.
+                tail_errors: list[str] = []
+                self.items.check(items[-1], "", tail_errors)
+                if tail_errors:
+                    items.pop()
+            return items
+        return value
+
+
+class _SchemaLoader:
+    """Reads schema files from one directory and resolves ``$ref`` pointers."""
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._documents: dict[str, dict[str, Any]] = {}
+
+    def load(self, name: str) -> dict[str, Any]:
+        if name not in self._documents:
+            self._documents[name] = json.loads((self._directory / name).read_text(encoding="utf-8"))
+        return self._documents[name]
+
+    def resolve(self, ref: str, document: str) -> tuple[dict[str, Any], str]:
+        target, _, pointer = ref.partition("#")
+        name = Path(target).name if target else document
+        schema: Any = self.load(name)
+        for part in filter(None, pointer.split("/")):
+            schema = schema[part.replace("~1", "/").replace("~0", "~")]
+        return schema, name
+
+
+def _compile(schema: dict[str, Any], loader: _SchemaLoader, document: str, field: str | None) -> _Node:
+    if "$ref" in schema:
+        target, target_document = loader.resolve(schema["$ref"], document)
+        return _compile(target, loader, target_document, field)
+
+    node = _Node()
+    for keyword, value in schema.items():
+        if keyword in _ANNOTATIONS:
+            continue
+        if keyword == "type":
+            node.types = frozenset([value] if isinstance(value, str) else value)
+        elif keyword == "enum":
+            node.enum = frozenset(value)
+        elif keyword == "minLength":
+            node.min_length = value
+        elif keyword == "format":
+            node.format = value
+        elif keyword == "required":
+            node.required = tuple(value)
+        elif keyword == "additionalProperties":
+            if not isinstance(value, bool):
+                raise ValueError("only boolean additionalProperties is supported")
+            node.additional = value
+        elif keyword == "properties":
+            node.properties = {
+                name: _compile(subschema, loader, document, name) for name, subschema in value.items()
+            }
+        elif keyword == "items":
+            node.items = _compile(value, loader, document, None)
+        else:
+            raise ValueError(f"unsupported JSON Schema keyword {keyword!r}")
+    node.normalizer = _FIELD_NORMALIZERS.get(field or "") or _FORMAT_NORMALIZERS.get(node.format or "")
+    return node
+
+
+def _inline(schema: Any, loader: _SchemaLoader, document: str) -> Any:
+    """``schema`` with every ``$ref`` expanded, for providers that reject references."""
+    if isinstance(schema, list):
+        return [_inline(item, loader, document) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    if "$ref" in schema:
+        target, target_document = loader.resolve(schema["$ref"], document)
+        return _inline(target, loader, target_document)
+    return {
+        key: _inline(value, loader, document)
+        for key, value in schema.items()
+        if key not in ("$schema", "$defs", "definitions")
+    }
+
+
+def complete_json(text: str) -> str:
+    """Close the strings, arrays and objects left open by a truncated document.
+
+    If the last value itself was cut (``"lat": 31.`` or a key without its
+    value), the document is cut back to the last complete member first.
+    """
+    stack: list[str] = []
+    in_string = escaped = False
+    safe_end, safe_stack = 0, ""
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            safe_end, safe_stack = index + 1, "".join(reversed(stack))
+        elif char == ",":
+            safe_end, safe_stack = index, "".join(reversed(stack))
+
+    tail = text
+    if in_string:
+        tail = (tail[:-1] if escaped else tail) + '"'
+    candidate = tail.rstrip().rstrip(",") + "".join(reversed(stack))
+    try:
+        json.loads(candidate)
+        return candidate
+    except ValueError:
+        return text[:safe_end] + safe_stack
+
+
+def _extract_json(text: str) -> str:
+    """Drop Markdown fences and any prose before the first ``{``."""
+    text = _FENCE_RE.sub("", text.strip())
+    start = text.find("{")
+    return text[start:] if start > 0 else text
+
+
+class OutputValidator(Generic[ModelT]):
+    """Parses one response model from raw LLM output via a compiled schema."""
+
+    def __init__(
+        self,
+        schema: dict[str, Any],
+        model: type[ModelT],
+        loader: _SchemaLoader,
+        *,
+        document: str,
+    ) -> None:
+        self.name = schema.get("title", model.__name__)
+        self.model = model
+        self._root = _compile(schema, loader, document, None)
+        self._json_schema = _inline(schema, loader, document)
+        self.valid = 0
+        self.repaired = 0
+        self.rejected = 0
+
+    def json_schema(self) -> dict[str, Any]:
+        """The schema with references inlined, for constrained decoding requests."""
+        return self._json_schema
+
+    def errors(self, data: Any) -> list[str]:
+        errors: list[str] = []
+        self._root.check(data, "$", errors)
+        return errors
+
+    def parse(self, raw: bytes | str) -> ModelT:
+        """Validate ``raw``, repairing it if needed; raises :class:`OutputError`."""
+        truncated = False
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            data, truncated = self._recover(raw)
+
+        errors = self.errors(data)
+        if errors:
+            data = self._root.repair(data, truncated)
+            errors = self.errors(data)
+            if errors:
+                self.rejected += 1
+                raise OutputError(self.name, errors)
+            self.repaired += 1
+        elif truncated:
+            self.repaired += 1
+        else:
+            self.valid += 1
+
+        try:
+            return self.model.model_validate(data)
+        except ValidationError as exc:
+            self.rejected += 1
+            raise OutputError(self.name, [str(error["msg"]) for error in exc.errors()]) from exc
+
+    def _recover(self, raw: bytes | str) -> tuple[Any, bool]:
+        text = _extract_json(raw.decode("utf-8", "replace") if isinstance(raw, bytes) else raw)
+        try:
+            # Complete JSON followed by prose or a second object.
+            return json.JSONDecoder().raw_decode(text)[0], False
+        except ValueError:
+            pass
+        try:
+            return json.loads(complete_json(text)), True
+        except ValueError as exc:
+            self.rejected += 1
+            raise OutputError(self.name, [f"$: not JSON ({exc})"]) from exc
+
+    def stats(self) -> dict[str, int]:
+        return {"valid": self.valid, "repaired": self.repaired, "rejected": self.rejected}
+
+
+class OutputValidators:
+    """Compiled validators for every response model the LLM adapters parse."""
+
+    def __init__(self, schema_dir: str | Path | None = None) -> None:
+        loader = _SchemaLoader(Path(schema_dir) if schema_dir else default_schema_dir())
+        self.plan = OutputValidator(
+            loader.load(PLAN_OUTPUT_SCHEMA), AIPlanResponse, loader, document=PLAN_OUTPUT_SCHEMA
+        )
+        self.fragment = OutputValidator(
+            FRAGMENT_OUTPUT_SCHEMA, AIPlanFragmentResponse, loader, document=PLAN_OUTPUT_SCHEMA
+        )
+        self._by_model: dict[type[BaseModel], OutputValidator[Any]] = {
+            AIPlanResponse: self.plan,
+            AIPlanFragmentResponse: self.fragment,
+        }
+
+    def for_model(self, model: type[ModelT]) -> OutputValidator[ModelT]:
+        return self._by_model[model]
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {validator.name: validator.stats() for validator in self._by_model.values()}
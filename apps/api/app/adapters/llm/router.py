@@ -0,0 +1,218 @@
+"""Latency-aware routing across several LLM backends."""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Sequence, TypeVar
+
+import httpx
+
+from app.adapters.llm.base import (
+    LLMAdapter,
+    LLMBackend,
+    LLMBackendError,
+    fallback_fragment,
+    fallback_plan,
+)
+from app.adapters.llm.google_ai import GoogleAIAdapter
+from app.adapters.llm.gpt_oss import GPTOssAdapter
+from app.adapters.llm.openai import OpenAIAdapter
+from app.adapters.llm.output import OutputValidators
+from app.executor import CPUExecutor
+from app.schemas import AIPlanFragmentRequest, AIPlanFragmentResponse, AIPlanRequest, AIPlanResponse
+
+if TYPE_CHECKING:
+    from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+ResponseT = TypeVar("ResponseT")
+
+# Assumed latency before any backend has answered.
+_INITIAL_LATENCY_S = 1.0
+
+
+@dataclass
+class _BackendState:
+    backend: LLMBackend
+    priority: int
+    inflight: int = 0
+    ewma_s: float | None = None
+    requests: int = 0
+    failures: int = 0
+
+
+class LLMRouter(LLMAdapter):
+    """Spread plan generation over backends by queue depth and EWMA latency.
+
+    Backends in the lowest ``priority`` tier share the load; a request goes to
+    the one with the smallest expected wait, ``(inflight + 1) * ewma``. On
+    error it fails over to the next candidate, then to higher tiers (typically
+    paid cloud providers). The sample plan is only returned when every
+    backend has failed or is circuit-open.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[tuple[LLMBackend, int]],
+        *,
+        alpha: float = 0.3,
+        output: OutputValidators | None = None,
+    ) -> None:
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self._states = [_BackendState(backend, priority) for backend, priority in backends]
+        self._alpha = alpha
+        self._output = output
+        self.fallbacks = 0
+
+    @property
+    def backends(self) -> list[LLMBackend]:
+        return [state.backend for state in self._states]
+
+    def _expected_wait(self, state: _BackendState, default_s: float) -> float:
+        latency = state.ewma_s if state.ewma_s is not None else default_s
+        return (state.inflight + 1) * latency
+
+    def candidates(self) -> list[LLMBackend]:
+        """Backends in the order a request would try them right now."""
+        known = [state.ewma_s for state in self._states if state.ewma_s is not None]
+        # Unmeasured backends look faster than the best one, so new capacity is probed.
+        default_s = min(known) / 2 if known else _INITIAL_LATENCY_S
+        # Only a peek: the half-open probe is claimed in ``_route`` when it is used.
+        available = [state for state in self._states if state.backend.circuit.state != "open"]
+        # Shuffle first so equal scores do not always favour the first host.
+        random.shuffle(available)
+        available.sort(key=lambda state: (state.priority, self._expected_wait(state, default_s)))
+        return [state.backend for state in available]
+
+    async def generate_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+        response = await self._route(lambda backend: backend.request_plan(payload))
+        if response is None:
+            self.fallbacks += 1
+            return fallback_plan(payload)
+        return response
+
+    async def generate_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        response = await self._route(lambda backend: backend.request_fragment(payload))
+        if response is None:
+            self.fallbacks += 1
+            return fallback_fragment(payload)
+        return response
+
+    async def _route(self, call: Callable[[LLMBackend], Awaitable[ResponseT]]) -> ResponseT | None:
+        """Try backends in :meth:`candidates` order; ``None`` when all failed."""
+        states = {id(state.backend): state for state in self._states}
+        for backend in self.candidates():
+            if not backend.circuit.allow():
+                continue
+            state = states[id(backend)]
+            state.inflight += 1
+            state.requests += 1
+            started = time.monotonic()
+            try:
+                response = await call(backend)
+            except LLMBackendError as exc:
+                state.failures += 1
+                logger.warning("LLM backend failed, trying the next one: %s", exc)
+                continue
+            finally:
+                state.inflight -= 1
+            elapsed = time.monotonic() - started
+            state.ewma_s = (
+                elapsed
+                if state.ewma_s is None
+                else self._alpha * elapsed + (1 - self._alpha) * state.ewma_s
+            )
+            return response
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "fallbacks": self.fallbacks,
+            "output": self._output.stats() if self._output is not None else None,
+            "backends": {
+                state.backend.name: {
+                    "priority": state.priority,
+                    "inflight": state.inflight,
+                    "ewma_ms": round(state.ewma_s * 1000, 1) if state.ewma_s is not None else None,
+                    "requests": state.requests,
+                    "failures": state.failures,
+                    "circuit": state.backend.circuit.state,
+                }
+                for state in self._states
+            },
+        }
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: Settings,
+        *,
+        client: httpx.AsyncClient,
+        executor: CPUExecutor | None = None,
+    ) -> LLMRouter:
+        """Build every configured backend; ``LLM_PROVIDER`` picks the primary tier.
+
+        Without ``LLM_PROVIDER`` the self-hosted GPT-OSS hosts are primary and
+        cloud providers with an API key serve as failover.
+        """
+        primary = settings.llm_provider or "gpt-oss"
+        backends: list[tuple[LLMBackend, int]] = []
+        output = OutputValidators(settings.shared_schema_dir)
+        constrained = settings.llm_constrained_decoding
+
+        urls = [url.strip() for url in (settings.gpt_oss_base_urls or "").split(",") if url.strip()]
+        if settings.gpt_oss_base_url and settings.gpt_oss_base_url not in urls:
+            urls.insert(0, settings.gpt_oss_base_url)
+        gpt_oss_key = settings.gpt_oss_api_key or settings.openai_api_key
+        for index, url in enumerate(urls):
+            backend = GPTOssAdapter(
+                base_url=url,
+                api_key=gpt_oss_key,
+                client=client,
+                executor=executor,
+                output=output,
+                constrained=constrained,
+                name="gpt_oss" if index == 0 else f"gpt_oss_{index + 1}",
+            )
+            backends.append((backend, 0 if primary == "gpt-oss" else 1))
+
+        if settings.openai_api_key:
+            backends.append(
+                (
+                    OpenAIAdapter(
+                        api_key=settings.openai_api_key,
+                        client=client,
+                        model=settings.openai_model,
+                        base_url=settings.openai_base_url,
+                        executor=executor,
+                        output=output,
+                        constrained=constrained,
+                    ),
+                    0 if primary == "openai" else 1,
+                )
+            )
+        if settings.google_ai_api_key:
+            backends.append(
+                (
+                    GoogleAIAdapter(
+                        api_key=settings.google_ai_api_key,
+                        client=client,
+                        model=settings.google_ai_model,
+                        base_url=settings.google_ai_base_url,
+                        executor=executor,
+                        output=output,
+                        constrained=constrained,
+                    ),
+                    0 if primary == "google" else 1,
+                )
+            )
+
+        if not backends:
+            # Nothing configured: a single unconfigured backend that always degrades.
+            backends.append((GPTOssAdapter(base_url="", api_key=None, client=client), 0))
+        return cls(backends, output=output)
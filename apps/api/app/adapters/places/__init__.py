@@ -1,4 +1,5 @@
 from .base import PlacesAdapter
 from .google_places import GooglePlacesAdapter
+from .local_index import LocalPlacesAdapter, PoiIndex
 
-__all__ = ["PlacesAdapter", "GooglePlacesAdapter"]
+__all__ = ["PlacesAdapter", "GooglePlacesAdapter", "LocalPlacesAdapter", "PoiIndex"]
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import httpx
-
 from typing import Iterable, List, Tuple
 
 import httpx
 
+from app.adapters.circuit import CircuitBreaker
 from app.adapters.places.base import PlacesAdapter
+from app.executor import CPUExecutor, run_cpu
+from app.geo import decode_polyline
 from app.schemas import PlaceItem, PlacesAlongRouteRequest, PlacesAlongRouteResponse
 
 
@@ -28,19 +29,31 @@ class GooglePlacesAdapter(PlacesAdapter):
         *,
         api_key: str,
         client: httpx.AsyncClient,
+        circuit: CircuitBreaker | None = None,
+        api_url: str | None = None,
+        executor: CPUExecutor | None = None,
     ) -> None:
         self._api_key = api_key
         self._client = client
+        self.circuit = circuit or CircuitBreaker("google_places")
+        self._search_url = api_url or self._SEARCH_URL
+        self._executor = executor
 
     async def search_along_route(
         self, payload: PlacesAlongRouteRequest
     ) -> PlacesAlongRouteResponse:
         """Call Google Places API to find places along the route."""
-        if not self._api_key:
+        if not self._api_key or not self.circuit.allow():
             return self._fallback(payload)
 
         try:
-            center = self._polyline_center(payload.polyline)
+            center = await run_cpu(
+                self._executor,
+                self._polyline_center,
+                payload.polyline,
+                size=len(payload.polyline),
+                label="polyline_decode",
+            )
         except ValueError:
             return self._fallback(payload)
 
@@ -69,14 +82,20 @@ class GooglePlacesAdapter(PlacesAdapter):
 
         try:
             response = await self._client.post(
-                self._SEARCH_URL,
+                self._search_url,
                 json=request_body,
                 headers=headers,
             )
             response.raise_for_status()
+        except httpx.HTTPError:
+            self.circuit.record_failure()
+            return self._fallback(payload)
+        self.circuit.record_success()
+
+        try:
             data = response.json()
             return self._parse_response(data)
-        except (httpx.HTTPError, KeyError, ValueError):
+        except (KeyError, ValueError):
             return self._fallback(payload)
 
     def _fallback(
@@ -164,37 +183,4 @@ class GooglePlacesAdapter(PlacesAdapter):
 
     @staticmethod
     def _decode_polyline(polyline: str) -> Iterable[Tuple[float, float]]:
-        index = lat = lng = 0
-        coordinates: List[Tuple[float, float]] = []
-
-        length = len(polyline)
-        while index < length:
-            shift = result = 0
-            while True:
-                if index >= length:
-                    raise ValueError("Invalid polyline encoding")
-                b = ord(polyline[index]) - 63
-                index += 1
-                result |= (b & 0x1F) << shift
-                shift += 5
-                if b < 0x20:
-                    break
-            delta_lat = ~(result >> 1) if result & 1 else result >> 1
-            lat += delta_lat
-
-            shift = result = 0
-            while True:
-                if index >= length:
-                    raise ValueError("Invalid polyline encoding")
-                b = ord(polyline[index]) - 63
-                index += 1
-                result |= (b & 0x1F) << shift
-                shift += 5
-                if b < 0x20:
-                    break
-            delta_lng = ~(result >> 1) if result & 1 else result >> 1
-            lng += delta_lng
-
-            coordinates.append((lat / 1e5, lng / 1e5))
-
-        return coordinates
+        return decode_polyline(polyline)
@@ -0,0 +1,328 @@
+"""Corridor search over a locally imported, memory-mapped POI index.
+
+POIs are bucketed into a uniform lat/lng grid and stored as fixed-width
+columns sorted by cell, so a corridor query only touches the cells overlapping
+each polyline segment. Names and ids live in a side blob that is decoded only
+for returned items. Build an index from a JSON list of POIs::
+
+    python -m app.adapters.places.local_index build pois.json pois.idx
+
+Input format: ``[{"id", "name", "lat", "lng", "categories": [...], "rating"?,
+"summary"?}]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Sequence
+
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.places.base import PlacesAdapter
+from app.executor import CPUExecutor, run_cpu
+from app.geo import EARTH_RADIUS_M, decode_polyline
+from app.schemas import PlaceItem, PlacesAlongRouteRequest, PlacesAlongRouteResponse
+
+MAGIC = b"BRPOIS01"
+# magic, pois, cell size (deg), first lat cell, first lng cell, rows, cols,
+# category table bytes, record blob bytes
+_HEADER = struct.Struct("<8sIfiiIIII")
+_COORD_SCALE = 1e6
+_NO_RATING = 0xFFFF
+_METRES_PER_DEG = math.pi * EARTH_RADIUS_M / 180
+DEFAULT_CELL_DEG = 0.02
+DEFAULT_CORRIDOR_M = 3000
+MAX_RESULTS = 10
+
+
+def _aligned(size: int) -> int:
+    return (size + 3) & ~3
+
+
+class PoiIndex:
+    """Read-only uniform-grid index over POI columns."""
+
+    def __init__(self, buffer: Any, *, owner: Any = None) -> None:
+        view = memoryview(buffer)
+        (
+            magic, count, cell_deg, lat0, lng0, rows, cols, categories_len, records_len,
+        ) = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a POI index file")
+
+        self._owner = owner
+        self._view = view
+        self.count = count
+        self._cell_deg = cell_deg
+        self._lat0, self._lng0 = lat0, lng0
+        self._rows, self._cols = rows, cols
+
+        offset = _HEADER.size
+
+        def take(fmt: str, length: int) -> memoryview:
+            nonlocal offset
+            size = length * struct.calcsize(fmt)
+            section = view[offset : offset + size].cast(fmt)
+            offset = _aligned(offset + size)
+            return section
+
+        self._lat = take("i", count)
+        self._lng = take("i", count)
+        self._rating = take("H", count)
+        self._categories = take("I", count)
+        self._cells = take("I", rows * cols + 1)
+        self._record_offsets = take("I", count + 1)
+        categories = json.loads(bytes(view[offset : offset + categories_len]) or b"[]")
+        self._category_bits = {name: 1 << bit for bit, name in enumerate(categories)}
+        offset = _aligned(offset + categories_len)
+        self._records = view[offset : offset + records_len]
+
+    @classmethod
+    def open(cls, path: str | Path) -> "PoiIndex":
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, owner=mapped)
+
+    def close(self) -> None:
+        for section in (
+            self._lat, self._lng, self._rating, self._categories, self._cells,
+            self._record_offsets, self._records,
+        ):
+            section.release()
+        self._view.release()
+        if isinstance(self._owner, mmap.mmap):
+            self._owner.close()
+
+    def category_mask(self, categories: Sequence[str]) -> int | None:
+        """Bitmask for the requested categories; ``None`` means no filter."""
+        if not categories:
+            return None
+        mask = 0
+        for name in categories:
+            mask |= self._category_bits.get(name, 0)
+        return mask
+
+    def corridor(
+        self,
+        points: Sequence[tuple[float, float]],
+        width_m: float,
+        *,
+        category_mask: int | None = None,
+    ) -> dict[int, float]:
+        """Return ``{poi: distance_m}`` for POIs within ``width_m`` of the path."""
+        if not points:
+            return {}
+        ref_lat = sum(lat for lat, _ in points) / len(points)
+        kx = _METRES_PER_DEG * math.cos(math.radians(ref_lat))
+        ky = _METRES_PER_DEG
+        pad_lat = width_m / ky
+        pad_lng = width_m / kx
+        cell = self._cell_deg
+        lat_scale = lng_scale = 1 / _COORD_SCALE
+
+        found: dict[int, float] = {}
+        segments = list(zip(points, points[1:])) or [(points[0], points[0])]
+        for (alat, alng), (blat, blng) in segments:
+            row_lo = max(0, math.floor((min(alat, blat) - pad_lat) / cell) - self._lat0)
+            row_hi = min(self._rows - 1, math.floor((max(alat, blat) + pad_lat) / cell) - self._lat0)
+            col_lo = max(0, math.floor((min(alng, blng) - pad_lng) / cell) - self._lng0)
+            col_hi = min(self._cols - 1, math.floor((max(alng, blng) + pad_lng) / cell) - self._lng0)
+            if row_lo > row_hi or col_lo > col_hi:
+                continue
+
+            # Segment in local metres with A at the origin.
+            bx, by = (blng - alng) * kx, (blat - alat) * ky
+            length_sq = bx * bx + by * by
+            for row in range(row_lo, row_hi + 1):
+                base = row * self._cols
+                for poi in range(self._cells[base + col_lo], self._cells[base + col_hi + 1]):
+                    if category_mask is not None and not self._categories[poi] & category_mask:
+                        continue
+                    px = (self._lng[poi] * lng_scale - alng) * kx
+                    py = (self._lat[poi] * lat_scale - alat) * ky
+                    if length_sq:
+                        t = max(0.0, min(1.0, (px * bx + py * by) / length_sq))
+                        px -= t * bx
+                        py -= t * by
+                    distance = math.hypot(px, py)
+                    if distance <= width_m and distance < found.get(poi, math.inf):
+                        found[poi] = distance
+        return found
+
+    def rating(self, poi: int) -> float | None:
+        value = self._rating[poi]
+        return None if value == _NO_RATING else value / 100
+
+    def item(self, poi: int) -> PlaceItem:
+        start, end = self._record_offsets[poi], self._record_offsets[poi + 1]
+        record = json.loads(bytes(self._records[start:end]))
+        return PlaceItem(
+            id=record["id"],
+            name=record["name"],
+            lat=self._lat[poi] / _COORD_SCALE,
+            lng=self._lng[poi] / _COORD_SCALE,
+            rating=self.rating(poi),
+            summary=record.get("summary"),
+        )
+
+
+def build_index(pois: Sequence[dict[str, Any]], *, cell_deg: float = DEFAULT_CELL_DEG) -> bytes:
+    """Serialize POI records into the memory-mappable index format."""
+    categories = sorted({name for poi in pois for name in poi.get("categories", [])})
+    if len(categories) > 32:
+        raise ValueError("At most 32 distinct categories are supported")
+    bits = {name: 1 << bit for bit, name in enumerate(categories)}
+
+    def cell_of(poi: dict[str, Any]) -> tuple[int, int]:
+        return math.floor(poi["lat"] / cell_deg), math.floor(poi["lng"] / cell_deg)
+
+    cells = [cell_of(poi) for poi in pois]
+    lat0 = min((row for row, _ in cells), default=0)
+    lng0 = min((col for _, col in cells), default=0)
+    rows = max((row for row, _ in cells), default=0) - lat0 + 1
+    cols = max((col for _, col in cells), default=0) - lng0 + 1
+
+    linear = [(row - lat0) * cols + (col - lng0) for row, col in cells]
+    order = sorted(range(len(pois)), key=lambda index: linear[index])
+    cell_offsets = array("I", [0] * (rows * cols + 1))
+    for index in order:
+        cell_offsets[linear[index] + 1] += 1
+    for position in range(rows * cols):
+        cell_offsets[position + 1] += cell_offsets[position]
+
+    records = bytearray()
+    record_offsets = array("I", [0])
+    for index in order:
+        poi = pois[index]
+        record = {"id": str(poi["id"]), "name": poi["name"]}
+        if poi.get("summary"):
+            record["summary"] = poi["summary"]
+        records += json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        record_offsets.append(len(records))
+
+    def rating_of(poi: dict[str, Any]) -> int:
+        rating = poi.get("rating")
+        return _NO_RATING if rating is None else round(float(rating) * 100)
+
+    def mask_of(poi: dict[str, Any]) -> int:
+        mask = 0
+        for name in poi.get("categories", []):
+            mask |= bits[name]
+        return mask
+
+    sections = [
+        array("i", (round(pois[index]["lat"] * _COORD_SCALE) for index in order)),
+        array("i", (round(pois[index]["lng"] * _COORD_SCALE) for index in order)),
+        array("H", (rating_of(pois[index]) for index in order)),
+        array("I", (mask_of(pois[index]) for index in order)),
+        cell_offsets,
+        record_offsets,
+    ]
+    if sys.byteorder != "little":
+        for section in sections:
+            section.byteswap()
+
+    categories_blob = json.dumps(categories, ensure_ascii=False).encode("utf-8")
+    out = bytearray(
+        _HEADER.pack(
+            MAGIC, len(pois), cell_deg, lat0, lng0, rows, cols, len(categories_blob), len(records)
+        )
+    )
+    for blob in [*(section.tobytes() for section in sections), categories_blob]:
+        out += blob
+        out += b"\0" * (_aligned(len(out)) - len(out))
+    out += records
+    return bytes(out)
+
+
+class LocalPlacesAdapter(PlacesAdapter):
+    """Places adapter answering corridor queries from a local :class:`PoiIndex`.
+
+    With an ``upstream`` adapter it acts as a pre-filter: requests are only
+    forwarded when fewer than ``min_results`` local POIs match, or when the
+    request filters on opening hours, which the local dataset does not carry.
+    """
+
+    def __init__(
+        self,
+        index: PoiIndex,
+        *,
+        upstream: PlacesAdapter | None = None,
+        min_results: int = 3,
+        executor: CPUExecutor | None = None,
+    ) -> None:
+        self._index = index
+        self._upstream = upstream
+        self._min_results = min_results
+        self._executor = executor
+
+    @property
+    def circuit(self) -> CircuitBreaker | None:
+        return getattr(self._upstream, "circuit", None)
+
+    async def search_along_route(
+        self, payload: PlacesAlongRouteRequest
+    ) -> PlacesAlongRouteResponse:
+        """Search the local index, deferring to the upstream adapter when it falls short."""
+        if self._upstream is not None and payload.open_now is not None:
+            return await self._upstream.search_along_route(payload)
+
+        try:
+            # The index lives in this process's mmap, so this stays on threads.
+            response = await run_cpu(
+                self._executor,
+                self.search,
+                payload,
+                size=len(payload.polyline),
+                label="corridor_search",
+                picklable=False,
+            )
+        except ValueError:
+            response = PlacesAlongRouteResponse(items=[])
+
+        if self._upstream is not None and len(response.items) < self._min_results:
+            return await self._upstream.search_along_route(payload)
+        return response
+
+    def search(self, payload: PlacesAlongRouteRequest) -> PlacesAlongRouteResponse:
+        points = decode_polyline(payload.polyline)
+        width = max(100, payload.corridor_width_m or DEFAULT_CORRIDOR_M)
+        mask = self._index.category_mask(payload.categories)
+        if mask == 0:
+            return PlacesAlongRouteResponse(items=[])
+
+        matches = self._index.corridor(points, width, category_mask=mask)
+
+        def score(poi: int) -> float:
+            # Distance as a fraction of the corridor, nudged by rating.
+            rating = self._index.rating(poi) or 0.0
+            return matches[poi] / width + (5.0 - rating) * 0.1
+
+        ranked = sorted(matches, key=score)[:MAX_RESULTS]
+        return PlacesAlongRouteResponse(items=[self._index.item(poi) for poi in ranked])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="POI index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="convert a JSON list of POIs")
+    build.add_argument("source", type=Path)
+    build.add_argument("output", type=Path)
+    build.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG)
+    args = parser.parse_args()
+
+    pois = json.loads(args.source.read_text(encoding="utf-8"))
+    args.output.write_bytes(build_index(pois, cell_deg=args.cell_deg))
+    index = PoiIndex.open(args.output)
+    print(f"wrote {index.count} POIs to {args.output}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
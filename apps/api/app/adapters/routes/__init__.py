@@ -1,4 +1,5 @@
 from .base import RoutesAdapter
 from .google_routes import GoogleRoutesAdapter
+from .local_graph import LocalRoutesAdapter, RoadGraph
 
-__all__ = ["RoutesAdapter", "GoogleRoutesAdapter"]
+__all__ = ["RoutesAdapter", "GoogleRoutesAdapter", "LocalRoutesAdapter", "RoadGraph"]
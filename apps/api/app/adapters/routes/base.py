@@ -12,3 +12,15 @@ class RoutesAdapter(ABC):
     async def compute_route(self, payload: RoutesComputeRequest) -> RoutesComputeResponse:
         """Compute a primary route and alternatives."""
         raise NotImplementedError
+
+    @staticmethod
+    def _label_for_route(index: int) -> str:
+        if index == 0:
+            return "最短"
+        return f"代替{index}"
+
+    @staticmethod
+    def _estimate_scenic_score(index: int, prefer_scenic: bool | None) -> int:
+        base = 70 if prefer_scenic else 55
+        adjustment = max(0, base - index * 10)
+        return max(10, min(95, adjustment))
@@ -3,9 +3,12 @@ from __future__ import annotations
 from typing import Any
 
 import httpx
+import orjson
 from pydantic import ValidationError
 
+from app.adapters.circuit import CircuitBreaker
 from app.adapters.routes.base import RoutesAdapter
+from app.executor import CPUExecutor, run_cpu
 from app.schemas import (
     RouteAlternative,
     RoutesComputeRequest,
@@ -30,16 +33,24 @@ class GoogleRoutesAdapter(RoutesAdapter):
         *,
         api_key: str,
         client: httpx.AsyncClient,
+        circuit: CircuitBreaker | None = None,
+        api_url: str | None = None,
+        fallback_adapter: RoutesAdapter | None = None,
+        executor: CPUExecutor | None = None,
     ) -> None:
         self._api_key = api_key
         self._client = client
+        self.circuit = circuit or CircuitBreaker("google_routes")
+        self._api_url = api_url or self._API_URL
+        self._fallback_adapter = fallback_adapter
+        self._executor = executor
 
     async def compute_route(
         self, payload: RoutesComputeRequest
     ) -> RoutesComputeResponse:
         """Call Google Routes API to compute the route."""
-        if not self._api_key:
-            return self._fallback(payload)
+        if not self._api_key or not self.circuit.allow():
+            return await self._degraded(payload)
 
         request_body = self._build_request_body(payload)
         headers = {
@@ -50,15 +61,36 @@ class GoogleRoutesAdapter(RoutesAdapter):
 
         try:
             response = await self._client.post(
-                self._API_URL,
+                self._api_url,
                 json=request_body,
                 headers=headers,
             )
             response.raise_for_status()
-            payload_data = response.json()
+        except httpx.HTTPError:
+            self.circuit.record_failure()
+            return await self._degraded(payload)
+        self.circuit.record_success()
+
+        try:
+            payload_data = await run_cpu(
+                self._executor,
+                orjson.loads,
+                response.content,
+                size=len(response.content),
+                label="routes_decode",
+            )
             return self._parse_response(payload, payload_data)
-        except (httpx.HTTPError, ValidationError, KeyError, ValueError):
-            return self._fallback(payload)
+        except (ValidationError, KeyError, ValueError):
+            return await self._degraded(payload)
+
+    async def _degraded(self, payload: RoutesComputeRequest) -> RoutesComputeResponse:
+        """Serve from the offline adapter when configured, else the canned route."""
+        if self._fallback_adapter is not None:
+            try:
+                return await self._fallback_adapter.compute_route(payload)
+            except LookupError:
+                pass
+        return self._fallback(payload)
 
     def _fallback(self, payload: RoutesComputeRequest) -> RoutesComputeResponse:
         primary = RouteAlternative(
@@ -159,15 +191,3 @@ class GoogleRoutesAdapter(RoutesAdapter):
             except ValueError:
                 return 0
         return 0
-
-    @staticmethod
-    def _label_for_route(index: int) -> str:
-        if index == 0:
-            return "最短"
-        return f"代替{index}"
-
-    @staticmethod
-    def _estimate_scenic_score(index: int, prefer_scenic: bool | None) -> int:
-        base = 70 if prefer_scenic else 55
-        adjustment = max(0, base - index * 10)
-        return max(10, min(95, adjustment))
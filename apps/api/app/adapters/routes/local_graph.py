@@ -0,0 +1,437 @@
+"""Offline routing over a compact, memory-mapped road graph.
+
+The graph file stores fixed-width little-endian columns (CSR adjacency in both
+directions plus per-edge length, duration and toll flags) so it can be mapped
+read-only and shared by every worker on the node without parsing. Build one
+from a JSON node/edge list, e.g. exported from an OSM extract::
+
+    python -m app.adapters.routes.local_graph build kagoshima.json kagoshima.graph
+
+Input format: ``{"nodes": [{"id", "lat", "lng", "name"?}], "edges": [{"from",
+"to", "length_m", "duration_s" | "speed_kmh", "toll"?, "oneway"?}]}``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import struct
+import sys
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal, Sequence
+
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.routes.base import RoutesAdapter
+from app.executor import CPUExecutor, run_cpu
+from app.geo import EARTH_RADIUS_M, encode_polyline, haversine_m, parse_lat_lng
+from app.schemas import RouteAlternative, RoutesComputeRequest, RoutesComputeResponse
+
+MAGIC = b"BRGRAPH1"
+_HEADER = struct.Struct("<8sIIIf")  # magic, nodes, edges, names bytes, max speed (m/s)
+TOLL_FLAG = 0x01
+_COORD_SCALE = 1e6
+_GRID_CELL_DEG = 0.01
+# The planar heuristic must never overestimate road distance; leave a margin
+# for the equirectangular approximation.
+_HEURISTIC_SLACK = 0.995
+
+Metric = Literal["time", "distance"]
+
+
+@dataclass
+class PathResult:
+    nodes: list[int]
+    distance_m: float
+    duration_s: float
+    toll: bool
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", name).split()).casefold()
+
+
+def _aligned(size: int) -> int:
+    return (size + 3) & ~3
+
+
+class RoadGraph:
+    """Read-only CSR road graph answering bidirectional A* queries."""
+
+    def __init__(self, buffer: Any, *, owner: Any = None) -> None:
+        view = memoryview(buffer)
+        magic, nodes, edges, names_len, max_speed = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a road graph file")
+
+        self._owner = owner
+        self._view = view
+        self.node_count = nodes
+        self.edge_count = edges
+        self._max_speed = max_speed or 1.0
+
+        offset = _HEADER.size
+
+        def take(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * struct.calcsize(fmt)
+            section = view[offset : offset + size].cast(fmt)
+            offset = _aligned(offset + size)
+            return section
+
+        self._lat = take("i", nodes)
+        self._lng = take("i", nodes)
+        self._offsets = take("I", nodes + 1)
+        self._targets = take("I", edges)
+        self._length = take("f", edges)
+        self._duration = take("f", edges)
+        self._rev_offsets = take("I", nodes + 1)
+        self._rev_sources = take("I", edges)
+        self._rev_edges = take("I", edges)
+        self._flags = take("B", edges)
+        self._names: dict[str, int] = json.loads(bytes(view[offset : offset + names_len]) or b"{}")
+        self._grid: dict[tuple[int, int], list[int]] | None = None
+
+    @classmethod
+    def open(cls, path: str | Path) -> "RoadGraph":
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, owner=mapped)
+
+    def close(self) -> None:
+        for section in (
+            self._lat, self._lng, self._offsets, self._targets, self._length,
+            self._duration, self._rev_offsets, self._rev_sources, self._rev_edges, self._flags,
+        ):
+            section.release()
+        self._view.release()
+        if isinstance(self._owner, mmap.mmap):
+            self._owner.close()
+
+    def coordinates(self, node: int) -> tuple[float, float]:
+        return self._lat[node] / _COORD_SCALE, self._lng[node] / _COORD_SCALE
+
+    def resolve(self, text: str, *, max_snap_m: float = 2000.0) -> int | None:
+        """Map a known place name or a ``"lat,lng"`` string to a node id."""
+        node = self._names.get(_normalize_name(text))
+        if node is not None:
+            return node
+        point = parse_lat_lng(text)
+        if point is None:
+            return None
+        return self.nearest_node(point[0], point[1], max_distance_m=max_snap_m)
+
+    def nearest_node(self, lat: float, lng: float, *, max_distance_m: float = 2000.0) -> int | None:
+        grid = self._grid if self._grid is not None else self._build_grid()
+        cell_lat, cell_lng = int(lat // _GRID_CELL_DEG), int(lng // _GRID_CELL_DEG)
+        max_ring = max(1, math.ceil(max_distance_m / (_GRID_CELL_DEG * 111_000 * math.cos(math.radians(lat)))))
+
+        best, best_distance = None, max_distance_m
+        for ring in range(max_ring + 1):
+            for dlat in range(-ring, ring + 1):
+                for dlng in range(-ring, ring + 1):
+                    if max(abs(dlat), abs(dlng)) != ring:
+                        continue
+                    for node in grid.get((cell_lat + dlat, cell_lng + dlng), ()):
+                        node_lat, node_lng = self.coordinates(node)
+                        distance = haversine_m(lat, lng, node_lat, node_lng)
+                        if distance < best_distance:
+                            best, best_distance = node, distance
+            if best is not None:
+                # Anything in the next ring is at least one cell away.
+                break
+        return best
+
+    def _build_grid(self) -> dict[tuple[int, int], list[int]]:
+        grid: dict[tuple[int, int], list[int]] = {}
+        scale = _COORD_SCALE * _GRID_CELL_DEG
+        for node in range(self.node_count):
+            key = (int(self._lat[node] // scale), int(self._lng[node] // scale))
+            grid.setdefault(key, []).append(node)
+        self._grid = grid
+        return grid
+
+    def shortest_path(
+        self,
+        source: int,
+        target: int,
+        *,
+        metric: Metric = "time",
+        avoid_tolls: bool = False,
+    ) -> PathResult | None:
+        """Bidirectional A* with the symmetric average potential."""
+        if source == target:
+            return PathResult([source], 0.0, 0.0, False)
+
+        cost = self._duration if metric == "time" else self._length
+        per_metre = _HEURISTIC_SLACK / (self._max_speed if metric == "time" else 1.0)
+        lat, lng = self._lat, self._lng
+        s_lat, s_lng = lat[source] / _COORD_SCALE, lng[source] / _COORD_SCALE
+        t_lat, t_lng = lat[target] / _COORD_SCALE, lng[target] / _COORD_SCALE
+        metres_per_deg = math.pi * EARTH_RADIUS_M / 180
+        kx = metres_per_deg * math.cos(math.radians((s_lat + t_lat) / 2))
+        potentials: dict[int, float] = {}
+
+        def potential(node: int) -> float:
+            value = potentials.get(node)
+            if value is None:
+                y, x = lat[node] / _COORD_SCALE, lng[node] / _COORD_SCALE
+                to_target = math.hypot((y - t_lat) * metres_per_deg, (x - t_lng) * kx)
+                from_source = math.hypot((y - s_lat) * metres_per_deg, (x - s_lng) * kx)
+                value = potentials[node] = (to_target - from_source) * per_metre / 2
+            return value
+
+        inf = math.inf
+        flags = self._flags
+        offsets, targets = self._offsets, self._targets
+        rev_offsets, rev_sources, rev_edges = self._rev_offsets, self._rev_sources, self._rev_edges
+
+        dist_f: dict[int, float] = {source: 0.0}
+        dist_r: dict[int, float] = {target: 0.0}
+        parent_f: dict[int, tuple[int, int]] = {}
+        parent_r: dict[int, tuple[int, int]] = {}
+        heap_f = [(potential(source), source)]
+        heap_r = [(-potential(target), target)]
+        settled_f: set[int] = set()
+        settled_r: set[int] = set()
+        best, meeting = inf, -1
+
+        while heap_f and heap_r:
+            if heap_f[0][0] + heap_r[0][0] >= best:
+                break
+            if len(heap_f) <= len(heap_r):
+                _, node = heapq.heappop(heap_f)
+                if node in settled_f:
+                    continue
+                settled_f.add(node)
+                base = dist_f[node]
+                for edge in range(offsets[node], offsets[node + 1]):
+                    if avoid_tolls and flags[edge] & TOLL_FLAG:
+                        continue
+                    nxt = targets[edge]
+                    candidate = base + cost[edge]
+                    if candidate < dist_f.get(nxt, inf):
+                        dist_f[nxt] = candidate
+                        parent_f[nxt] = (node, edge)
+                        heapq.heappush(heap_f, (candidate + potential(nxt), nxt))
+                        other = dist_r.get(nxt)
+                        if other is not None and candidate + other < best:
+                            best, meeting = candidate + other, nxt
+            else:
+                _, node = heapq.heappop(heap_r)
+                if node in settled_r:
+                    continue
+                settled_r.add(node)
+                base = dist_r[node]
+                for slot in range(rev_offsets[node], rev_offsets[node + 1]):
+                    edge = rev_edges[slot]
+                    if avoid_tolls and flags[edge] & TOLL_FLAG:
+                        continue
+                    prev = rev_sources[slot]
+                    candidate = base + cost[edge]
+                    if candidate < dist_r.get(prev, inf):
+                        dist_r[prev] = candidate
+                        parent_r[prev] = (node, edge)
+                        heapq.heappush(heap_r, (candidate - potential(prev), prev))
+                        other = dist_f.get(prev)
+                        if other is not None and candidate + other < best:
+                            best, meeting = candidate + other, prev
+
+        if meeting < 0:
+            return None
+
+        edges: list[int] = []
+        nodes = [meeting]
+        node = meeting
+        while node in parent_f:
+            node, edge = parent_f[node]
+            nodes.append(node)
+            edges.append(edge)
+        nodes.reverse()
+        edges.reverse()
+        node = meeting
+        while node in parent_r:
+            node, edge = parent_r[node]
+            nodes.append(node)
+            edges.append(edge)
+
+        return PathResult(
+            nodes=nodes,
+            distance_m=sum(self._length[edge] for edge in edges),
+            duration_s=sum(self._duration[edge] for edge in edges),
+            toll=any(flags[edge] & TOLL_FLAG for edge in edges),
+        )
+
+
+def build_graph(
+    nodes: Sequence[dict[str, Any]],
+    edges: Sequence[dict[str, Any]],
+) -> bytes:
+    """Serialize node/edge records into the memory-mappable graph format."""
+    index = {node["id"]: position for position, node in enumerate(nodes)}
+    directed: list[tuple[int, int, float, float, int]] = []
+    for edge in edges:
+        source, target = index[edge["from"]], index[edge["to"]]
+        length = float(edge["length_m"])
+        if "duration_s" in edge:
+            duration = float(edge["duration_s"])
+        else:
+            duration = length / (float(edge.get("speed_kmh", 40.0)) / 3.6)
+        flags = TOLL_FLAG if edge.get("toll") else 0
+        directed.append((source, target, length, duration, flags))
+        if not edge.get("oneway", False):
+            directed.append((target, source, length, duration, flags))
+    directed.sort(key=lambda item: (item[0], item[1]))
+
+    node_count, edge_count = len(nodes), len(directed)
+    offsets = array("I", [0] * (node_count + 1))
+    for source, *_ in directed:
+        offsets[source + 1] += 1
+    for position in range(node_count):
+        offsets[position + 1] += offsets[position]
+
+    reverse = sorted(range(edge_count), key=lambda edge: directed[edge][1])
+    rev_offsets = array("I", [0] * (node_count + 1))
+    for edge in reverse:
+        rev_offsets[directed[edge][1] + 1] += 1
+    for position in range(node_count):
+        rev_offsets[position + 1] += rev_offsets[position]
+
+    max_speed = max((length / duration for _, _, length, duration, _ in directed if duration > 0), default=1.0)
+    names = {
+        _normalize_name(node["name"]): position
+        for position, node in enumerate(nodes)
+        if node.get("name")
+    }
+    names_blob = json.dumps(names, ensure_ascii=False).encode("utf-8")
+
+    sections = [
+        array("i", (round(node["lat"] * _COORD_SCALE) for node in nodes)),
+        array("i", (round(node["lng"] * _COORD_SCALE) for node in nodes)),
+        offsets,
+        array("I", (item[1] for item in directed)),
+        array("f", (item[2] for item in directed)),
+        array("f", (item[3] for item in directed)),
+        rev_offsets,
+        array("I", (directed[edge][0] for edge in reverse)),
+        array("I", reverse),
+        array("B", (item[4] for item in directed)),
+    ]
+    if sys.byteorder != "little":
+        for section in sections:
+            section.byteswap()
+
+    out = bytearray(_HEADER.pack(MAGIC, node_count, edge_count, len(names_blob), max_speed))
+    for section in sections:
+        out += section.tobytes()
+        out += b"\0" * (_aligned(len(out)) - len(out))
+    out += names_blob
+    return bytes(out)
+
+
+class LocalRoutesAdapter(RoutesAdapter):
+    """Routes adapter answering from an offline road graph.
+
+    With an ``upstream`` adapter it acts as a cost-saving first tier and
+    forwards requests whose endpoints it cannot resolve. Without one it raises
+    :class:`LookupError`, which lets another adapter use it as a degraded mode.
+    """
+
+    def __init__(
+        self,
+        graph: RoadGraph,
+        *,
+        upstream: RoutesAdapter | None = None,
+        executor: CPUExecutor | None = None,
+    ) -> None:
+        self._graph = graph
+        self._upstream = upstream
+        self._executor = executor
+
+    @property
+    def circuit(self) -> CircuitBreaker | None:
+        return getattr(self._upstream, "circuit", None)
+
+    async def compute_route(self, payload: RoutesComputeRequest) -> RoutesComputeResponse:
+        """Route locally, deferring to the upstream adapter when unresolvable."""
+        try:
+            return await run_cpu(
+                self._executor, self.route, payload, size=None, label="graph_search", picklable=False
+            )
+        except LookupError:
+            if self._upstream is None:
+                raise
+            return await self._upstream.compute_route(payload)
+
+    def route(self, payload: RoutesComputeRequest) -> RoutesComputeResponse:
+        stops = [payload.origin, *payload.waypoints, payload.destination]
+        nodes = [self._graph.resolve(stop) for stop in stops]
+        if any(node is None for node in nodes):
+            raise LookupError("Route endpoint not in local graph")
+
+        avoid_tolls = bool(payload.avoidTolls)
+        candidates = [self._route_legs(nodes, metric="time", avoid_tolls=avoid_tolls)]
+        if candidates[0] is None:
+            raise LookupError("No path in local graph")
+        if not avoid_tolls and candidates[0].toll:
+            candidates.append(self._route_legs(nodes, metric="time", avoid_tolls=True))
+        candidates.append(self._route_legs(nodes, metric="distance", avoid_tolls=avoid_tolls))
+
+        paths: list[PathResult] = []
+        for candidate in candidates:
+            if candidate is not None and all(candidate.nodes != path.nodes for path in paths):
+                paths.append(candidate)
+
+        primary = paths[0]
+        alternatives = [
+            RouteAlternative(
+                label=self._label_for_route(index),
+                duration_s=round(path.duration_s),
+                distance_m=round(path.distance_m),
+                scenic_score=self._estimate_scenic_score(index, payload.preferScenic),
+                toll=path.toll,
+            )
+            for index, path in enumerate(paths)
+        ]
+        return RoutesComputeResponse(
+            polyline=encode_polyline(self._graph.coordinates(node) for node in primary.nodes),
+            distance_m=round(primary.distance_m),
+            duration_s=round(primary.duration_s),
+            alternatives=alternatives,
+        )
+
+    def _route_legs(self, nodes: list[int | None], *, metric: Metric, avoid_tolls: bool) -> PathResult | None:
+        combined = PathResult(nodes=[], distance_m=0.0, duration_s=0.0, toll=False)
+        for source, target in zip(nodes, nodes[1:]):
+            leg = self._graph.shortest_path(source, target, metric=metric, avoid_tolls=avoid_tolls)
+            if leg is None:
+                return None
+            combined.nodes.extend(leg.nodes if not combined.nodes else leg.nodes[1:])
+            combined.distance_m += leg.distance_m
+            combined.duration_s += leg.duration_s
+            combined.toll = combined.toll or leg.toll
+        return combined
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Road graph utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="convert a JSON node/edge list")
+    build.add_argument("source", type=Path)
+    build.add_argument("output", type=Path)
+    args = parser.parse_args()
+
+    data = json.loads(args.source.read_text(encoding="utf-8"))
+    args.output.write_bytes(build_graph(data["nodes"], data["edges"]))
+    graph = RoadGraph.open(args.output)
+    print(f"wrote {graph.node_count} nodes / {graph.edge_count} directed edges to {args.output}")
+    graph.close()
+
+
+if __name__ == "__main__":
+    main()
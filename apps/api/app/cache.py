@@ -0,0 +1,221 @@
+"""Binary Redis cache client with pipelining, compression and a local near-cache."""
+
+from __future__ import annotations
+
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+from typing import Mapping, Sequence
+
+from redis.asyncio import ConnectionPool, Redis
+
+from app.cache_store import PersistentCacheStore
+
+# Values are stored raw unless compression actually pays off, in which case they
+# carry this one-byte marker. JSON payloads never start with a control byte, so
+# entries written before compression existed still decode as raw.
+_ZLIB_MARKER = b"\x01"
+
+
+def encode_value(value: bytes, *, threshold: int, level: int) -> bytes:
+    if threshold <= 0 or len(value) < threshold:
+        return value
+    compressed = zlib.compress(value, level)
+    if len(compressed) + 1 >= len(value):
+        return value
+    return _ZLIB_MARKER + compressed
+
+
+def decode_value(value: bytes) -> bytes:
+    if value[:1] == _ZLIB_MARKER:
+        return zlib.decompress(value[1:])
+    return value
+
+
+class _NearCache:
+    """Small in-process LRU with a short TTL in front of Redis."""
+
+    def __init__(self, max_entries: int, ttl_s: float) -> None:
+        self._max_entries = max_entries
+        self._ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes, ttl_s: float | None = None) -> None:
+        ttl = self._ttl_s if ttl_s is None else min(ttl_s, self._ttl_s)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class CacheClient:
+    """Cache operations over a sized, non-decoding Redis connection pool.
+
+    Values are opaque bytes. Large values are zlib-compressed transparently, and
+    hot keys are served from a per-process near-cache for ``local_ttl_s``.
+    RESP3 server-assisted invalidation is not available in redis-py's asyncio
+    client, so the near-cache relies on its short TTL to bound staleness.
+
+    With a persistent ``store``, every write is also kept on disk and Redis
+    misses fall through to it, repopulating Redis on the way back. Read counts
+    are batched in memory and flushed by :meth:`maintain_store`.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        compress_threshold: int = 2048,
+        compress_level: int = 6,
+        local_max_entries: int = 0,
+        local_ttl_s: float = 2.0,
+        store: PersistentCacheStore | None = None,
+    ) -> None:
+        self.redis = redis
+        self.store = store
+        self._compress_threshold = compress_threshold
+        self._compress_level = compress_level
+        self._local = _NearCache(local_max_entries, local_ttl_s) if local_max_entries > 0 else None
+        self._hits: Counter[str] = Counter()
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        *,
+        max_connections: int = 50,
+        socket_timeout_s: float | None = 2.0,
+        **kwargs: object,
+    ) -> "CacheClient":
+        pool = ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout_s,
+            socket_connect_timeout=socket_timeout_s,
+            decode_responses=False,
+        )
+        return cls(Redis(connection_pool=pool), **kwargs)
+
+    async def get(self, key: str) -> bytes | None:
+        if self._local is not None:
+            value = self._local.get(key)
+            if value is not None:
+                return value
+
+        raw = await self.redis.get(key)
+        if raw is None:
+            raw = await self._load_from_store(key)
+            if raw is None:
+                return None
+        elif self.store is not None:
+            self._hits[key] += 1
+        value = decode_value(raw)
+        if self._local is not None:
+            self._local.put(key, value)
+        return value
+
+    async def _load_from_store(self, key: str) -> bytes | None:
+        if self.store is None:
+            return None
+        entry = await self.store.get(key)
+        if entry is None:
+            return None
+        raw, ttl_s = entry
+        self._hits[key] += 1
+        await self.redis.set(key, raw, ex=ttl_s)
+        return raw
+
+    async def set(self, key: str, value: bytes, ttl_s: int) -> None:
+        encoded = encode_value(value, threshold=self._compress_threshold, level=self._compress_level)
+        await self.redis.set(key, encoded, ex=ttl_s)
+        if self.store is not None:
+            await self.store.put_many({key: encoded}, ttl_s)
+        if self._local is not None:
+            self._local.put(key, value, ttl_s)
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        """Fetch several keys in one round-trip."""
+        results: list[bytes | None] = [None] * len(keys)
+        missing: list[int] = []
+        for index, key in enumerate(keys):
+            value = self._local.get(key) if self._local is not None else None
+            if value is None:
+                missing.append(index)
+            results[index] = value
+
+        if missing:
+            raw_values = await self.redis.mget([keys[index] for index in missing])
+            for index, raw in zip(missing, raw_values):
+                if raw is None:
+                    raw = await self._load_from_store(keys[index])
+                    if raw is None:
+                        continue
+                elif self.store is not None:
+                    self._hits[keys[index]] += 1
+                value = decode_value(raw)
+                results[index] = value
+                if self._local is not None:
+                    self._local.put(keys[index], value)
+        return results
+
+    async def set_many(self, items: Mapping[str, bytes], ttl_s: int) -> None:
+        """Store several keys with a shared TTL in one pipelined round-trip."""
+        if not items:
+            return
+        encoded = {
+            key: encode_value(value, threshold=self._compress_threshold, level=self._compress_level)
+            for key, value in items.items()
+        }
+        await self._set_raw_many(encoded, ttl_s)
+        if self.store is not None:
+            await self.store.put_many(encoded, ttl_s)
+        if self._local is not None:
+            for key, value in items.items():
+                self._local.put(key, value, ttl_s)
+
+    async def _set_raw_many(self, items: Mapping[str, bytes], ttl_s: int) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, raw in items.items():
+                pipe.set(key, raw, ex=ttl_s)
+            await pipe.execute()
+
+    async def warm_from_store(self, limit: int) -> int:
+        """Copy the most-read persisted entries into Redis; return how many."""
+        if self.store is None or limit <= 0:
+            return 0
+        by_ttl: defaultdict[int, dict[str, bytes]] = defaultdict(dict)
+        for key, raw, ttl_s in await self.store.hottest(limit):
+            by_ttl[ttl_s][key] = raw
+        for ttl_s, items in by_ttl.items():
+            await self._set_raw_many(items, ttl_s)
+        return sum(len(items) for items in by_ttl.values())
+
+    async def maintain_store(self) -> int:
+        """Flush batched hit counts and compact the store; return entries dropped."""
+        if self.store is None:
+            return 0
+        hits, self._hits = self._hits, Counter()
+        await self.store.record_hits(hits)
+        return await self.store.compact()
+
+    async def ping(self) -> bool:
+        return await self.redis.ping()
+
+    async def aclose(self) -> None:
+        if self.store is not None:
+            await self.store.record_hits(self._hits)
+            self._hits.clear()
+            await self.store.close()
+        await self.redis.aclose()
+        await self.redis.connection_pool.disconnect()
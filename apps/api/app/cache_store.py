@@ -0,0 +1,159 @@
+"""Durable SQLite tier behind Redis so cached upstream responses survive restarts."""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Mapping, TypeVar
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    ttl_s INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_hits ON entries (hits DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_UPSERT_SQL = """
+INSERT INTO entries (key, value, ttl_s, expires_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value, ttl_s = excluded.ttl_s, expires_at = excluded.expires_at
+"""
+
+
+class PersistentCacheStore:
+    """SQLite-backed L3 cache with per-entry expiry and hit counts.
+
+    All database work runs on one dedicated thread, which serializes writes and
+    keeps blocking I/O off the event loop. Values are stored exactly as they are
+    written to Redis, so they can be copied back without re-encoding. Every
+    worker process shares the file, so hit counts decay at most once per
+    ``decay_interval_s`` however many of them call :meth:`compact`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl_s: int = 86400,
+        mmap_size: int = 256 * 1024 * 1024,
+        decay_interval_s: float = 600.0,
+    ) -> None:
+        self._path = str(path)
+        self._ttl_s = ttl_s
+        self._decay_interval_s = decay_interval_s
+        self._mmap_size = mmap_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-store")
+        self._conn: sqlite3.Connection | None = None
+
+    async def _run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._connection()))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            conn.execute(f"PRAGMA mmap_size = {int(self._mmap_size)}")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def get(self, key: str) -> tuple[bytes, int] | None:
+        """Return ``(value, redis_ttl_s)`` for a live entry."""
+
+        def query(conn: sqlite3.Connection) -> Any:
+            return conn.execute(
+                "SELECT value, ttl_s FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+
+        row = await self._run(query)
+        return (bytes(row[0]), int(row[1])) if row else None
+
+    async def put_many(self, items: Mapping[str, bytes], ttl_s: int) -> None:
+        """Persist values that Redis holds for ``ttl_s`` for the store's own, longer TTL."""
+        expires_at = time.time() + max(self._ttl_s, ttl_s)
+        rows = [(key, value, ttl_s, expires_at) for key, value in items.items()]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.executemany(_UPSERT_SQL, rows)
+
+        await self._run(write)
+
+    async def record_hits(self, hits: Mapping[str, int]) -> None:
+        rows = [(count, key) for key, count in hits.items()]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.executemany("UPDATE entries SET hits = hits + ? WHERE key = ?", rows)
+
+        if rows:
+            await self._run(write)
+
+    async def hottest(self, limit: int) -> list[tuple[str, bytes, int]]:
+        """Most frequently read live entries as ``(key, value, redis_ttl_s)``."""
+
+        def query(conn: sqlite3.Connection) -> list[Any]:
+            return conn.execute(
+                "SELECT key, value, ttl_s FROM entries WHERE expires_at > ? "
+                "ORDER BY hits DESC LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+
+        return [(key, bytes(value), int(ttl)) for key, value, ttl in await self._run(query)]
+
+    async def compact(self, *, vacuum_pages: int = 1000) -> int:
+        """Drop expired entries, decay hit counts and return freed pages to the OS."""
+
+        def run(conn: sqlite3.Connection) -> int:
+            now = time.time()
+            # IMMEDIATE takes the write lock up front, so of the workers that
+            # compact in the same interval only the first sees a stale decay time.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+                row = conn.execute("SELECT value FROM meta WHERE name = 'last_decay_at'").fetchone()
+                if row is None or now - row[0] >= self._decay_interval_s:
+                    # Halve counts so yesterday's hot keys do not pin today's warm set.
+                    conn.execute("UPDATE entries SET hits = hits / 2 WHERE hits > 0")
+                    conn.execute(
+                        "INSERT INTO meta (name, value) VALUES ('last_decay_at', ?) "
+                        "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                        (now,),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+            return deleted
+
+        return await self._run(run)
+
+    async def close(self) -> None:
+        def shutdown(conn: sqlite3.Connection) -> None:
+            conn.close()
+
+        if self._conn is not None:
+            await self._run(shutdown)
+            self._conn = None
+        self._executor.shutdown(wait=True)
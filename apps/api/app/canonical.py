@@ -0,0 +1,280 @@
+"""Canonical forms of route and places requests for cache keys.
+
+Requests that differ only in how a place is spelled (full-width digits, stray
+whitespace, punctuation, known aliases) or in sub-metre polyline noise should
+share a cache entry. Route endpoints are additionally resolved to Google place
+ids through a long-lived geocode cache, so "鹿児島中央駅" and its street address
+hash to the same key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import struct
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Mapping
+
+import httpx
+
+from app.adapters.circuit import CircuitBreaker
+from app.cache import CacheClient
+from app.geo import parse_lat_lng
+from app.schemas import PlacesAlongRouteRequest, RoutesComputeRequest
+from app.serialization import dump_json
+
+# 1e-5 degrees is about a metre, matching Google's polyline precision.
+COORD_PRECISION = 5
+# Places corridors are kilometres wide, so ~10 m of path noise is irrelevant.
+POLYLINE_PRECISION = 4
+
+_POINT = struct.Struct("<ii")
+
+
+def _fold_punctuation(text: str) -> str:
+    return "".join(
+        " " if unicodedata.category(char)[0] in "PZ" or char.isspace() else char for char in text
+    )
+
+
+def normalize_place_name(text: str) -> str:
+    """NFKC-normalize, casefold and fold punctuation and whitespace.
+
+    Spaces are dropped between non-ASCII words ("鹿児島 中央駅" is one name) but
+    kept between ASCII ones so "Kagoshima Chuo" does not merge into one word.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    coordinates = parse_lat_lng(text.replace(" ", ""))
+    if coordinates is not None:
+        return "{:.{p}f},{:.{p}f}".format(*coordinates, p=COORD_PRECISION)
+
+    words = _fold_punctuation(text).split()
+    if not words:
+        return ""
+    folded = words[0]
+    for word in words[1:]:
+        if folded[-1].isascii() and word[0].isascii():
+            folded += " "
+        folded += word
+    return folded
+
+
+class PlaceCanonicalizer:
+    """Normalize place names and map known aliases to one spelling."""
+
+    def __init__(self, aliases: Mapping[str, str] | None = None) -> None:
+        self._aliases = {
+            normalize_place_name(alias): normalize_place_name(name)
+            for alias, name in (aliases or {}).items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str | Path | None) -> "PlaceCanonicalizer":
+        """Load a JSON object of ``{"alias": "canonical name"}`` pairs."""
+        if not path:
+            return cls()
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def canonical(self, text: str) -> str:
+        name = normalize_place_name(text)
+        return self._aliases.get(name, name)
+
+
+def canonical_route_request(
+    payload: RoutesComputeRequest, canonicalizer: PlaceCanonicalizer
+) -> RoutesComputeRequest:
+    """Route request with normalized place names, for key derivation only."""
+    return payload.model_copy(
+        update={
+            "origin": canonicalizer.canonical(payload.origin),
+            "destination": canonicalizer.canonical(payload.destination),
+            "waypoints": [canonicalizer.canonical(point) for point in payload.waypoints],
+        }
+    )
+
+
+def _packed_polyline(polyline: str, precision: int) -> bytes:
+    """Decoded points rounded to ``precision`` decimals, consecutive repeats dropped.
+
+    Works on the polyline's 1e-5 integers directly, so nothing is converted to
+    floats or re-encoded; each point is packed as two little-endian int32s.
+    """
+    step = 10 ** (5 - precision)
+    half = step // 2
+    pack = _POINT.pack
+    packed = bytearray()
+    data = polyline.encode("ascii")
+    length = len(data)
+    index = lat = lng = 0
+    last = None
+    while index < length:
+        values = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                if index >= length:
+                    raise ValueError("Invalid polyline encoding")
+                b = data[index] - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += values[0]
+        lng += values[1]
+        point = ((lat + half) // step, (lng + half) // step)
+        if point != last:
+            packed += pack(*point)
+            last = point
+    return bytes(packed)
+
+
+def places_cache_key(prefix: str, payload: PlacesAlongRouteRequest) -> str:
+    """Cache key for a places request with its polyline rounded and categories de-duplicated.
+
+    The rounded points are hashed as packed integers next to the rest of the
+    request; a polyline that does not decode is hashed as given.
+    """
+    try:
+        points = _packed_polyline(payload.polyline, POLYLINE_PRECISION)
+    except (UnicodeEncodeError, ValueError, struct.error):
+        points = payload.polyline.encode()
+    fields = payload.model_copy(
+        update={"polyline": "", "categories": sorted(set(payload.categories))}
+    )
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(dump_json(fields))
+    digest.update(points)
+    return f"{prefix}:{digest.hexdigest()}"
+
+
+class GeocodeResolver:
+    """Resolve place names to stable tokens (``place:<id>``, ``geo:<lat,lng>``).
+
+    Results are kept in a per-process LRU and in Redis for ``ttl_s``; concurrent
+    lookups of the same name share one Geocoding API call. Without an API key,
+    or while the circuit is open, names resolve to their canonical spelling.
+    """
+
+    _GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+    _CACHE_PREFIX = "geocode:"
+
+    def __init__(
+        self,
+        canonicalizer: PlaceCanonicalizer,
+        *,
+        client: httpx.AsyncClient | None = None,
+        api_key: str | None = None,
+        api_url: str | None = None,
+        cache: CacheClient | None = None,
+        ttl_s: int = 30 * 86400,
+        local_max_entries: int = 4096,
+        circuit: CircuitBreaker | None = None,
+    ) -> None:
+        self._canonicalizer = canonicalizer
+        self._client = client
+        self._api_key = api_key
+        self._api_url = api_url or self._GEOCODE_URL
+        self._cache = cache
+        self._ttl_s = ttl_s
+        self._local_max_entries = local_max_entries
+        self._local: OrderedDict[str, str] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+        self.circuit = circuit or CircuitBreaker("google_geocoding")
+
+    async def canonical_route_request(self, payload: RoutesComputeRequest) -> RoutesComputeRequest:
+        """Route request whose endpoints are replaced by resolved tokens."""
+        origin, destination, *waypoints = await asyncio.gather(
+            self.resolve(payload.origin),
+            self.resolve(payload.destination),
+            *(self.resolve(point) for point in payload.waypoints),
+        )
+        return payload.model_copy(
+            update={"origin": origin, "destination": destination, "waypoints": waypoints}
+        )
+
+    async def resolve(self, text: str) -> str:
+        name = self._canonicalizer.canonical(text)
+        if parse_lat_lng(name) is not None:
+            return f"geo:{name}"
+        if not name or not self._api_key or self._client is None:
+            return f"name:{name}"
+
+        token = self._local.get(name)
+        if token is not None:
+            self._local.move_to_end(name)
+            return token
+
+        pending = self._inflight.get(name)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._inflight[name] = future
+        try:
+            token = await self._lookup(name)
+            future.set_result(token)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[name]
+        return token
+
+    async def _lookup(self, name: str) -> str:
+        cache_key = self._CACHE_PREFIX + name
+        if self._cache is not None:
+            cached = await self._cache.get(cache_key)
+            if cached:
+                return self._remember(name, cached.decode())
+
+        token = await self._geocode(name)
+        if token is None:
+            # Upstream trouble: fall back to the name without caching the miss.
+            return f"name:{name}"
+        if self._cache is not None:
+            await self._cache.set(cache_key, token.encode(), self._ttl_s)
+        return self._remember(name, token)
+
+    async def _geocode(self, name: str) -> str | None:
+        if not self.circuit.allow():
+            return None
+        try:
+            response = await self._client.get(
+                self._api_url,
+                params={"address": name, "language": "ja", "region": "jp", "key": self._api_key},
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError):
+            self.circuit.record_failure()
+            return None
+        self.circuit.record_success()
+
+        results = data.get("results") or []
+        if data.get("status") == "ZERO_RESULTS" or not results:
+            return f"name:{name}"
+        if data.get("status") not in (None, "OK"):
+            return None
+        place_id = results[0].get("place_id")
+        if place_id:
+            return f"place:{place_id}"
+        location = results[0].get("geometry", {}).get("location", {})
+        try:
+            return "geo:{:.{p}f},{:.{p}f}".format(
+                float(location["lat"]), float(location["lng"]), p=COORD_PRECISION
+            )
+        except (KeyError, TypeError, ValueError):
+            return f"name:{name}"
+
+    def _remember(self, name: str, token: str) -> str:
+        self._local[name] = token
+        self._local.move_to_end(name)
+        while len(self._local) > self._local_max_entries:
+            self._local.popitem(last=False)
+        return token
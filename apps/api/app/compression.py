@@ -0,0 +1,327 @@
+"""Negotiated response compression (zstd, brotli, gzip).
+
+Encoded polylines and multi-day plans shrink by 70-90%, which matters more
+than CPU for clients on slow mobile links. Responses carrying an ETag are
+immutable for that tag, so their compressed bytes are kept in a small LRU and
+hot cached routes and plans are compressed once per worker, not per request.
+"""
+
+from __future__ import annotations
+
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Mapping, Protocol
+
+try:  # optional: offered only when installed
+    import brotli
+except ImportError:  # pragma: no cover - depends on the image
+    brotli = None
+
+try:  # optional: offered only when installed
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the image
+    zstandard = None
+
+GZIP = "gzip"
+BROTLI = "br"
+ZSTD = "zstd"
+
+# Server preference when the client weights several codings equally.
+DEFAULT_ENCODINGS = (ZSTD, BROTLI, GZIP)
+
+# Levels per content type (matched by prefix). Buffered bodies are usually
+# served from caches, so they get stronger settings than streams, which are
+# compressed chunk by chunk on the request path.
+DEFAULT_LEVELS: dict[str, dict[str, int]] = {
+    "application/json": {GZIP: 6, BROTLI: 6, ZSTD: 6},
+    "application/geo+json": {GZIP: 6, BROTLI: 6, ZSTD: 6},
+    "application/x-ndjson": {GZIP: 4, BROTLI: 4, ZSTD: 3},
+    "application/vnd.oai.openapi": {GZIP: 9, BROTLI: 9, ZSTD: 12},
+    "text/html": {GZIP: 6, BROTLI: 5, ZSTD: 6},
+    "text/plain": {GZIP: 6, BROTLI: 5, ZSTD: 6},
+}
+
+# Event streams must reach the client as soon as each event is written.
+_NEVER_COMPRESS = ("text/event-stream",)
+
+
+class _StreamEncoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    encoder = _GzipEncoder(level)
+    return encoder.compress(body) + encoder.finish()
+
+
+_ENCODERS: dict[str, Callable[[int], _StreamEncoder]] = {GZIP: _GzipEncoder}
+_ONESHOT: dict[str, Callable[[bytes, int], bytes]] = {GZIP: _gzip}
+if brotli is not None:
+    _ENCODERS[BROTLI] = _BrotliEncoder
+    _ONESHOT[BROTLI] = lambda body, level: brotli.compress(body, quality=level)
+if zstandard is not None:
+    _ENCODERS[ZSTD] = _ZstdEncoder
+    _ONESHOT[ZSTD] = lambda body, level: zstandard.ZstdCompressor(level=level).compress(body)
+
+
+def available_encodings() -> tuple[str, ...]:
+    return tuple(encoding for encoding in DEFAULT_ENCODINGS if encoding in _ENCODERS)
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Map each coding in Accept-Encoding to its q-value."""
+    weights: dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+class ResponseCompressor:
+    """Compression policy plus an LRU of compressed bodies keyed by ETag."""
+
+    def __init__(
+        self,
+        *,
+        minimum_size: int = 1024,
+        encodings: tuple[str, ...] | None = None,
+        levels: Mapping[str, Mapping[str, int]] | None = None,
+        cache_max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.minimum_size = minimum_size
+        supported = available_encodings()
+        self.encodings = tuple(e for e in (encodings or supported) if e in supported)
+        self._levels = {key: dict(value) for key, value in DEFAULT_LEVELS.items()}
+        for content_type, overrides in (levels or {}).items():
+            self._levels.setdefault(content_type, {}).update(overrides)
+        self._cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_max_bytes = cache_max_bytes
+        self.cache_hits = 0
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        """Pick the best coding both sides support, or ``None`` for identity."""
+        if not accept_encoding or not self.encodings:
+            return None
+        weights = parse_accept_encoding(accept_encoding)
+        wildcard = weights.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = weights.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def level_for(self, content_type: str, encoding: str) -> int | None:
+        """Level for a media type, or ``None`` when it should not be compressed."""
+        media_type = content_type.partition(";")[0].strip().lower()
+        if not media_type or media_type.startswith(_NEVER_COMPRESS):
+            return None
+        for prefix, levels in self._levels.items():
+            if media_type.startswith(prefix):
+                return levels.get(encoding)
+        if media_type.endswith("+json"):
+            return self._levels["application/json"].get(encoding)
+        return None
+
+    def compress(self, body: bytes, encoding: str, level: int, etag: str | None = None) -> bytes:
+        if etag is None:
+            return _ONESHOT[encoding](body, level)
+        key = (etag, encoding)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+        compressed = _ONESHOT[encoding](body, level)
+        if len(compressed) <= self._cache_max_bytes // 16:
+            self._cache[key] = compressed
+            self._cache_bytes += len(compressed)
+            while self._cache_bytes > self._cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+        return compressed
+
+    def encoder(self, encoding: str, level: int) -> _StreamEncoder:
+        return _ENCODERS[encoding](level)
+
+
+class CompressionMiddleware:
+    """ASGI middleware applying the :class:`ResponseCompressor` on ``app.state``.
+
+    Requests pass through untouched until startup has configured a compressor.
+    Single-message bodies are compressed whole (and cached by ETag); streamed
+    bodies are compressed incrementally and flushed per chunk so NDJSON and
+    similar streams stay incremental. Event streams are never compressed.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        compressor: ResponseCompressor | None = getattr(
+            getattr(scope.get("app"), "state", None), "compression", None
+        )
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = compressor.negotiate(accept_encoding) if compressor else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(compressor, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, compressor: ResponseCompressor, encoding: str, send: Any) -> None:
+        self._compressor = compressor
+        self._encoding = encoding
+        self._send = send
+        self._start: dict[str, Any] | None = None
+        self._level: int | None = None
+        self._etag: str | None = None
+        self._encoder: _StreamEncoder | None = None
+        self._passthrough = False
+
+    async def send(self, message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            self._prepare(message)
+            if self._passthrough:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        assert self._start is not None and self._level is not None
+        if self._encoder is None and not more_body:
+            await self._send_whole(body)
+            return
+
+        if self._encoder is None:
+            self._encoder = self._compressor.encoder(self._encoding, self._level)
+            headers = self._headers(drop=(b"content-length",))
+            headers.append((b"content-encoding", self._encoding.encode()))
+            await self._send({**self._start, "headers": headers})
+        chunk = self._encoder.compress(body)
+        chunk += self._encoder.flush() if more_body else self._encoder.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _prepare(self, message: dict[str, Any]) -> None:
+        self._start = message
+        headers = {name.lower(): value for name, value in message.get("headers", [])}
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        level = self._compressor.level_for(content_type, self._encoding) if content_type else None
+        if level is not None:
+            # Whatever is decided below, the representation varies by coding.
+            vary = headers.get(b"vary", b"")
+            if b"accept-encoding" not in vary.lower():
+                message["headers"] = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() != b"vary"
+                ]
+                message["headers"].append(
+                    (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding")
+                )
+        status_code = message["status"]
+        if (
+            level is None
+            or status_code < 200
+            or status_code in (204, 206, 304)
+            or b"content-encoding" in headers
+            or b"content-range" in headers
+        ):
+            self._passthrough = True
+            return
+        self._level = level
+        etag = headers.get(b"etag")
+        self._etag = etag.decode("latin-1") if etag else None
+
+    async def _send_whole(self, body: bytes) -> None:
+        assert self._start is not None and self._level is not None
+        if len(body) < self._compressor.minimum_size:
+            await self._send(self._start)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+        compressed = self._compressor.compress(body, self._encoding, self._level, self._etag)
+        if len(compressed) >= len(body):
+            await self._send(self._start)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+        headers = self._headers(drop=(b"content-length",))
+        headers.append((b"content-encoding", self._encoding.encode()))
+        headers.append((b"content-length", str(len(compressed)).encode()))
+        await self._send({**self._start, "headers": headers})
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    def _headers(self, drop: tuple[bytes, ...]) -> list[tuple[bytes, bytes]]:
+        assert self._start is not None
+        return [
+            (name, value) for name, value in self._start.get("headers", [])
+            if name.lower() not in drop
+        ]
@@ -1,28 +1,96 @@
 from functools import lru_cache
 from typing import Literal
 
-from pydantic import Field
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     google_routes_api_key: str = Field("", alias="GOOGLE_ROUTES_API_KEY")
     google_places_api_key: str = Field("", alias="GOOGLE_PLACES_API_KEY")
+    google_routes_api_url: str | None = Field(default=None, alias="GOOGLE_ROUTES_API_URL")
+    google_places_api_url: str | None = Field(default=None, alias="GOOGLE_PLACES_API_URL")
+    google_geocoding_api_key: str | None = Field(default=None, alias="GOOGLE_GEOCODING_API_KEY")
+    google_geocoding_api_url: str | None = Field(default=None, alias="GOOGLE_GEOCODING_API_URL")
+    geocode_cache_ttl_s: int = Field(30 * 86400, alias="GEOCODE_CACHE_TTL_S")
+    place_aliases_path: str | None = Field(default=None, alias="PLACE_ALIASES_PATH")
+    routes_local_graph_path: str | None = Field(default=None, alias="ROUTES_LOCAL_GRAPH_PATH")
+    routes_local_mode: Literal["fallback", "first"] = Field("fallback", alias="ROUTES_LOCAL_MODE")
+    places_local_index_path: str | None = Field(default=None, alias="PLACES_LOCAL_INDEX_PATH")
+    places_local_min_results: int = Field(3, alias="PLACES_LOCAL_MIN_RESULTS")
     openai_api_key: str | None = Field(default=None, alias="OPENAI_API_KEY")
     google_ai_api_key: str | None = Field(default=None, alias="GOOGLE_AI_API_KEY")
     llm_provider: Literal["openai", "google", "gpt-oss"] | None = Field(
         default=None, alias="LLM_PROVIDER"
     )
     gpt_oss_base_url: str | None = Field(default=None, alias="GPT_OSS_BASE_URL")
+    gpt_oss_base_urls: str | None = Field(default=None, alias="GPT_OSS_BASE_URLS")
     gpt_oss_api_key: str | None = Field(default=None, alias="GPT_OSS_API_KEY")
+    openai_model: str = Field("gpt-4o-mini", alias="OPENAI_MODEL")
+    openai_base_url: str | None = Field(default=None, alias="OPENAI_BASE_URL")
+    google_ai_model: str = Field("gemini-1.5-flash", alias="GOOGLE_AI_MODEL")
+    google_ai_base_url: str | None = Field(default=None, alias="GOOGLE_AI_BASE_URL")
+    llm_constrained_decoding: bool = Field(False, alias="LLM_CONSTRAINED_DECODING")
+    shared_schema_dir: str | None = Field(default=None, alias="SHARED_SCHEMA_DIR")
     redis_url: str = Field("redis://redis:6379/0", alias="REDIS_URL")
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_socket_timeout_s: float = Field(2.0, alias="REDIS_SOCKET_TIMEOUT_S")
+    cache_compress_threshold: int = Field(2048, alias="CACHE_COMPRESS_THRESHOLD")
+    cache_local_max_entries: int = Field(1024, alias="CACHE_LOCAL_MAX_ENTRIES")
+    cache_local_ttl_s: float = Field(2.0, alias="CACHE_LOCAL_TTL_S")
+    cache_store_path: str | None = Field(default=None, alias="CACHE_STORE_PATH")
+    cache_store_ttl_s: int = Field(86400, alias="CACHE_STORE_TTL_S")
+    cache_store_compact_interval_s: float = Field(600.0, alias="CACHE_STORE_COMPACT_INTERVAL_S")
+    cache_store_warm_keys: int = Field(2000, alias="CACHE_STORE_WARM_KEYS")
+    cache_warm_top_k: int = Field(100, alias="CACHE_WARM_TOP_K")
+    cache_warm_budget: int = Field(20, alias="CACHE_WARM_BUDGET")
+    cache_warm_interval_s: float = Field(30.0, alias="CACHE_WARM_INTERVAL_S")
+    cache_warm_refresh_before_s: float = Field(60.0, alias="CACHE_WARM_REFRESH_BEFORE_S")
+    cache_warm_decay_half_life_s: float = Field(3600.0, alias="CACHE_WARM_DECAY_HALF_LIFE_S")
+    compression_min_size: int = Field(1024, alias="COMPRESSION_MIN_SIZE")
+    compression_encodings: str = Field("zstd,br,gzip", alias="COMPRESSION_ENCODINGS")
+    compression_levels: dict[str, dict[str, int]] = Field(
+        default_factory=dict, alias="COMPRESSION_LEVELS"
+    )
+    compression_cache_bytes: int = Field(16 * 1024 * 1024, alias="COMPRESSION_CACHE_BYTES")
+    live_eta_min_interval_s: float = Field(30.0, alias="LIVE_ETA_MIN_INTERVAL_S")
+    live_eta_max_interval_s: float = Field(300.0, alias="LIVE_ETA_MAX_INTERVAL_S")
+    live_eta_heartbeat_s: float = Field(15.0, alias="LIVE_ETA_HEARTBEAT_S")
+    cpu_executor_kind: Literal["thread", "process"] = Field("thread", alias="CPU_EXECUTOR_KIND")
+    cpu_executor_workers: int | None = Field(default=None, alias="CPU_EXECUTOR_WORKERS")
+    cpu_offload_threshold: int = Field(16 * 1024, alias="CPU_OFFLOAD_THRESHOLD")
     database_url: str = Field(
         "postgresql://bifrost:bifrost@db:5432/bifrost", alias="DATABASE_URL"
     )
+    db_pool_min_size: int = Field(1, alias="DB_POOL_MIN_SIZE")
+    db_pool_max_size: int = Field(10, alias="DB_POOL_MAX_SIZE")
+    export_database_url: str | None = Field(default=None, alias="EXPORT_DATABASE_URL")
+    export_max_concurrent: int = Field(2, alias="EXPORT_MAX_CONCURRENT")
+    export_batch_size: int = Field(500, alias="EXPORT_BATCH_SIZE")
+    plan_partition_months_ahead: int = Field(3, alias="PLAN_PARTITION_MONTHS_AHEAD")
+    plan_retention_months: int = Field(0, alias="PLAN_RETENTION_MONTHS")
+    plan_archive_dir: str | None = Field(default=None, alias="PLAN_ARCHIVE_DIR")
+    plan_partition_interval_s: float = Field(3600.0, alias="PLAN_PARTITION_INTERVAL_S")
+    run_migrations_on_startup: bool = Field(True, alias="RUN_MIGRATIONS_ON_STARTUP")
+    ai_job_ttl_s: int = Field(86400, alias="AI_JOB_TTL_S")
+    ai_job_max_wait_s: float = Field(25.0, alias="AI_JOB_MAX_WAIT_S")
+    ai_job_llm_timeout_s: float = Field(120.0, alias="AI_JOB_LLM_TIMEOUT_S")
+    ai_worker_concurrency: int = Field(4, alias="AI_WORKER_CONCURRENCY")
+    ai_jobs_inline_worker: bool = Field(False, alias="AI_JOBS_INLINE_WORKER")
+    readiness_interval_s: float = Field(5.0, alias="READINESS_INTERVAL_S")
+    readiness_timeout_s: float = Field(1.0, alias="READINESS_TIMEOUT_S")
+    readiness_max_inflight: int = Field(256, alias="READINESS_MAX_INFLIGHT")
+    readiness_pool_saturation: float = Field(0.9, alias="READINESS_POOL_SATURATION")
     testing: bool = Field(False, alias="TESTING")
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
+    @field_validator("cpu_executor_workers", "shared_schema_dir", mode="before")
+    @classmethod
+    def _empty_as_unset(cls, value: object) -> object:
+        # ``.env.example`` leaves these blank to mean "use the default".
+        return None if value == "" else value
+
 
 @lru_cache
 def get_settings() -> Settings:
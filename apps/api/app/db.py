@@ -0,0 +1,66 @@
+"""Lazily created asyncpg pool shared by the repositories."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import asyncpg
+
+
+class Database:
+    """Own the asyncpg pool, creating it on first use or during warm-up.
+
+    Workers start serving health checks immediately; the pool is opened in the
+    background by :meth:`warm_up` or by the first query, whichever comes first.
+    """
+
+    def __init__(self, dsn: str, *, min_size: int = 1, max_size: int = 10) -> None:
+        self._dsn = dsn
+        self._min_size = min_size
+        self._max_size = max_size
+        self._pool: asyncpg.Pool | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def pool(self) -> asyncpg.Pool | None:
+        """The pool if it has been created, without triggering creation."""
+        return self._pool
+
+    async def get_pool(self) -> asyncpg.Pool:
+        if self._pool is not None:
+            return self._pool
+        async with self._lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    dsn=self._dsn,
+                    min_size=self._min_size,
+                    max_size=self._max_size,
+                )
+        return self._pool
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def connect(self, *, application_name: str | None = None) -> AsyncIterator[asyncpg.Connection]:
+        """A standalone connection for long-running work that must not hold a pool slot."""
+        settings = {"application_name": application_name} if application_name else None
+        conn = await asyncpg.connect(dsn=self._dsn, server_settings=settings)
+        try:
+            yield conn
+        finally:
+            await conn.close()
+
+    async def warm_up(self) -> None:
+        """Open the pool's minimum connections ahead of the first request."""
+        await self.get_pool()
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
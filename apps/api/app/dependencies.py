@@ -1,14 +1,21 @@
 """Application-level dependency helpers."""
 
-import asyncpg
 from fastapi import Request
-from redis.asyncio import Redis
 
 from app.adapters.llm import LLMAdapter
 from app.adapters.places import PlacesAdapter
 from app.adapters.routes import RoutesAdapter
+from app.cache import CacheClient
+from app.canonical import GeocodeResolver
 from app.config import Settings, get_settings
+from app.db import Database
+from app.executor import CPUExecutor
+from app.export import PlanExporter
+from app.jobs import PlanJobQueue
+from app.live import LiveRouteHub
+from app.replan import Replanner
 from app.repositories.plans import PlanRepository
+from app.warming import RequestFrequencyTracker
 
 
 def get_app_settings() -> Settings:
@@ -16,14 +23,29 @@ def get_app_settings() -> Settings:
     return get_settings()
 
 
-async def get_redis(request: Request) -> Redis | None:
-    """Return the Redis client stored on the application state, if any."""
-    return getattr(request.app.state, "redis", None)
+async def get_cache(request: Request) -> CacheClient | None:
+    """Return the cache client stored on the application state, if any."""
+    return getattr(request.app.state, "cache", None)
 
 
-async def get_db_pool(request: Request) -> asyncpg.Pool | None:
-    """Return the asyncpg pool stored on the application state, if any."""
-    return getattr(request.app.state, "db_pool", None)
+async def get_frequency_tracker(request: Request) -> RequestFrequencyTracker | None:
+    """Return the request-frequency tracker used for cache warming, if any."""
+    return getattr(request.app.state, "frequency_tracker", None)
+
+
+async def get_geocode_resolver(request: Request) -> GeocodeResolver | None:
+    """Return the resolver used to canonicalize route endpoints, if any."""
+    return getattr(request.app.state, "geocode_resolver", None)
+
+
+async def get_cpu_executor(request: Request) -> CPUExecutor | None:
+    """Return the pool for CPU-bound work, if any."""
+    return getattr(request.app.state, "cpu_executor", None)
+
+
+async def get_database(request: Request) -> Database | None:
+    """Return the database handle stored on the application state, if any."""
+    return getattr(request.app.state, "database", None)
 
 
 def get_routes_adapter(request: Request) -> RoutesAdapter:
@@ -56,3 +78,35 @@ def get_plan_repository(request: Request) -> PlanRepository:
     if repo is None:
         raise RuntimeError("Plan repository is not configured")
     return repo
+
+
+def get_plan_job_queue(request: Request) -> PlanJobQueue:
+    """Provide the AI plan job queue."""
+    queue = getattr(request.app.state, "plan_job_queue", None)
+    if queue is None:
+        raise RuntimeError("Plan job queue is not configured")
+    return queue
+
+
+def get_replanner(request: Request) -> Replanner:
+    """Provide the incremental re-planner."""
+    replanner = getattr(request.app.state, "replanner", None)
+    if replanner is None:
+        raise RuntimeError("Replanner is not configured")
+    return replanner
+
+
+def get_live_route_hub(request: Request) -> LiveRouteHub:
+    """Provide the hub that shares live route polling between subscribers."""
+    hub = getattr(request.app.state, "live_routes", None)
+    if hub is None:
+        raise RuntimeError("Live route hub is not configured")
+    return hub
+
+
+def get_plan_exporter(request: Request) -> PlanExporter:
+    """Provide the bulk plan exporter."""
+    exporter = getattr(request.app.state, "plan_exporter", None)
+    if exporter is None:
+        raise RuntimeError("Plan exporter is not configured")
+    return exporter
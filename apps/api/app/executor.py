@@ -0,0 +1,128 @@
+"""Pool for CPU-bound work that would otherwise stall the event loop.
+
+Small inputs run inline, where a pool hop would cost more than the work.
+Inputs at or above ``inline_threshold`` go to the pool. On a thread pool the
+loop still gets the GIL every switch interval, and hashing or compression
+release it entirely. A process pool gives full parallelism, but only for
+picklable callables (functions, static and class methods). Callers pass
+``picklable=False`` for work bound to in-process state, which stays on threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Literal, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class OffloadStats:
+    """Timing for one kind of offloaded task, in seconds."""
+
+    count: int = 0
+    inline: int = 0
+    queued_s: float = 0.0
+    run_s: float = 0.0
+    max_run_s: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "offloaded": self.count,
+            "inline": self.inline,
+            "avg_queue_ms": round(self.queued_s / self.count * 1000, 2) if self.count else 0.0,
+            "avg_run_ms": round(self.run_s / self.count * 1000, 2) if self.count else 0.0,
+            "max_run_ms": round(self.max_run_s * 1000, 2),
+        }
+
+
+def _timed(func: Callable[..., T], *args: Any) -> tuple[T, float, float]:
+    # CLOCK_MONOTONIC is system-wide, so timestamps compare across processes.
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+class CPUExecutor:
+    """Run CPU-heavy callables inline or on a thread/process pool by input size."""
+
+    def __init__(
+        self,
+        *,
+        kind: Literal["thread", "process"] = "thread",
+        max_workers: int | None = None,
+        inline_threshold: int = 16 * 1024,
+    ) -> None:
+        workers = max_workers or min(4, os.cpu_count() or 1)
+        self.kind = kind
+        self.inline_threshold = inline_threshold
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+        self._processes: Executor | None = None
+        if kind == "process":
+            # Forking a process that runs an event loop and client threads is
+            # unsafe; forkserver children start from a clean interpreter.
+            self._processes = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+        self._stats: dict[str, OffloadStats] = {}
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        size: int | None,
+        label: str = "cpu",
+        picklable: bool = True,
+    ) -> T:
+        """Call ``func(*args)``, offloading when ``size`` reaches the threshold.
+
+        ``size`` is the input length in bytes or characters; ``None`` marks work
+        that is always heavy (graph search) and always goes to the pool.
+        """
+        stats = self._stats.setdefault(label, OffloadStats())
+        if size is not None and size < self.inline_threshold:
+            stats.inline += 1
+            return func(*args)
+
+        pool = self._processes if picklable and self._processes is not None else self._threads
+        submitted = time.monotonic()
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(
+            pool, partial(_timed, func, *args)
+        )
+        stats.count += 1
+        stats.queued_s += max(0.0, started - submitted)
+        stats.run_s += finished - started
+        stats.max_run_s = max(stats.max_run_s, finished - started)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "inline_threshold": self.inline_threshold,
+            "tasks": {label: stats.snapshot() for label, stats in self._stats.items()},
+        }
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_cpu(
+    executor: CPUExecutor | None,
+    func: Callable[..., T],
+    *args: Any,
+    size: int | None,
+    label: str = "cpu",
+    picklable: bool = True,
+) -> T:
+    """Use ``executor`` when configured, otherwise call ``func`` inline."""
+    if executor is None:
+        return func(*args)
+    return await executor.run(func, *args, size=size, label=label, picklable=picklable)
@@ -0,0 +1,134 @@
+"""Streaming bulk export of stored plans as NDJSON or a GeoJSON FeatureCollection."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, AsyncIterator, Literal
+
+import orjson
+
+from app.executor import CPUExecutor, run_cpu
+from app.repositories.plans import ExportedPlan, ExportPosition, PlanRepository
+
+ExportFormat = Literal["ndjson", "geojson"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "geojson": "application/geo+json",
+}
+
+_FEATURE_COLLECTION_START = b'{"type":"FeatureCollection","features":['
+_FEATURE_COLLECTION_END = b"]}"
+
+
+def ndjson_lines(batch: list[ExportedPlan]) -> bytes:
+    """One ``{"cursor", "created_at", "version", "plan"}`` line per plan.
+
+    The plan document is spliced in as stored, without parsing it.
+    """
+    return b"".join(
+        b'{"cursor":"%s","created_at":"%s","version":%d,"plan":%s}\n'
+        % (
+            plan.position.token().encode(),
+            plan.position.created_at.isoformat().encode(),
+            plan.version,
+            plan.document.encode(),
+        )
+        for plan in batch
+    )
+
+
+def geojson_features(batch: list[ExportedPlan]) -> bytes:
+    """Comma-joined Point features, one per segment POI, for a batch of plans."""
+    features: list[bytes] = []
+    for plan in batch:
+        document: dict[str, Any] = orjson.loads(plan.document)
+        cursor = plan.position.token()
+        for day_index, day in enumerate(document.get("days") or []):
+            for segment_index, segment in enumerate(day.get("segments") or []):
+                poi = segment.get("poi")
+                if not poi:
+                    continue
+                features.append(
+                    orjson.dumps(
+                        {
+                            "type": "Feature",
+                            "id": f"{document['id']}/{day_index}/{segment_index}",
+                            "geometry": {"type": "Point", "coordinates": [poi["lng"], poi["lat"]]},
+                            "properties": {
+                                "plan_id": document["id"],
+                                "cursor": cursor,
+                                "day": day_index,
+                                "date": day.get("date"),
+                                "segment": segment_index,
+                                "start_time": segment.get("start_time"),
+                                "end_time": segment.get("end_time"),
+                                "title": segment.get("title"),
+                                "travel_mode": segment.get("travel_mode"),
+                                "poi_id": poi.get("id"),
+                                "name": poi.get("name"),
+                            },
+                        }
+                    )
+                )
+    return b",".join(features)
+
+
+class PlanExporter:
+    """Run bulk exports, at most ``max_concurrent`` at a time."""
+
+    def __init__(
+        self,
+        *,
+        executor: CPUExecutor | None = None,
+        max_concurrent: int = 2,
+        batch_size: int = 500,
+    ) -> None:
+        self._executor = executor
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._batch_size = batch_size
+
+    @property
+    def busy(self) -> bool:
+        return self._slots.locked()
+
+    async def stream(
+        self,
+        repository: PlanRepository,
+        export_format: ExportFormat,
+        *,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        after: ExportPosition | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Encode each fetched batch and yield it as soon as it is ready."""
+        async with self._slots:
+            encode = ndjson_lines if export_format == "ndjson" else geojson_features
+            if export_format == "geojson":
+                yield _FEATURE_COLLECTION_START
+            separator = b""
+            batches = repository.export_plans(
+                created_from=created_from,
+                created_to=created_to,
+                after=after,
+                batch_size=self._batch_size,
+            )
+            # Closing promptly on disconnect releases the export connection.
+            async with aclosing(batches):
+                async for batch in batches:
+                    chunk = await run_cpu(
+                        self._executor,
+                        encode,
+                        batch,
+                        size=sum(len(plan.document) for plan in batch),
+                        label="export_encode",
+                    )
+                    if not chunk:
+                        continue
+                    if export_format == "geojson":
+                        chunk, separator = separator + chunk, b","
+                    yield chunk
+            if export_format == "geojson":
+                yield _FEATURE_COLLECTION_END
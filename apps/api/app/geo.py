@@ -0,0 +1,92 @@
+"""Geometry helpers shared by the routing and places adapters."""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, List, Sequence, Tuple
+
+EARTH_RADIUS_M = 6_371_008.8
+
+LatLng = Tuple[float, float]
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in metres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def encode_polyline(points: Iterable[LatLng]) -> str:
+    """Encode coordinates using Google's polyline algorithm (precision 1e5)."""
+    chunks: List[str] = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        ilat, ilng = round(lat * 1e5), round(lng * 1e5)
+        for delta in (ilat - prev_lat, ilng - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(chunks)
+
+
+def decode_polyline(polyline: str) -> List[LatLng]:
+    """Decode a Google encoded polyline into ``(lat, lng)`` pairs."""
+    index = lat = lng = 0
+    coordinates: List[LatLng] = []
+
+    length = len(polyline)
+    while index < length:
+        shift = result = 0
+        while True:
+            if index >= length:
+                raise ValueError("Invalid polyline encoding")
+            b = ord(polyline[index]) - 63
+            index += 1
+            result |= (b & 0x1F) << shift
+            shift += 5
+            if b < 0x20:
+                break
+        lat += ~(result >> 1) if result & 1 else result >> 1
+
+        shift = result = 0
+        while True:
+            if index >= length:
+                raise ValueError("Invalid polyline encoding")
+            b = ord(polyline[index]) - 63
+            index += 1
+            result |= (b & 0x1F) << shift
+            shift += 5
+            if b < 0x20:
+                break
+        lng += ~(result >> 1) if result & 1 else result >> 1
+
+        coordinates.append((lat / 1e5, lng / 1e5))
+
+    return coordinates
+
+
+def parse_lat_lng(text: str) -> LatLng | None:
+    """Parse ``"lat,lng"`` strings; return ``None`` for anything else."""
+    parts = text.split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        lat, lng = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def path_length_m(points: Sequence[LatLng]) -> float:
+    return sum(
+        haversine_m(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:])
+    )
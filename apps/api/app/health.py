@@ -0,0 +1,189 @@
+"""Readiness probing of backing services with cached, background-refreshed results."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Iterable
+
+from app.adapters.circuit import CircuitBreaker
+from app.cache import CacheClient
+from app.db import Database
+from app.executor import CPUExecutor
+
+
+class RequestLoad:
+    """Count in-flight HTTP requests for saturation reporting."""
+
+    def __init__(self) -> None:
+        self.inflight = 0
+        self.peak = 0
+
+    def reset_peak(self) -> int:
+        peak, self.peak = self.peak, self.inflight
+        return peak
+
+
+class RequestLoadMiddleware:
+    """ASGI middleware maintaining a :class:`RequestLoad` counter."""
+
+    def __init__(self, app: Any, load: RequestLoad) -> None:
+        self.app = app
+        self.load = load
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        load = self.load
+        load.inflight += 1
+        load.peak = max(load.peak, load.inflight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            load.inflight -= 1
+
+
+class ReadinessMonitor:
+    """Probe Redis, Postgres and upstream circuits on an interval.
+
+    Probe requests only ever read :attr:`report`, so readiness checks add no
+    load or latency to the dependencies regardless of how often they are polled.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache: CacheClient | None,
+        database: Database | None,
+        circuits: Iterable[CircuitBreaker],
+        load: RequestLoad,
+        executor: CPUExecutor | None = None,
+        interval_s: float = 5.0,
+        timeout_s: float = 1.0,
+        max_inflight: int = 256,
+        pool_saturation: float = 0.9,
+    ) -> None:
+        self._cache = cache
+        self._database = database
+        self._circuits = list(circuits)
+        self._load = load
+        self._executor = executor
+        self._interval_s = interval_s
+        self._timeout_s = timeout_s
+        self._max_inflight = max_inflight
+        self._pool_saturation = pool_saturation
+        self._task: asyncio.Task[None] | None = None
+        self.report: dict[str, Any] = {"ready": False, "status": "starting"}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def current(self) -> dict[str, Any]:
+        """Return the cached report, marking it unready once it goes stale."""
+        report = self.report
+        checked_at = report.get("checked_at")
+        if checked_at is not None and time.time() - checked_at > self._interval_s * 3:
+            return {**report, "ready": False, "status": "stale"}
+        return report
+
+    async def refresh(self) -> dict[str, Any]:
+        redis_check, db_check = await asyncio.gather(self._check_redis(), self._check_db())
+        upstreams = {circuit.name: circuit.snapshot() for circuit in self._circuits}
+        saturation = self._saturation(db_check)
+
+        ready = redis_check["ok"] and db_check["ok"] and not saturation["saturated"]
+        # An open circuit affects every instance equally, so it degrades rather
+        # than drains: pulling all pods would turn an upstream outage into ours.
+        degraded = any(state["state"] != "closed" for state in upstreams.values())
+        if not ready:
+            status = "unavailable"
+        elif degraded:
+            status = "degraded"
+        else:
+            status = "ok"
+
+        self.report = {
+            "ready": ready,
+            "status": status,
+            "checked_at": time.time(),
+            "checks": {"redis": redis_check, "database": db_check, "upstreams": upstreams},
+            "saturation": saturation,
+        }
+        if self._executor is not None:
+            self.report["executor"] = self._executor.stats()
+        return self.report
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval_s)
+            try:
+                await self.refresh()
+            except Exception as exc:  # noqa: BLE001 - the loop must survive any probe error
+                self.report = {"ready": False, "status": "error", "error": repr(exc), "checked_at": time.time()}
+
+    async def _check_redis(self) -> dict[str, Any]:
+        if self._cache is None:
+            return {"ok": True, "enabled": False}
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._cache.ping(), timeout=self._timeout_s)
+        except Exception as exc:  # noqa: BLE001 - any failure means "not ready"
+            return {"ok": False, "enabled": True, "error": repr(exc)}
+        return {"ok": True, "enabled": True, "latency_ms": _elapsed_ms(started)}
+
+    async def _check_db(self) -> dict[str, Any]:
+        if self._database is None:
+            return {"ok": True, "enabled": False}
+        pool = self._database.pool
+        if pool is None:
+            # Not ready until the background warm-up has opened the pool.
+            return {"ok": False, "enabled": True, "error": "pool warming up"}
+
+        stats = {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "max_size": pool.get_max_size(),
+        }
+        started = time.perf_counter()
+        try:
+            async with pool.acquire(timeout=self._timeout_s) as conn:
+                await conn.fetchval("SELECT 1", timeout=self._timeout_s)
+        except Exception as exc:  # noqa: BLE001 - any failure means "not ready"
+            return {"ok": False, "enabled": True, "error": repr(exc), **stats}
+        return {"ok": True, "enabled": True, "latency_ms": _elapsed_ms(started), **stats}
+
+    def _saturation(self, db_check: dict[str, Any]) -> dict[str, Any]:
+        pool_usage = None
+        if db_check.get("max_size"):
+            in_use = db_check["size"] - db_check["idle"]
+            pool_usage = round(in_use / db_check["max_size"], 3)
+
+        inflight = self._load.inflight
+        peak = self._load.reset_peak()
+        saturated = inflight >= self._max_inflight or (
+            pool_usage is not None and pool_usage >= self._pool_saturation
+        )
+        return {
+            "saturated": saturated,
+            "inflight": inflight,
+            "inflight_peak": peak,
+            "inflight_limit": self._max_inflight,
+            "db_pool_usage": pool_usage,
+        }
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
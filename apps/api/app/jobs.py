@@ -0,0 +1,243 @@
+"""Job queue for AI plan generation decoupled from the HTTP request."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from redis.asyncio import Redis
+
+from app.schemas import AIPlanJob, AIPlanJobRequest
+from app.serialization import dump_json
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "aiplan:jobs:queue"
+PROCESSING_KEY = "aiplan:jobs:processing"
+# When reclaim first saw a processing id that was not yet marked running.
+CLAIMING_KEY = "aiplan:jobs:claiming"
+_JOB_KEY = "aiplan:job:{}"
+_REQUEST_KEY = "aiplan:job:{}:request"
+_DONE_CHANNEL = "aiplan:job-done:{}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PlanJobQueue(ABC):
+    """Submit, claim and complete AI plan jobs."""
+
+    @abstractmethod
+    async def submit(self, payload: AIPlanJobRequest) -> AIPlanJob:
+        """Enqueue a request and return the queued job."""
+
+    @abstractmethod
+    async def get(self, job_id: UUID) -> AIPlanJob | None:
+        """Return the current job state."""
+
+    @abstractmethod
+    async def wait(self, job_id: UUID, timeout_s: float) -> AIPlanJob | None:
+        """Return the job once finished, or its current state after ``timeout_s``."""
+
+    @abstractmethod
+    async def claim(self, timeout_s: float) -> tuple[AIPlanJob, AIPlanJobRequest] | None:
+        """Take the next queued job and mark it running."""
+
+    @abstractmethod
+    async def complete(self, job: AIPlanJob) -> None:
+        """Store a finished job and wake its waiters."""
+
+
+class RedisPlanJobQueue(PlanJobQueue):
+    """Reliable Redis list queue shared by API processes and workers.
+
+    Claimed ids move atomically to a processing list; jobs left there past
+    ``lease_s`` by a crashed worker are re-queued by :meth:`reclaim_stale`.
+    Completion is broadcast on a per-job channel, and each process keeps one
+    pattern subscription that wakes local long-polls.
+    """
+
+    def __init__(self, redis: Redis, *, ttl_s: int = 86400, lease_s: float = 300.0) -> None:
+        self._redis = redis
+        self._ttl_s = ttl_s
+        self._lease_s = lease_s
+        self._waiters: dict[str, list[asyncio.Future[None]]] = {}
+        self._listener: asyncio.Task[None] | None = None
+
+    async def submit(self, payload: AIPlanJobRequest) -> AIPlanJob:
+        now = _now()
+        job = AIPlanJob(id=uuid4(), status="queued", created_at=now, updated_at=now)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(_JOB_KEY.format(job.id), dump_json(job), ex=self._ttl_s)
+            pipe.set(_REQUEST_KEY.format(job.id), dump_json(payload), ex=self._ttl_s)
+            pipe.lpush(QUEUE_KEY, str(job.id))
+            await pipe.execute()
+        return job
+
+    async def get(self, job_id: UUID) -> AIPlanJob | None:
+        raw = await self._redis.get(_JOB_KEY.format(job_id))
+        return AIPlanJob.model_validate_json(raw) if raw else None
+
+    async def wait(self, job_id: UUID, timeout_s: float) -> AIPlanJob | None:
+        if timeout_s <= 0:
+            return await self.get(job_id)
+        self._ensure_listener()
+        key = str(job_id)
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        try:
+            # Subscribe first, then read, so a completion in between is not missed.
+            job = await self.get(job_id)
+            if job is None or job.status in ("succeeded", "failed"):
+                return job
+            try:
+                await asyncio.wait_for(future, timeout_s)
+            except asyncio.TimeoutError:
+                pass
+            return await self.get(job_id)
+        finally:
+            waiters = self._waiters.get(key, [])
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._waiters.pop(key, None)
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        pubsub = self._redis.pubsub()
+        await pubsub.psubscribe(_DONE_CHANNEL.format("*"))
+        prefix = _DONE_CHANNEL.format("")
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                channel = message["channel"]
+                job_id = (channel.decode() if isinstance(channel, bytes) else channel)[len(prefix):]
+                for future in self._waiters.get(job_id, []):
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            await pubsub.aclose()
+
+    async def claim(self, timeout_s: float) -> tuple[AIPlanJob, AIPlanJobRequest] | None:
+        raw_id = await self._redis.blmove(QUEUE_KEY, PROCESSING_KEY, timeout_s, "RIGHT", "LEFT")
+        if raw_id is None:
+            return None
+        job_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+        raw_job, raw_request = await self._redis.mget(
+            [_JOB_KEY.format(job_id), _REQUEST_KEY.format(job_id)]
+        )
+        if raw_job is None or raw_request is None:
+            # Expired while queued; drop it.
+            await self._redis.lrem(PROCESSING_KEY, 1, job_id)
+            return None
+        job = AIPlanJob.model_validate_json(raw_job).model_copy(
+            update={"status": "running", "updated_at": _now()}
+        )
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(_JOB_KEY.format(job_id), dump_json(job), ex=self._ttl_s)
+            pipe.hdel(CLAIMING_KEY, job_id)
+            await pipe.execute()
+        return job, AIPlanJobRequest.model_validate_json(raw_request)
+
+    async def complete(self, job: AIPlanJob) -> None:
+        job_id = str(job.id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(_JOB_KEY.format(job_id), dump_json(job), ex=self._ttl_s)
+            pipe.delete(_REQUEST_KEY.format(job_id))
+            pipe.lrem(PROCESSING_KEY, 1, job_id)
+            pipe.hdel(CLAIMING_KEY, job_id)
+            pipe.publish(_DONE_CHANNEL.format(job_id), job.status)
+            await pipe.execute()
+
+    async def reclaim_stale(self) -> int:
+        """Re-queue jobs whose worker stopped before completing them.
+
+        A running job's lease starts at its ``updated_at``. An id that is in
+        the processing list but not yet running may be between ``BLMOVE`` and
+        the status write in :meth:`claim`, so its lease starts when reclaim
+        first sees it there; it is re-queued only if it is still not running
+        a full lease later.
+        """
+        reclaimed = 0
+        now = _now().timestamp()
+        deadline = now - self._lease_s
+        for raw_id in await self._redis.lrange(PROCESSING_KEY, 0, -1):
+            job_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            job = await self.get(UUID(job_id))
+            if job is not None and job.status == "running":
+                if job.updated_at.timestamp() > deadline:
+                    continue
+            elif job is not None:
+                await self._redis.hsetnx(CLAIMING_KEY, job_id, repr(now))
+                seen_at = await self._redis.hget(CLAIMING_KEY, job_id)
+                if seen_at is None or float(seen_at) > deadline:
+                    continue
+            if await self._redis.lrem(PROCESSING_KEY, 1, job_id) and job is not None:
+                queued = job.model_copy(update={"status": "queued", "updated_at": _now()})
+                await self._redis.set(_JOB_KEY.format(job_id), dump_json(queued), ex=self._ttl_s)
+                await self._redis.lpush(QUEUE_KEY, job_id)
+                reclaimed += 1
+            await self._redis.hdel(CLAIMING_KEY, job_id)
+        return reclaimed
+
+    async def aclose(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+class InMemoryPlanJobQueue(PlanJobQueue):
+    """Process-local queue used for testing and single-process development."""
+
+    def __init__(self) -> None:
+        self._jobs: dict[UUID, AIPlanJob] = {}
+        self._requests: dict[UUID, AIPlanJobRequest] = {}
+        self._done: dict[UUID, asyncio.Event] = {}
+        self._queue: asyncio.Queue[UUID] = asyncio.Queue()
+
+    async def submit(self, payload: AIPlanJobRequest) -> AIPlanJob:
+        now = _now()
+        job = AIPlanJob(id=uuid4(), status="queued", created_at=now, updated_at=now)
+        self._jobs[job.id] = job
+        self._requests[job.id] = payload
+        self._done[job.id] = asyncio.Event()
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get(self, job_id: UUID) -> AIPlanJob | None:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: UUID, timeout_s: float) -> AIPlanJob | None:
+        done = self._done.get(job_id)
+        if done is not None and timeout_s > 0:
+            try:
+                await asyncio.wait_for(done.wait(), timeout_s)
+            except asyncio.TimeoutError:
+                pass
+        return self._jobs.get(job_id)
+
+    async def claim(self, timeout_s: float) -> tuple[AIPlanJob, AIPlanJobRequest] | None:
+        try:
+            job_id = await asyncio.wait_for(self._queue.get(), timeout_s)
+        except asyncio.TimeoutError:
+            return None
+        job = self._jobs[job_id].model_copy(update={"status": "running", "updated_at": _now()})
+        self._jobs[job_id] = job
+        return job, self._requests.pop(job_id)
+
+    async def complete(self, job: AIPlanJob) -> None:
+        self._jobs[job.id] = job
+        self._done[job.id].set()
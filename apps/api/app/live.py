@@ -0,0 +1,247 @@
+"""Live route ETAs: one upstream poller per distinct route, fanned out to subscribers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+import orjson
+
+from app.adapters.routes import RoutesAdapter
+from app.cache import CacheClient
+from app.schemas import Plan, PlaceItem, RoutesComputeRequest, RoutesComputeResponse
+from app.serialization import dump_json
+
+logger = logging.getLogger(__name__)
+
+LIVE_LOCK_PREFIX = "routes:live-lock"
+ROUTE_REQUEST_PREFIX = "routes:request"
+# Fields compared between polls; ``polyline`` changes only on a reroute.
+_DELTA_FIELDS = ("duration_s", "distance_m", "polyline")
+# Google Routes accepts at most 25 intermediate waypoints.
+MAX_WAYPOINTS = 25
+
+
+def route_request_key(cache_key: str) -> str:
+    """Where the request behind a cached route result is kept, so it can be re-polled."""
+    return f"{ROUTE_REQUEST_PREFIX}:{cache_key.rpartition(':')[2]}"
+
+
+def _point(poi: PlaceItem) -> str:
+    return f"{poi.lat:.5f},{poi.lng:.5f}"
+
+
+def plan_route_request(plan: Plan, day: int | None = None) -> RoutesComputeRequest:
+    """The drive through a plan's stops: the whole trip, or one ``day`` of it.
+
+    A day starts where the previous day's stops ended and ends at its own
+    last stop, except that the first and last days use the plan's origin and
+    destination. Raises ``ValueError`` for a missing day or too many stops.
+    """
+    days = plan.days if day is None else plan.days[day : day + 1]
+    if day is not None and not days:
+        raise ValueError(f"day {day} does not exist")
+
+    points: list[str] = []
+    for plan_day in days:
+        for segment in plan_day.segments:
+            if segment.poi is not None and (not points or points[-1] != _point(segment.poi)):
+                points.append(_point(segment.poi))
+
+    origin, destination = plan.origin, plan.destination
+    if day is not None:
+        if day > 0:
+            earlier = [s.poi for d in plan.days[:day] for s in d.segments if s.poi is not None]
+            if earlier:
+                origin = _point(earlier[-1])
+        if day < len(plan.days) - 1 and points:
+            destination = points.pop()
+    if len(points) > MAX_WAYPOINTS:
+        raise ValueError(f"{len(points)} stops exceed the {MAX_WAYPOINTS} waypoint limit")
+    return RoutesComputeRequest(origin=origin, destination=destination, waypoints=points)
+
+
+@dataclass
+class LiveEvent:
+    """One server-sent event: ``route`` carries the full result, ``delta`` only changes."""
+
+    kind: str
+    version: int
+    data: dict[str, Any]
+
+    def encode(self) -> bytes:
+        payload = orjson.dumps({"version": self.version, **self.data})
+        return b"event: %s\nid: %d\ndata: %s\n\n" % (self.kind.encode(), self.version, payload)
+
+
+@dataclass
+class _Feed:
+    key: str
+    payload: RoutesComputeRequest
+    interval_s: float
+    subscribers: set[asyncio.Queue[LiveEvent]] = field(default_factory=set)
+    latest: RoutesComputeResponse | None = None
+    version: int = 0
+    task: asyncio.Task[None] | None = None
+
+    def snapshot(self) -> LiveEvent | None:
+        if self.latest is None:
+            return None
+        return LiveEvent("route", self.version, self.latest.model_dump(mode="json"))
+
+    def offer(self, queue: asyncio.Queue[LiveEvent], event: LiveEvent) -> None:
+        """Queue ``event``; a subscriber that fell behind is resynced with a snapshot."""
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            snapshot = self.snapshot()
+            if snapshot is not None:
+                queue.put_nowait(snapshot)
+
+
+def route_delta(
+    previous: RoutesComputeResponse, current: RoutesComputeResponse
+) -> dict[str, Any] | None:
+    """Fields of ``current`` that differ from ``previous``; ``None`` when nothing changed."""
+    delta: dict[str, Any] = {
+        name: getattr(current, name)
+        for name in _DELTA_FIELDS
+        if getattr(current, name) != getattr(previous, name)
+    }
+    if current.alternatives != previous.alternatives:
+        delta["alternatives"] = [alternative.model_dump() for alternative in current.alternatives]
+    return delta or None
+
+
+class LiveRouteHub:
+    """Poll each subscribed route once and push changes to every subscriber.
+
+    The first subscriber to a route starts a poller and the last one to leave
+    stops it, so upstream calls scale with distinct routes rather than
+    clients. The poll interval halves (down to ``min_interval_s``) when the
+    route changed and grows by half (up to ``max_interval_s``) while it is
+    stable. With a cache, a Redis lock elects one process per route and tick
+    to call upstream; the others read the refreshed cache entry, which plain
+    ``/routes/compute`` requests also benefit from.
+    """
+
+    def __init__(
+        self,
+        adapter: RoutesAdapter,
+        *,
+        cache: CacheClient | None = None,
+        cache_ttl_s: int = 300,
+        min_interval_s: float = 30.0,
+        max_interval_s: float = 300.0,
+        heartbeat_s: float = 15.0,
+        queue_size: int = 16,
+    ) -> None:
+        self._adapter = adapter
+        self._cache = cache
+        self._cache_ttl_s = cache_ttl_s
+        self._min_interval_s = min_interval_s
+        self._max_interval_s = max_interval_s
+        self.heartbeat_s = heartbeat_s
+        self._queue_size = queue_size
+        self._feeds: dict[str, _Feed] = {}
+        self.upstream_calls = 0
+
+    @asynccontextmanager
+    async def subscribe(
+        self, key: str, payload: RoutesComputeRequest
+    ) -> AsyncIterator[asyncio.Queue[LiveEvent]]:
+        """Yield a queue of events for the route cached under ``key``."""
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = _Feed(key, payload, self._min_interval_s)
+        queue: asyncio.Queue[LiveEvent] = asyncio.Queue(maxsize=self._queue_size)
+        snapshot = feed.snapshot()
+        if snapshot is not None:
+            queue.put_nowait(snapshot)
+        feed.subscribers.add(queue)
+        if feed.task is None:
+            feed.task = asyncio.create_task(self._poll(feed))
+        try:
+            yield queue
+        finally:
+            feed.subscribers.discard(queue)
+            if not feed.subscribers and self._feeds.get(key) is feed:
+                del self._feeds[key]
+                if feed.task is not None:
+                    feed.task.cancel()
+
+    async def _poll(self, feed: _Feed) -> None:
+        while True:
+            try:
+                response = await self._refresh(feed)
+            except Exception:
+                logger.warning("live route poll failed for %s", feed.key, exc_info=True)
+                feed.interval_s = min(self._max_interval_s, feed.interval_s * 2)
+            else:
+                changed = response is not None and self._publish(feed, response)
+                feed.interval_s = (
+                    max(self._min_interval_s, feed.interval_s / 2)
+                    if changed
+                    else min(self._max_interval_s, feed.interval_s * 1.5)
+                )
+            await asyncio.sleep(feed.interval_s)
+
+    async def _refresh(self, feed: _Feed) -> RoutesComputeResponse | None:
+        if self._cache is not None:
+            if feed.latest is None:
+                # A recent /routes/compute result is good enough for the first snapshot.
+                cached = await self._cache.get(feed.key)
+                if cached is not None:
+                    return RoutesComputeResponse.model_validate_json(cached)
+            lock_ms = max(1, int(feed.interval_s * 900))
+            elected = await self._cache.redis.set(
+                f"{LIVE_LOCK_PREFIX}:{feed.key}", b"1", nx=True, px=lock_ms
+            )
+            if not elected:
+                cached = await self._cache.get(feed.key)
+                return RoutesComputeResponse.model_validate_json(cached) if cached else None
+
+        self.upstream_calls += 1
+        response = await self._adapter.compute_route(feed.payload)
+        if self._cache is not None:
+            await self._cache.set_many(
+                {feed.key: dump_json(response), route_request_key(feed.key): dump_json(feed.payload)},
+                self._cache_ttl_s,
+            )
+        return response
+
+    def _publish(self, feed: _Feed, response: RoutesComputeResponse) -> bool:
+        """Fan out ``response`` as a snapshot or delta; ``False`` when unchanged."""
+        if feed.latest is None:
+            feed.latest, feed.version = response, 1
+            event = feed.snapshot()
+        else:
+            delta = route_delta(feed.latest, response)
+            if delta is None:
+                return False
+            feed.latest = response
+            feed.version += 1
+            event = LiveEvent("delta", feed.version, delta)
+        assert event is not None
+        for queue in feed.subscribers:
+            feed.offer(queue, event)
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "routes": len(self._feeds),
+            "subscribers": sum(len(feed.subscribers) for feed in self._feeds.values()),
+            "upstream_calls": self.upstream_calls,
+        }
+
+    async def aclose(self) -> None:
+        feeds, self._feeds = list(self._feeds.values()), {}
+        tasks = [feed.task for feed in feeds if feed.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
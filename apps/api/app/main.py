@@ -1,110 +1,456 @@
 from __future__ import annotations
 
-import asyncpg
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
 import httpx
-from fastapi import FastAPI
-from redis.asyncio import Redis
-
-from app.adapters.llm import GPTOssAdapter, LLMAdapter
-from app.adapters.places import GooglePlacesAdapter, PlacesAdapter
-from app.adapters.routes import GoogleRoutesAdapter, RoutesAdapter
-from app.config import get_settings
-from app.repositories.plans import InMemoryPlanRepository, PlanRepository, init_plan_schema
+from fastapi import FastAPI, status
+from fastapi.responses import ORJSONResponse
+
+from app.adapters.llm import GPTOssAdapter, LLMAdapter, LLMRouter
+from app.adapters.places import GooglePlacesAdapter, LocalPlacesAdapter, PlacesAdapter, PoiIndex
+from app.adapters.routes import GoogleRoutesAdapter, LocalRoutesAdapter, RoadGraph, RoutesAdapter
+from app.cache import CacheClient
+from app.cache_store import PersistentCacheStore
+from app.canonical import GeocodeResolver, PlaceCanonicalizer
+from app.compression import CompressionMiddleware, ResponseCompressor
+from app.config import Settings, get_settings
+from app.db import Database
+from app.executor import CPUExecutor
+from app.health import ReadinessMonitor, RequestLoad, RequestLoadMiddleware
+from app.jobs import InMemoryPlanJobQueue, RedisPlanJobQueue
+from app.migrate import run_migrations
+from app.export import PlanExporter
+from app.live import LiveRouteHub
+from app.replan import Replanner
+from app.repositories.partitions import PlanPartitionMaintainer
+from app.repositories.plans import InMemoryPlanRepository, PlanRepository
 from app.routers import ai, plans, places, routes
+from app.schemas import PlacesAlongRouteRequest, RoutesComputeRequest
+from app.warming import CacheWarmer, RequestFrequencyTracker, WarmTarget
+from app.worker import PlanJobWorker
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
+request_load = RequestLoad()
 
-@app.get("/healthz", tags=["monitoring"])
-async def healthz() -> dict[str, bool]:
-    """Simple health check endpoint."""
-    return {"ok": True}
+# Held briefly by whichever worker warms Redis, so a multi-worker start or a
+# rolling deploy copies the hot set once rather than once per process.
+CACHE_WARM_LOCK_KEY = "cache:warm-lock"
+
+
+async def _start_readiness(
+    app: FastAPI,
+    settings: Settings,
+    cache: CacheClient | None,
+    database: Database | None,
+    adapters: list[object],
+) -> ReadinessMonitor:
+    monitor = ReadinessMonitor(
+        cache=cache,
+        database=database,
+        executor=getattr(app.state, "cpu_executor", None),
+        circuits=[
+            circuit for adapter in adapters if (circuit := getattr(adapter, "circuit", None)) is not None
+        ],
+        load=request_load,
+        interval_s=settings.readiness_interval_s,
+        timeout_s=settings.readiness_timeout_s,
+        max_inflight=settings.readiness_max_inflight,
+        pool_saturation=settings.readiness_pool_saturation,
+    )
+    await monitor.refresh()
+    monitor.start()
+    app.state.readiness = monitor
+    return monitor
+
+
+async def _warm_up(database: Database, monitor: ReadinessMonitor) -> None:
+    """Open the pool in the background, then report ready without waiting a probe interval."""
+    try:
+        await database.warm_up()
+    finally:
+        await monitor.refresh()
+
+
+def _build_executor(settings: Settings) -> CPUExecutor:
+    return CPUExecutor(
+        kind=settings.cpu_executor_kind,
+        max_workers=settings.cpu_executor_workers,
+        inline_threshold=settings.cpu_offload_threshold,
+    )
+
+
+def _build_compressor(settings: Settings) -> ResponseCompressor:
+    return ResponseCompressor(
+        minimum_size=settings.compression_min_size,
+        encodings=tuple(
+            name.strip() for name in settings.compression_encodings.split(",") if name.strip()
+        ),
+        levels=settings.compression_levels,
+        cache_max_bytes=settings.compression_cache_bytes,
+    )
+
+
+async def _maintain_cache(cache: CacheClient, settings: Settings) -> None:
+    """Warm Redis from the persistent store, then periodically compact it."""
+    try:
+        if await cache.redis.set(CACHE_WARM_LOCK_KEY, b"1", nx=True, ex=300):
+            warmed = await cache.warm_from_store(settings.cache_store_warm_keys)
+            logger.info("warmed %d cache entries from %s", warmed, settings.cache_store_path)
+    except Exception:  # pragma: no cover - Redis may still be starting
+        logger.warning("cache warm-up from persistent store failed", exc_info=True)
+
+    while True:
+        await asyncio.sleep(settings.cache_store_compact_interval_s)
+        try:
+            await cache.maintain_store()
+        except Exception:  # pragma: no cover - keep compacting on later ticks
+            logger.warning("cache store compaction failed", exc_info=True)
 
 
-@app.on_event("startup")
-async def on_startup() -> None:
+def _start_cache_warmer(
+    app: FastAPI,
+    settings: Settings,
+    cache: CacheClient,
+    routes_adapter: RoutesAdapter,
+    places_adapter: PlacesAdapter,
+) -> None:
+    tracker = RequestFrequencyTracker(cache.redis, capacity=settings.cache_warm_top_k * 10)
+    warmer = CacheWarmer(
+        cache,
+        tracker,
+        [
+            WarmTarget(
+                prefix="routes:compute",
+                model=RoutesComputeRequest,
+                fetch=routes_adapter.compute_route,
+                ttl_s=routes.ROUTE_CACHE_TTL,
+                circuit=getattr(routes_adapter, "circuit", None),
+            ),
+            WarmTarget(
+                prefix="places:along-route",
+                model=PlacesAlongRouteRequest,
+                fetch=places_adapter.search_along_route,
+                ttl_s=places.PLACES_CACHE_TTL,
+                circuit=getattr(places_adapter, "circuit", None),
+            ),
+        ],
+        top_k=settings.cache_warm_top_k,
+        budget=settings.cache_warm_budget,
+        interval_s=settings.cache_warm_interval_s,
+        refresh_before_s=settings.cache_warm_refresh_before_s,
+        decay_half_life_s=settings.cache_warm_decay_half_life_s,
+    )
+    warmer.start()
+    app.state.frequency_tracker = tracker
+    app.state.cache_warmer = warmer
+
+
+def _build_exporter(settings: Settings, executor: CPUExecutor) -> PlanExporter:
+    return PlanExporter(
+        executor=executor,
+        max_concurrent=settings.export_max_concurrent,
+        batch_size=settings.export_batch_size,
+    )
+
+
+def _build_live_hub(
+    settings: Settings, routes_adapter: RoutesAdapter, cache: CacheClient | None
+) -> LiveRouteHub:
+    return LiveRouteHub(
+        routes_adapter,
+        cache=cache,
+        cache_ttl_s=routes.ROUTE_CACHE_TTL,
+        min_interval_s=settings.live_eta_min_interval_s,
+        max_interval_s=settings.live_eta_max_interval_s,
+        heartbeat_s=settings.live_eta_heartbeat_s,
+    )
+
+
+def _route_lookup(
+    adapter: RoutesAdapter, cache: CacheClient | None, resolver: GeocodeResolver | None
+) -> Callable[[RoutesComputeRequest], Awaitable[bytes]]:
+    async def lookup(payload: RoutesComputeRequest) -> bytes:
+        _, body = await routes.cached_route(payload, adapter, cache, resolver)
+        return body
+
+    return lookup
+
+
+def _build_routes_adapter(
+    app: FastAPI, settings: Settings, http_client: httpx.AsyncClient, executor: CPUExecutor
+) -> RoutesAdapter:
+    road_graph = RoadGraph.open(settings.routes_local_graph_path) if settings.routes_local_graph_path else None
+    app.state.road_graph = road_graph
+    local_adapter = LocalRoutesAdapter(road_graph, executor=executor) if road_graph else None
+
+    google_adapter = GoogleRoutesAdapter(
+        api_key=settings.google_routes_api_key,
+        client=http_client,
+        api_url=settings.google_routes_api_url,
+        fallback_adapter=local_adapter if settings.routes_local_mode == "fallback" else None,
+        executor=executor,
+    )
+    if road_graph and settings.routes_local_mode == "first":
+        return LocalRoutesAdapter(road_graph, upstream=google_adapter, executor=executor)
+    return google_adapter
+
+
+async def on_startup(app: FastAPI) -> None:
     """Load settings and prepare application state."""
     settings = get_settings()
     http_client = httpx.AsyncClient(timeout=httpx.Timeout(15.0))
+    executor = _build_executor(settings)
+    app.state.cpu_executor = executor
     if settings.testing:
         routes_adapter: RoutesAdapter = GoogleRoutesAdapter(
             api_key="",
             client=http_client,
+            executor=executor,
         )
         places_adapter: PlacesAdapter = GooglePlacesAdapter(
             api_key="",
             client=http_client,
+            executor=executor,
         )
         llm_adapter: LLMAdapter = GPTOssAdapter(
             base_url="",
             api_key=None,
             client=http_client,
+            executor=executor,
         )
         app.state.settings = settings
+        app.state.compression = _build_compressor(settings)
         app.state.http_client = http_client
-        app.state.redis = None
-        app.state.db_pool = None
+        app.state.cache = None
+        app.state.database = None
         app.state.routes_adapter = routes_adapter
         app.state.places_adapter = places_adapter
         app.state.llm_adapter = llm_adapter
         app.state.plan_repository = InMemoryPlanRepository()
+        app.state.plan_exporter = _build_exporter(settings, executor)
+        app.state.plan_job_queue = InMemoryPlanJobQueue()
+        app.state.plan_job_worker = PlanJobWorker(
+            app.state.plan_job_queue, llm_adapter, repository=app.state.plan_repository
+        )
+        app.state.plan_job_worker.start()
+        app.state.geocode_resolver = GeocodeResolver(
+            PlaceCanonicalizer.from_file(settings.place_aliases_path)
+        )
+        app.state.replanner = Replanner(
+            llm_adapter,
+            route_lookup=_route_lookup(routes_adapter, None, app.state.geocode_resolver),
+        )
+        app.state.live_routes = _build_live_hub(settings, routes_adapter, None)
+        await _start_readiness(
+            app, settings, None, None, [routes_adapter, places_adapter, llm_adapter]
+        )
         return
 
-    redis_client = Redis.from_url(
+    if settings.run_migrations_on_startup:
+        await run_migrations(
+            settings.database_url, partition_months_ahead=settings.plan_partition_months_ahead
+        )
+
+    cache = CacheClient.from_url(
         settings.redis_url,
-        encoding="utf-8",
-        decode_responses=True,
+        max_connections=settings.redis_max_connections,
+        socket_timeout_s=settings.redis_socket_timeout_s,
+        compress_threshold=settings.cache_compress_threshold,
+        local_max_entries=settings.cache_local_max_entries,
+        local_ttl_s=settings.cache_local_ttl_s,
+        store=(
+            PersistentCacheStore(
+                settings.cache_store_path,
+                ttl_s=settings.cache_store_ttl_s,
+                decay_interval_s=settings.cache_store_compact_interval_s,
+            )
+            if settings.cache_store_path
+            else None
+        ),
     )
 
-    db_pool = await asyncpg.create_pool(dsn=settings.database_url)
-    await init_plan_schema(db_pool)
-
-    routes_adapter: RoutesAdapter = GoogleRoutesAdapter(
-        api_key=settings.google_routes_api_key,
-        client=http_client,
+    # The pool is opened in the background so the worker accepts connections
+    # (and answers /healthz) immediately; /readyz stays 503 until it is warm.
+    database = Database(
+        settings.database_url,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
     )
 
+    routes_adapter = _build_routes_adapter(app, settings, http_client, executor)
+
     places_adapter: PlacesAdapter = GooglePlacesAdapter(
         api_key=settings.google_places_api_key,
         client=http_client,
+        api_url=settings.google_places_api_url,
+        executor=executor,
     )
+    poi_index = PoiIndex.open(settings.places_local_index_path) if settings.places_local_index_path else None
+    app.state.poi_index = poi_index
+    if poi_index:
+        places_adapter = LocalPlacesAdapter(
+            poi_index,
+            upstream=places_adapter,
+            min_results=settings.places_local_min_results,
+            executor=executor,
+        )
 
-    llm_base_url = settings.gpt_oss_base_url or ""
-    llm_api_key = settings.gpt_oss_api_key or settings.openai_api_key or ""
-    llm_adapter: LLMAdapter = GPTOssAdapter(
-        base_url=llm_base_url,
-        api_key=llm_api_key,
-        client=http_client,
-    )
+    llm_router = LLMRouter.from_settings(settings, client=http_client, executor=executor)
+    llm_adapter: LLMAdapter = llm_router
 
     app.state.settings = settings
+    app.state.compression = _build_compressor(settings)
     app.state.http_client = http_client
-    app.state.redis = redis_client
-    app.state.db_pool = db_pool
+    app.state.cache = cache
+    app.state.database = database
     app.state.routes_adapter = routes_adapter
     app.state.places_adapter = places_adapter
     app.state.llm_adapter = llm_adapter
-    app.state.plan_repository = PlanRepository(db_pool)
+    app.state.plan_repository = PlanRepository(
+        database,
+        executor=executor,
+        export_db=Database(settings.export_database_url) if settings.export_database_url else None,
+    )
+    app.state.plan_exporter = _build_exporter(settings, executor)
+    app.state.plan_partitions = PlanPartitionMaintainer(
+        database,
+        archive_dir=settings.plan_archive_dir,
+        retention_months=settings.plan_retention_months,
+        months_ahead=settings.plan_partition_months_ahead,
+        interval_s=settings.plan_partition_interval_s,
+    )
+    app.state.plan_partitions.start()
+    app.state.plan_job_queue = RedisPlanJobQueue(cache.redis, ttl_s=settings.ai_job_ttl_s)
+    if settings.ai_jobs_inline_worker:
+        # Development convenience; production runs ``python -m app.worker`` separately.
+        app.state.plan_job_worker = PlanJobWorker(
+            app.state.plan_job_queue,
+            llm_adapter,
+            repository=app.state.plan_repository,
+            concurrency=settings.ai_worker_concurrency,
+            poll_timeout_s=1.0,
+        )
+        app.state.plan_job_worker.start()
+    geocode_resolver = GeocodeResolver(
+        PlaceCanonicalizer.from_file(settings.place_aliases_path),
+        client=http_client,
+        api_key=settings.google_geocoding_api_key or settings.google_routes_api_key,
+        api_url=settings.google_geocoding_api_url,
+        cache=cache,
+        ttl_s=settings.geocode_cache_ttl_s,
+    )
+    app.state.geocode_resolver = geocode_resolver
+    app.state.replanner = Replanner(
+        llm_adapter,
+        cache=cache,
+        route_lookup=_route_lookup(routes_adapter, cache, geocode_resolver),
+    )
+    app.state.live_routes = _build_live_hub(settings, routes_adapter, cache)
+    monitor = await _start_readiness(
+        app,
+        settings,
+        cache,
+        database,
+        [routes_adapter, places_adapter, *llm_router.backends, geocode_resolver],
+    )
+    app.state.warm_up_task = asyncio.create_task(_warm_up(database, monitor))
+    if settings.cache_warm_top_k > 0:
+        _start_cache_warmer(app, settings, cache, routes_adapter, places_adapter)
+    if cache.store is not None:
+        app.state.cache_maintenance_task = asyncio.create_task(_maintain_cache(cache, settings))
 
 
-@app.on_event("shutdown")
-async def on_shutdown() -> None:
+async def on_shutdown(app: FastAPI) -> None:
     """Clean up shared resources."""
+    for task_name in ("warm_up_task", "cache_maintenance_task"):
+        task: asyncio.Task[None] | None = getattr(app.state, task_name, None)
+        if task and not task.done():
+            task.cancel()
+
+    monitor: ReadinessMonitor | None = getattr(app.state, "readiness", None)
+    if monitor:
+        await monitor.stop()
+
+    warmer: CacheWarmer | None = getattr(app.state, "cache_warmer", None)
+    if warmer:
+        await warmer.stop()
+
+    partitions: PlanPartitionMaintainer | None = getattr(app.state, "plan_partitions", None)
+    if partitions:
+        await partitions.stop()
+
+    live_routes: LiveRouteHub | None = getattr(app.state, "live_routes", None)
+    if live_routes:
+        await live_routes.aclose()
+
+    job_worker: PlanJobWorker | None = getattr(app.state, "plan_job_worker", None)
+    if job_worker:
+        await job_worker.stop()
+
+    job_queue = getattr(app.state, "plan_job_queue", None)
+    if isinstance(job_queue, RedisPlanJobQueue):
+        await job_queue.aclose()
+
     client: httpx.AsyncClient | None = getattr(app.state, "http_client", None)
     if client and not client.is_closed:
         await client.aclose()
 
+    executor: CPUExecutor | None = getattr(app.state, "cpu_executor", None)
+    if executor:
+        executor.shutdown()
+
     settings = getattr(app.state, "settings", None)
     if settings and getattr(settings, "testing", False):
         return
 
-    redis_client: Redis | None = getattr(app.state, "redis", None)
-    if redis_client:
-        await redis_client.aclose()
+    cache: CacheClient | None = getattr(app.state, "cache", None)
+    if cache:
+        await cache.aclose()
+
+    database: Database | None = getattr(app.state, "database", None)
+    if database:
+        await database.close()
+
+    road_graph: RoadGraph | None = getattr(app.state, "road_graph", None)
+    if road_graph:
+        road_graph.close()
+
+    poi_index: PoiIndex | None = getattr(app.state, "poi_index", None)
+    if poi_index:
+        poi_index.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await on_startup(app)
+    try:
+        yield
+    finally:
+        await on_shutdown(app)
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestLoadMiddleware, load=request_load)
+
+
+@app.get("/healthz", tags=["monitoring"])
+async def healthz() -> dict[str, bool]:
+    """Simple health check endpoint."""
+    return {"ok": True}
+
 
-    pool: asyncpg.Pool | None = getattr(app.state, "db_pool", None)
-    if pool:
-        await pool.close()
+@app.get("/readyz", tags=["monitoring"])
+async def readyz() -> ORJSONResponse:
+    """Report cached dependency health; 503 tells the balancer to drain this instance."""
+    monitor: ReadinessMonitor | None = getattr(app.state, "readiness", None)
+    report = monitor.current() if monitor else {"ready": False, "status": "starting"}
+    status_code = status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return ORJSONResponse(report, status_code=status_code)
 
 
 app.include_router(routes.router)
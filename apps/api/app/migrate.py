@@ -0,0 +1,44 @@
+"""Run schema migrations once per deployment instead of once per worker.
+
+    python -m app.migrate
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import asyncpg
+
+from app.config import Settings, get_settings
+from app.repositories.plans import init_plan_schema
+
+# Arbitrary application-wide key so concurrent pods serialize their migrations.
+MIGRATION_LOCK_ID = 0x62696672
+
+
+async def run_migrations(dsn: str, *, partition_months_ahead: int = 3) -> None:
+    """Apply the schema under an advisory lock on a dedicated connection."""
+    conn = await asyncpg.connect(dsn=dsn)
+    try:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await init_plan_schema(conn, months_ahead=partition_months_ahead)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+    finally:
+        await conn.close()
+
+
+def migrate(settings: Settings | None = None) -> None:
+    settings = settings or get_settings()
+    if settings.testing:
+        return
+    asyncio.run(
+        run_migrations(
+            settings.database_url, partition_months_ahead=settings.plan_partition_months_ahead
+        )
+    )
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,361 @@
+"""Incremental re-planning of stored plans.
+
+A change set is mapped to the smallest windows of segments it affects (a
+swapped POI touches the drive in, the stop and the drive out; a new date
+touches its whole day). Only those windows go to the LLM, together with the
+neighbouring segments and drive times from the route cache, and the results
+are spliced back with one JSON Patch per affected day. Later segments of the
+day keep their gaps and are shifted by however much the window grew or shrank.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Sequence
+from uuid import UUID
+
+from app.adapters.llm import LLMAdapter
+from app.cache import CacheClient
+from app.repositories.plan_patch import PatchOperation, VersionConflict, validate_operations
+from app.repositories.plans import PlanRepository, VersionedPlan
+from app.schemas import (
+    AIPlanFragmentRequest,
+    AIPlanFragmentResponse,
+    AIPlanPreferences,
+    PlaceItem,
+    PlanChange,
+    PlanDay,
+    PlanReplanRequest,
+    PlanResponse,
+    PlanSegment,
+    PlanTravelLeg,
+    ReplanScope,
+    RoutesComputeRequest,
+    RoutesComputeResponse,
+)
+from app.serialization import canonical_cache_key, dump_json
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_CACHE_PREFIX = "ai:fragment"
+FRAGMENT_CACHE_TTL = 6 * 3600  # seconds
+
+# Returns the serialized RoutesComputeResponse, normally via the route cache.
+RouteLookup = Callable[[RoutesComputeRequest], Awaitable[bytes]]
+
+
+class ReplanError(ValueError):
+    """A change refers to a day or segment the plan does not have."""
+
+
+@dataclass
+class _Window:
+    """Segments ``[start, end)`` of ``day`` (indices in the stored plan) to regenerate."""
+
+    day: int
+    start: int
+    end: int
+    instructions: list[str] = field(default_factory=list)
+    measure_travel: bool = False
+    whole_day: bool = False
+
+
+@dataclass
+class _EditedPlan:
+    days: list[PlanDay]
+    removed: dict[int, set[int]]
+    windows: list[_Window]
+    dated: set[int]
+
+
+def _minutes(value: str) -> int | None:
+    hours, _, minutes = value.partition(":")
+    if not (hours.isdigit() and minutes.isdigit()):
+        return None
+    return int(hours) * 60 + int(minutes)
+
+
+def _clock(total: int) -> str:
+    total = max(0, min(total, 24 * 60 - 1))
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def _shifted(segment: PlanSegment, delta: int) -> PlanSegment:
+    start, end = _minutes(segment.start_time), _minutes(segment.end_time)
+    if not delta or start is None or end is None:
+        return segment
+    return segment.model_copy(
+        update={"start_time": _clock(start + delta), "end_time": _clock(end + delta)}
+    )
+
+
+def _with_poi(segment: PlanSegment, poi: PlaceItem) -> PlanSegment:
+    old_name = segment.poi.name if segment.poi else None
+    title = poi.name
+    if old_name and old_name in segment.title:
+        title = segment.title.replace(old_name, poi.name)
+    description = segment.description
+    if description and old_name:
+        description = description.replace(old_name, poi.name)
+    return segment.model_copy(update={"poi": poi, "title": title, "description": description})
+
+
+def edit_plan(plan: PlanResponse, changes: Sequence[PlanChange]) -> _EditedPlan:
+    """Apply the mechanical part of each change and work out what to regenerate."""
+    days = [day.model_copy(deep=True) for day in plan.days]
+    removed: dict[int, set[int]] = defaultdict(set)
+    spans: dict[int, list[_Window]] = defaultdict(list)
+    dated: set[int] = set()
+
+    for change in changes:
+        if change.day >= len(days):
+            raise ReplanError(f"Day {change.day} does not exist")
+        day = days[change.day]
+        count = len(day.segments)
+        index = change.segment
+        if index is not None and index >= count:
+            raise ReplanError(f"Segment {index} of day {change.day} does not exist")
+
+        measure_travel = False
+        if change.type == "set_date":
+            instruction = (
+                f"The date changed from {day.date} to {change.date}; "
+                "re-check opening days and hours."
+            )
+            day.date = change.date or day.date
+            dated.add(change.day)
+            start, end = 0, count
+        elif change.type == "replace_poi":
+            assert index is not None and change.poi is not None
+            segment = day.segments[index]
+            old = segment.poi.name if segment.poi else segment.title
+            instruction = f"Visit {change.poi.name} instead of {old}."
+            day.segments[index] = _with_poi(segment, change.poi)
+            start, end, measure_travel = index - 1, index + 2, True
+        elif change.type == "remove_segment":
+            assert index is not None
+            instruction = (
+                f"'{day.segments[index].title}' was removed; reconnect the segments around it."
+            )
+            removed[change.day].add(index)
+            start, end, measure_travel = index - 1, index + 2, True
+        else:
+            instruction = change.instructions or "Suggest a different alternative for this part."
+            start, end = (index, index + 1) if index is not None else (0, count)
+
+        instructions = [instruction]
+        if change.instructions and change.type != "regenerate":
+            instructions.append(change.instructions)
+        spans[change.day].append(
+            _Window(change.day, max(0, start), min(count, end), instructions, measure_travel)
+        )
+
+    windows: list[_Window] = []
+    for day_index in sorted(spans):
+        count = len(days[day_index].segments)
+        merged: list[_Window] = []
+        for window in sorted(spans[day_index], key=lambda w: w.start):
+            if merged and window.start <= merged[-1].end:
+                last = merged[-1]
+                last.end = max(last.end, window.end)
+                last.instructions.extend(window.instructions)
+                last.measure_travel = last.measure_travel or window.measure_travel
+            else:
+                merged.append(window)
+        for window in merged:
+            window.whole_day = window.start == 0 and window.end >= count
+        windows.extend(merged)
+    return _EditedPlan(days, removed, windows, dated)
+
+
+class Replanner:
+    """Regenerate only the windows of a plan that a change set touches."""
+
+    def __init__(
+        self,
+        llm: LLMAdapter,
+        *,
+        cache: CacheClient | None = None,
+        route_lookup: RouteLookup | None = None,
+        context_segments: int = 2,
+    ) -> None:
+        self._llm = llm
+        self._cache = cache
+        self._route_lookup = route_lookup
+        self._context_segments = context_segments
+
+    async def replan(
+        self,
+        repository: PlanRepository,
+        plan_id: UUID,
+        request: PlanReplanRequest,
+        expected_etag: str | None = None,
+    ) -> tuple[VersionedPlan, list[ReplanScope]] | None:
+        """Apply ``request`` to the stored plan; ``None`` when it does not exist.
+
+        Raises :class:`ReplanError` for changes that do not fit the plan and
+        :class:`VersionConflict` when the plan changes underneath.
+        """
+        current = await repository.get_versioned_plan(plan_id)
+        if current is None:
+            return None
+        if expected_etag is not None and current.etag != expected_etag:
+            raise VersionConflict(current.etag)
+
+        edited = edit_plan(current.plan, request.changes)
+        fragments = await asyncio.gather(
+            *(
+                self._regenerate(current.plan, edited, window, request.preferences)
+                for window in edited.windows
+            )
+        )
+
+        operations: list[PatchOperation] = []
+        scopes: list[ReplanScope] = []
+        by_day: dict[int, list[tuple[_Window, AIPlanFragmentResponse]]] = defaultdict(list)
+        for window, fragment in zip(edited.windows, fragments):
+            by_day[window.day].append((window, fragment))
+        for day_index in sorted(set(by_day) | edited.dated):
+            day = edited.days[day_index]
+            segments, day_scopes = self._splice(
+                current.plan.days[day_index].segments,
+                day.segments,
+                edited.removed[day_index],
+                by_day.get(day_index, []),
+                day_index,
+            )
+            scopes.extend(day_scopes)
+            path = ("days", str(day_index))
+            operations.append(
+                PatchOperation(
+                    "replace",
+                    (*path, "segments"),
+                    [segment.model_dump(mode="json") for segment in segments],
+                )
+            )
+            if day_index in edited.dated:
+                operations.append(PatchOperation("replace", (*path, "date"), day.date))
+            for window, fragment in by_day.get(day_index, []):
+                if window.whole_day and fragment.summary:
+                    operations.append(PatchOperation("replace", (*path, "summary"), fragment.summary))
+
+        # Guard with the ETag that was read, so a concurrent edit is never overwritten.
+        patched = await repository.patch_plan(plan_id, validate_operations(operations), current.etag)
+        if patched is None:
+            return None
+        return patched, scopes
+
+    @staticmethod
+    def _splice(
+        original: Sequence[PlanSegment],
+        edited: Sequence[PlanSegment],
+        removed: set[int],
+        windows: Sequence[tuple[_Window, AIPlanFragmentResponse]],
+        day_index: int,
+    ) -> tuple[list[PlanSegment], list[ReplanScope]]:
+        segments: list[PlanSegment] = []
+        scopes: list[ReplanScope] = []
+        position = shift = 0
+        for window, fragment in sorted(windows, key=lambda item: item[0].start):
+            end = window.end
+            segments.extend(
+                _shifted(edited[i], shift) for i in range(position, window.start) if i not in removed
+            )
+            start = len(segments)
+            segments.extend(fragment.segments)
+            scopes.append(ReplanScope(day=day_index, start=start, end=len(segments)))
+            # Keep the gap to the next untouched segment: shift by how much the window moved.
+            old_end = _minutes(original[end - 1].end_time) if end > window.start else None
+            new_end = _minutes(fragment.segments[-1].end_time) if fragment.segments else None
+            if old_end is not None and new_end is not None:
+                shift += new_end - old_end
+            position = end
+        segments.extend(
+            _shifted(edited[i], shift) for i in range(position, len(edited)) if i not in removed
+        )
+        return segments, scopes
+
+    async def _regenerate(
+        self,
+        plan: PlanResponse,
+        edited: _EditedPlan,
+        window: _Window,
+        preferences: AIPlanPreferences | None,
+    ) -> AIPlanFragmentResponse:
+        day = edited.days[window.day]
+        removed = edited.removed[window.day]
+        kept = [(i, segment) for i, segment in enumerate(day.segments) if i not in removed]
+        end = window.end
+        current = [segment for i, segment in kept if window.start <= i < end]
+        if window.whole_day:
+            previous = edited.days[window.day - 1].segments[-1:] if window.day > 0 else []
+            following = (
+                edited.days[window.day + 1].segments[:1] if window.day + 1 < len(edited.days) else []
+            )
+            before, after = list(previous), list(following)
+        else:
+            before = [segment for i, segment in kept if i < window.start][-self._context_segments:]
+            after = [segment for i, segment in kept if i >= end][: self._context_segments]
+
+        travel = (
+            await self._travel_legs([*before[-1:], *current, *after[:1]])
+            if window.measure_travel
+            else []
+        )
+        request = AIPlanFragmentRequest(
+            origin=plan.origin,
+            destination=plan.destination,
+            date=day.date,
+            day_summary=day.summary,
+            before=before,
+            current=current,
+            after=after,
+            instructions=window.instructions,
+            travel=travel,
+            preferences=preferences,
+        )
+
+        cache_key = canonical_cache_key(FRAGMENT_CACHE_PREFIX, request)
+        if self._cache:
+            cached = await self._cache.get(cache_key)
+            if cached:
+                return AIPlanFragmentResponse.model_validate_json(cached)
+        fragment = await self._llm.generate_fragment(request)
+        # An unchanged window means no backend answered; do not pin that result.
+        if self._cache and fragment.segments != current:
+            await self._cache.set(cache_key, dump_json(fragment), FRAGMENT_CACHE_TTL)
+        return fragment
+
+    async def _travel_legs(self, segments: Sequence[PlanSegment]) -> list[PlanTravelLeg]:
+        """Drive times between consecutive stops, served from the route cache when warm."""
+        if self._route_lookup is None:
+            return []
+        stops = [segment.poi for segment in segments if segment.poi is not None]
+        pairs = [(a, b) for a, b in zip(stops, stops[1:]) if (a.lat, a.lng) != (b.lat, b.lng)]
+        results = await asyncio.gather(
+            *(self._leg(a, b) for a, b in pairs), return_exceptions=True
+        )
+        legs = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("travel time lookup failed during re-planning", exc_info=result)
+                continue
+            legs.append(result)
+        return legs
+
+    async def _leg(self, origin: PlaceItem, destination: PlaceItem) -> PlanTravelLeg:
+        assert self._route_lookup is not None
+        payload = RoutesComputeRequest(
+            origin=f"{origin.lat:.5f},{origin.lng:.5f}",
+            destination=f"{destination.lat:.5f},{destination.lng:.5f}",
+        )
+        route = RoutesComputeResponse.model_validate_json(await self._route_lookup(payload))
+        return PlanTravelLeg(
+            from_name=origin.name,
+            to_name=destination.name,
+            duration_s=route.duration_s,
+            distance_m=route.distance_m,
+        )
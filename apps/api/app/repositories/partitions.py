@@ -0,0 +1,320 @@
+"""Monthly range partitioning of ``plans`` by ``created_at``, with archival.
+
+Plan ids are UUIDv7, whose first 48 bits are the creation time in
+milliseconds, and a plan's ``created_at`` is exactly that time. A lookup by
+id can therefore name its partition (see :func:`created_at_for`) instead of
+probing the primary key of every month. Plans created before partitioning
+keep random UUIDv4 ids and live in one ``plans_before_yYYYYmMM`` partition;
+looking those up still checks every partition.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import re
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import UUID
+
+import asyncpg
+
+from app.db import Database
+
+logger = logging.getLogger(__name__)
+
+# Distinct from the migration lock so maintenance never waits on a deploy.
+PARTITION_LOCK_ID = 0x62696673
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_PARTITION_RE = re.compile(r"^plans_(before_)?y(\d{4})m(\d{2})$")
+
+CREATE_PARTITIONED_SQL = """
+CREATE TABLE IF NOT EXISTS plans (
+    id UUID NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    route_label TEXT,
+    plan JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    version BIGINT NOT NULL DEFAULT 1,
+    etag TEXT,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX IF NOT EXISTS plans_created_at_id ON plans (created_at, id);
+"""
+
+# Existing rows become one partition ending where the monthly ones begin. A
+# partition's primary key must match the parent's ``(id, created_at)``, so the
+# old ``(id)`` key is replaced; the CHECK lets ATTACH skip its validation scan.
+CONVERT_LEGACY_SQL = """
+ALTER TABLE plans ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE plans RENAME TO {legacy};
+ALTER TABLE {legacy} DROP CONSTRAINT plans_pkey;
+ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY (id, created_at);
+ALTER INDEX IF EXISTS plans_created_at_id RENAME TO {legacy}_created_at_id;
+ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_range CHECK (created_at < '{upper}');
+"""
+
+LIST_PARTITIONS_SQL = """
+SELECT c.relname, i.inhdetachpending
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'plans'::regclass;
+"""
+
+# Partitions detached by an earlier run that stopped before archiving them.
+LIST_DETACHED_SQL = """
+SELECT c.relname
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind = 'r'
+  AND n.nspname = current_schema()
+  AND c.relname ~ '^plans_(before_)?y[0-9]{4}m[0-9]{2}$'
+  AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid);
+"""
+
+
+_last_uuid7 = (0, 0)
+
+
+def uuid7(now_ms: int | None = None) -> UUID:
+    """A time-ordered UUID (RFC 9562 version 7).
+
+    Ids made in the same millisecond by this process still sort in creation
+    order: the 74 random bits then count up from the previous id's.
+    """
+    global _last_uuid7
+    ms = time.time_ns() // 1_000_000 if now_ms is None else now_ms
+    last_ms, last_rand = _last_uuid7
+    if now_ms is None and ms < last_ms:
+        ms = last_ms  # the wall clock stepped back
+    if ms == last_ms:
+        rand = last_rand + 1
+    else:
+        rand = secrets.randbits(73)  # top bit clear, leaving room to count
+    _last_uuid7 = (ms, rand)
+    value = (
+        (ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76  # version
+        | (rand >> 62) << 64
+        | 0x2 << 62  # variant
+        | rand & ((1 << 62) - 1)
+    )
+    return UUID(int=value)
+
+
+def created_at_for(plan_id: UUID) -> datetime | None:
+    """The ``created_at`` stored with a UUIDv7 plan id; ``None`` for older ids."""
+    if plan_id.version != 7:
+        return None
+    return _EPOCH + timedelta(milliseconds=plan_id.int >> 80)
+
+
+def created_at_match(param: str, column: str = "created_at") -> str:
+    """Condition on ``column`` that pins a plan's partition when ``param`` is not NULL.
+
+    Unlike ``param IS NULL OR column = param`` this stays prunable: the
+    planner (or executor, for generic plans) evaluates the bounds first.
+    """
+    return (
+        f"{column} BETWEEN COALESCE({param}::timestamptz, '-infinity') "
+        f"AND COALESCE({param}::timestamptz, 'infinity')"
+    )
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime, *, before: bool = False) -> str:
+    return f"plans_{'before_' if before else ''}y{month.year:04d}m{month.month:02d}"
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    upper: datetime
+    detach_pending: bool = False
+
+    @classmethod
+    def from_name(cls, name: str, detach_pending: bool = False) -> Partition | None:
+        match = _PARTITION_RE.match(name)
+        if match is None:
+            return None
+        month = datetime(int(match.group(2)), int(match.group(3)), 1, tzinfo=timezone.utc)
+        # ``plans_before_yYYYYmMM`` ends at that month; a monthly partition at the next.
+        return cls(name, month if match.group(1) else add_months(month, 1), detach_pending)
+
+
+async def init_partitioned_schema(
+    conn: asyncpg.Connection, *, now: datetime | None = None, months_ahead: int = 3
+) -> list[str]:
+    """Create (or convert to) the partitioned table and its upcoming partitions."""
+    current = month_start(now or datetime.now(timezone.utc))
+    async with conn.transaction():
+        kind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('plans')")
+        if kind == "r":
+            upper = add_months(current, 1)
+            legacy = partition_name(upper, before=True)
+            # ``CREATE_TABLE_SQL`` upgrades run first, so created_at is filled in.
+            await conn.execute(CONVERT_LEGACY_SQL.format(legacy=legacy, upper=upper.isoformat()))
+            await conn.execute(CREATE_PARTITIONED_SQL)
+            await conn.execute(
+                f"ALTER TABLE plans ATTACH PARTITION {legacy} "
+                f"FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')"
+            )
+            logger.info("converted plans into a partitioned table; existing rows are in %s", legacy)
+        else:
+            await conn.execute(CREATE_PARTITIONED_SQL)
+        return await ensure_partitions(conn, now=current, months_ahead=months_ahead)
+
+
+async def list_partitions(conn: asyncpg.Connection) -> list[Partition]:
+    partitions = [
+        Partition.from_name(row["relname"], row["inhdetachpending"])
+        for row in await conn.fetch(LIST_PARTITIONS_SQL)
+    ]
+    return sorted((p for p in partitions if p is not None), key=lambda p: p.upper)
+
+
+async def ensure_partitions(
+    conn: asyncpg.Connection, *, now: datetime | None = None, months_ahead: int = 3
+) -> list[str]:
+    """Create monthly partitions through ``months_ahead`` months from now; return new names."""
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = await list_partitions(conn)
+    covered_until = max((p.upper for p in existing), default=None)
+    created: list[str] = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if covered_until is not None and month < covered_until:
+            continue
+        name = partition_name(month)
+        await conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF plans "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        created.append(name)
+    return created
+
+
+class PlanPartitionMaintainer:
+    """Keep future partitions created and archive expired ones.
+
+    Each cycle runs on a dedicated connection under a session advisory lock,
+    so one API process does the work. Partitions whose whole range is older
+    than ``retention_months`` are detached ``CONCURRENTLY`` (inserts and
+    lookups on other months are not blocked), copied out as gzip-compressed
+    CSV into ``archive_dir`` and dropped. A partition is dropped only after
+    its archive file has been written and renamed into place; a run that
+    stops half-way is picked up by the next one.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        archive_dir: str | Path | None = None,
+        retention_months: int = 0,
+        months_ahead: int = 3,
+        interval_s: float = 3600.0,
+    ) -> None:
+        self._db = db
+        self._archive_dir = Path(archive_dir) if archive_dir else None
+        self._retention_months = retention_months
+        self._months_ahead = months_ahead
+        self._interval_s = interval_s
+        self._task: asyncio.Task[None] | None = None
+
+    async def run_once(self, now: datetime | None = None) -> dict[str, list[str]]:
+        """Run one cycle; return the partitions created and archived."""
+        result: dict[str, list[str]] = {"created": [], "archived": []}
+        async with self._db.connect(application_name="bifrost-partitions") as conn:
+            if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", PARTITION_LOCK_ID):
+                return result
+            try:
+                result["created"] = await ensure_partitions(
+                    conn, now=now, months_ahead=self._months_ahead
+                )
+                if self._retention_months > 0 and self._archive_dir is not None:
+                    result["archived"] = await self._archive_expired(conn, now)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", PARTITION_LOCK_ID)
+        return result
+
+    async def _archive_expired(self, conn: asyncpg.Connection, now: datetime | None) -> list[str]:
+        cutoff = add_months(
+            month_start(now or datetime.now(timezone.utc)), -self._retention_months
+        )
+        for partition in await list_partitions(conn):
+            if partition.upper > cutoff:
+                continue
+            mode = "FINALIZE" if partition.detach_pending else "CONCURRENTLY"
+            # Not inside a transaction: DETACH ... CONCURRENTLY requires autocommit.
+            await conn.execute(f"ALTER TABLE plans DETACH PARTITION {partition.name} {mode}")
+
+        archived: list[str] = []
+        for row in await conn.fetch(LIST_DETACHED_SQL):
+            name = row["relname"]
+            await self._archive_table(conn, name)
+            await conn.execute(f"DROP TABLE {name}")
+            archived.append(name)
+            logger.info("archived plan partition %s", name)
+        return archived
+
+    async def _archive_table(self, conn: asyncpg.Connection, name: str) -> Path:
+        assert self._archive_dir is not None
+        self._archive_dir.mkdir(parents=True, exist_ok=True)
+        target = self._archive_dir / f"{name}.csv.gz"
+        partial = target.with_name(target.name + ".partial")
+        archive = await asyncio.to_thread(gzip.open, partial, "wb")
+        try:
+
+            async def write(chunk: bytes) -> None:
+                # Compression runs off the event loop, one COPY chunk at a time.
+                await asyncio.to_thread(archive.write, chunk)
+
+            await conn.copy_from_table(name, output=write, format="csv", header=True)
+        finally:
+            await asyncio.to_thread(archive.close)
+        await asyncio.to_thread(_fsync_and_rename, partial, target)
+        return target
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:  # pragma: no cover - retry on the next tick
+                logger.warning("plan partition maintenance failed", exc_info=True)
+            await asyncio.sleep(self._interval_s)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _fsync_and_rename(partial: Path, target: Path) -> None:
+    with open(partial, "rb") as handle:
+        os.fsync(handle.fileno())
+    os.replace(partial, target)
@@ -0,0 +1,459 @@
+"""JSON Patch and JSON Merge Patch support for stored plans.
+
+Patches are parsed into :class:`PatchOperation` lists, each value is validated
+against the schema node at its path (never the whole plan), and the operations
+are compiled into a chain of CTEs that rewrite the ``plan`` JSONB column with
+``jsonb_set`` / ``jsonb_insert`` / ``#-`` inside one ``UPDATE``. Every step
+carries the precondition from RFC 6902 (path exists, test matches, ...); if any
+fails the chain yields no row and nothing is written.
+"""
+
+from __future__ import annotations
+
+import types
+from dataclasses import dataclass, replace
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Literal, Sequence, Union, get_args, get_origin
+
+import orjson
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.repositories.partitions import created_at_match
+from app.schemas import Plan
+
+JSON_PATCH_MEDIA_TYPE = "application/json-patch+json"
+MERGE_PATCH_MEDIA_TYPE = "application/merge-patch+json"
+MAX_OPERATIONS = 100
+
+# Top-level plan keys mirrored into their own columns.
+MIRRORED_COLUMNS = ("origin", "destination", "route_label")
+
+OperationKind = Literal[
+    "add", "remove", "replace", "move", "copy", "test", "set", "discard", "ensure_object"
+]
+Path = tuple[str, ...]
+
+
+class PatchError(ValueError):
+    """The patch document is malformed or would produce an invalid plan."""
+
+
+class PatchConflict(Exception):
+    """The patch does not apply to the current plan (missing path, failed test)."""
+
+
+class VersionConflict(Exception):
+    """The plan changed since the version the client based its patch on."""
+
+    def __init__(self, current_etag: str) -> None:
+        super().__init__("Plan has been modified")
+        self.current_etag = current_etag
+
+
+@dataclass(frozen=True)
+class PatchOperation:
+    """One normalized operation.
+
+    Besides the RFC 6902 verbs, merge patches use ``set`` (create or replace
+    an object member), ``discard`` (remove if present) and ``ensure_object``
+    (``value`` replaces the target unless it already is an object; with no
+    value the target must already be one). ``non_null`` marks a move or copy
+    into a field that cannot hold ``null``, so a ``null`` source fails.
+    """
+
+    op: OperationKind
+    path: Path
+    value: Any = None
+    from_path: Path | None = None
+    non_null: bool = False
+
+    @property
+    def touched_keys(self) -> set[str]:
+        return {path[0] for path in (self.path, self.from_path) if path}
+
+
+def _parse_pointer(pointer: Any) -> Path:
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    return tuple(token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/"))
+
+
+def _pointer(path: Path) -> str:
+    return "".join("/" + token.replace("~", "~0").replace("/", "~1") for token in path)
+
+
+def parse_json_patch(document: Any) -> list[PatchOperation]:
+    """Parse an RFC 6902 patch document."""
+    if not isinstance(document, list):
+        raise PatchError("A JSON Patch document must be an array of operations")
+    operations = []
+    for entry in document:
+        if not isinstance(entry, dict) or entry.get("op") not in (
+            "add", "remove", "replace", "move", "copy", "test"
+        ):
+            raise PatchError(f"Unsupported patch operation: {entry!r}")
+        op = entry["op"]
+        if op in ("add", "replace", "test") and "value" not in entry:
+            raise PatchError(f"'{op}' requires a value")
+        from_path = _parse_pointer(entry.get("from")) if op in ("move", "copy") else None
+        operations.append(
+            PatchOperation(op, _parse_pointer(entry.get("path")), entry.get("value"), from_path)
+        )
+    return operations
+
+
+def _strip_nulls(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _strip_nulls(item) for key, item in value.items() if item is not None}
+    return value
+
+
+def parse_merge_patch(document: Any, prefix: Path = ()) -> list[PatchOperation]:
+    """Translate an RFC 7396 merge patch into operations."""
+    if not isinstance(document, dict):
+        raise PatchError("A merge patch for a plan must be a JSON object")
+    operations: list[PatchOperation] = []
+    for key, value in document.items():
+        path = (*prefix, key)
+        if value is None:
+            operations.append(PatchOperation("discard", path))
+        elif isinstance(value, dict) and _is_model(_resolve(path).annotation):
+            operations.append(PatchOperation("ensure_object", path, _strip_nulls(value)))
+            operations.extend(parse_merge_patch(value, path))
+        else:
+            operations.append(PatchOperation("set", path, value))
+    return operations
+
+
+@dataclass(frozen=True)
+class _Target:
+    annotation: Any
+    required: bool
+    in_array: bool
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _is_model(annotation: Any) -> bool:
+    base = _unwrap_optional(annotation)
+    return isinstance(base, type) and issubclass(base, BaseModel)
+
+
+def _resolve(path: Path) -> _Target:
+    """Find the schema node a path points at."""
+    if not path:
+        raise PatchError("Patching the whole plan is not supported; use a member path")
+    if path[0] == "id":
+        raise PatchError("The plan id cannot be modified")
+    target = _Target(Plan, True, False)
+    for token in path:
+        base = _unwrap_optional(target.annotation)
+        if _is_model(base):
+            field = base.model_fields.get(token)
+            if field is None:
+                raise PatchError(f"Unknown field at {_pointer(path)}")
+            target = _Target(field.annotation, field.is_required(), False)
+        elif get_origin(base) is list:
+            if token != "-" and not token.isdigit():
+                raise PatchError(f"Invalid array index at {_pointer(path)}")
+            target = _Target(get_args(base)[0], False, True)
+        else:
+            raise PatchError(f"Cannot descend into a scalar at {_pointer(path)}")
+    return target
+
+
+@lru_cache(maxsize=64)
+def _adapter(annotation: Any) -> TypeAdapter[Any]:
+    return TypeAdapter(annotation)
+
+
+def _validated(annotation: Any, value: Any, path: Path) -> Any:
+    adapter = _adapter(annotation)
+    try:
+        return adapter.dump_python(adapter.validate_python(value), mode="json")
+    except ValidationError as exc:
+        raise PatchError(f"Invalid value at {_pointer(path)}: {exc.errors()[0]['msg']}") from exc
+
+
+def validate_operations(operations: Sequence[PatchOperation]) -> list[PatchOperation]:
+    """Check each operation against the plan schema and normalize its value."""
+    if len(operations) > MAX_OPERATIONS:
+        raise PatchError(f"At most {MAX_OPERATIONS} operations are allowed")
+    validated = []
+    for operation in operations:
+        target = _resolve(operation.path)
+        appends = operation.path[-1] == "-"
+        if "-" in operation.path[:-1] or (appends and operation.op not in ("add", "move", "copy")):
+            raise PatchError("'-' is only valid as the last token of an add, move or copy target")
+        if operation.op in ("remove", "discard") and target.required and not target.in_array:
+            raise PatchError(f"Required field {_pointer(operation.path)} cannot be removed")
+        if operation.op in ("add", "replace", "set"):
+            value = _validated(target.annotation, operation.value, operation.path)
+            operation = replace(operation, value=value)
+        elif operation.op == "ensure_object":
+            try:
+                value = _validated(target.annotation, operation.value, operation.path)
+            except PatchError:
+                value = None  # a partial object: the target must already exist
+            operation = replace(operation, value=value)
+        elif operation.op in ("move", "copy"):
+            from_path = operation.from_path or ()
+            source = _resolve(from_path)
+            if "-" in from_path:
+                raise PatchError("'-' cannot be used in a 'from' pointer")
+            if operation.op == "move":
+                if source.required and not source.in_array:
+                    raise PatchError(f"Required field {_pointer(from_path)} cannot be moved")
+                if operation.path[: len(from_path)] == from_path:
+                    raise PatchError("A value cannot be moved into itself")
+            if _unwrap_optional(source.annotation) != _unwrap_optional(target.annotation):
+                raise PatchError(
+                    f"{_pointer(from_path)} and {_pointer(operation.path)} hold different types"
+                )
+            # An optional source may hold null, which a required target cannot take.
+            operation = replace(
+                operation, non_null=_unwrap_optional(target.annotation) is target.annotation
+            )
+        validated.append(operation)
+    return validated
+
+
+def decode_patch(body: bytes, content_type: str) -> list[PatchOperation]:
+    """Parse and validate a PATCH body according to its media type."""
+    try:
+        document = orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
+        raise PatchError("Request body is not valid JSON") from exc
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == JSON_PATCH_MEDIA_TYPE:
+        operations = parse_json_patch(document)
+    elif media_type in (MERGE_PATCH_MEDIA_TYPE, "application/json"):
+        operations = parse_merge_patch(document)
+    else:
+        raise PatchError(f"Unsupported patch media type: {media_type or 'none'}")
+    return validate_operations(operations)
+
+
+# -- SQL compilation ---------------------------------------------------------
+
+
+class _Params:
+    def __init__(self, initial: Sequence[Any]) -> None:
+        self.values = list(initial)
+
+    def add(self, value: Any, cast: str) -> str:
+        self.values.append(value)
+        return f"${len(self.values)}::{cast}"
+
+    def path(self, path: Path) -> str:
+        return self.add(list(path), "text[]")
+
+    def json(self, value: Any) -> str:
+        return self.add(orjson.dumps(value).decode(), "jsonb")
+
+
+def _add_step(doc: str, path: Path, value: str, params: _Params) -> tuple[str, list[str]]:
+    parent = params.path(path[:-1])
+    if path[-1] == "-":
+        return (
+            f"jsonb_set({doc}, {parent}, ({doc} #> {parent}) || jsonb_build_array({value}))",
+            [f"jsonb_typeof({doc} #> {parent}) = 'array'"],
+        )
+    target = params.path(path)
+    conditions = [f"jsonb_typeof({doc} #> {parent}) IN ('object', 'array')"]
+    if path[-1].isdigit():
+        conditions.append(
+            f"(jsonb_typeof({doc} #> {parent}) <> 'array' "
+            f"OR jsonb_array_length({doc} #> {parent}) >= {int(path[-1])})"
+        )
+    return (
+        f"CASE WHEN jsonb_typeof({doc} #> {parent}) = 'array' "
+        f"THEN jsonb_insert({doc}, {target}, {value}) "
+        f"ELSE jsonb_set({doc}, {target}, {value}, true) END",
+        conditions,
+    )
+
+
+def _compile_step(operation: PatchOperation, params: _Params) -> tuple[str, list[str]]:
+    doc = "doc"
+    op = operation.op
+    if op == "add":
+        return _add_step(doc, operation.path, params.json(operation.value), params)
+    if op in ("move", "copy"):
+        source = params.path(operation.from_path or ())
+        base = f"({doc} #- {source})" if op == "move" else doc
+        expression, conditions = _add_step(base, operation.path, f"({doc} #> {source})", params)
+        # A JSON null is a jsonb value, not SQL NULL, so IS NOT NULL lets it through.
+        exists = (
+            f"jsonb_typeof({doc} #> {source}) <> 'null'"
+            if operation.non_null
+            else f"{doc} #> {source} IS NOT NULL"
+        )
+        return expression, [exists, *conditions]
+
+    path = params.path(operation.path)
+    if op == "remove":
+        return f"{doc} #- {path}", [f"{doc} #> {path} IS NOT NULL"]
+    if op == "discard":
+        return f"{doc} #- {path}", []
+    if op == "replace":
+        return (
+            f"jsonb_set({doc}, {path}, {params.json(operation.value)}, false)",
+            [f"{doc} #> {path} IS NOT NULL"],
+        )
+    if op == "set":
+        parent = params.path(operation.path[:-1])
+        return (
+            f"jsonb_set({doc}, {path}, {params.json(operation.value)}, true)",
+            [f"jsonb_typeof({doc} #> {parent}) = 'object'"],
+        )
+    if op == "test":
+        return doc, [f"{doc} #> {path} = {params.json(operation.value)}"]
+    # ensure_object
+    if operation.value is None:
+        return doc, [f"jsonb_typeof({doc} #> {path}) = 'object'"]
+    return (
+        f"CASE WHEN jsonb_typeof({doc} #> {path}) = 'object' THEN {doc} "
+        f"ELSE jsonb_set({doc}, {path}, {params.json(operation.value)}, true) END",
+        [],
+    )
+
+
+def compile_patch(
+    operations: Sequence[PatchOperation],
+    plan_id: Any,
+    expected_etag: str | None,
+    created_at: datetime | None = None,
+) -> tuple[str, list[Any]]:
+    """Build the single ``UPDATE`` statement applying ``operations``.
+
+    ``$1`` is the plan id, ``$2`` the expected ETag (``NULL`` skips the
+    check) and ``$3`` the plan's ``created_at`` when known, which confines
+    the statement to one partition. Returns no row when the plan is missing,
+    the ETag differs or a precondition fails. The new ETag is hashed from the
+    patched document.
+    """
+    params = _Params([plan_id, expected_etag, created_at])
+    steps = [
+        "s0 AS (SELECT plan AS doc FROM plans "
+        f"WHERE id = $1 AND {created_at_match('$3')} "
+        "AND ($2::text IS NULL OR etag = $2) FOR UPDATE)"
+    ]
+    for index, operation in enumerate(operations, start=1):
+        expression, conditions = _compile_step(operation, params)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        steps.append(f"s{index} AS (SELECT {expression} AS doc FROM s{index - 1}{where})")
+
+    touched = set().union(*(operation.touched_keys for operation in operations))
+    assignments = [
+        "plan = patched.doc",
+        "version = plans.version + 1",
+        "etag = md5(patched.doc::text)",
+    ]
+    assignments += [
+        f"{column} = patched.doc ->> '{column}'" for column in MIRRORED_COLUMNS if column in touched
+    ]
+    sql = (
+        f"WITH {', '.join(steps)} "
+        f"UPDATE plans SET {', '.join(assignments)} "
+        f"FROM s{len(operations)} AS patched "
+        f"WHERE plans.id = $1 AND {created_at_match('$3', 'plans.created_at')} "
+        "RETURNING plans.id, plans.plan, plans.version, plans.etag"
+    )
+    return sql, params.values
+
+
+# -- In-memory application -----------------------------------------------------
+
+
+_MISSING = object()
+
+
+def _get(doc: Any, path: Path) -> Any:
+    for token in path:
+        if isinstance(doc, dict):
+            doc = doc.get(token, _MISSING)
+        elif isinstance(doc, list) and token.isdigit() and int(token) < len(doc):
+            doc = doc[int(token)]
+        else:
+            return _MISSING
+        if doc is _MISSING:
+            return _MISSING
+    return doc
+
+
+def _container(doc: Any, path: Path) -> Any:
+    parent = _get(doc, path[:-1])
+    if not isinstance(parent, (dict, list)):
+        raise PatchConflict(f"{_pointer(path[:-1])} does not exist")
+    return parent
+
+
+def _add(doc: Any, path: Path, value: Any) -> None:
+    parent = _container(doc, path)
+    token = path[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif token == "-":
+        parent.append(value)
+    elif int(token) <= len(parent):
+        parent.insert(int(token), value)
+    else:
+        raise PatchConflict(f"{_pointer(path)} is out of range")
+
+
+def _remove(doc: Any, path: Path, *, strict: bool = True) -> Any:
+    if _get(doc, path) is _MISSING:
+        if strict:
+            raise PatchConflict(f"{_pointer(path)} does not exist")
+        return _MISSING
+    parent = _container(doc, path)
+    return parent.pop(path[-1] if isinstance(parent, dict) else int(path[-1]))
+
+
+def apply_operations(
+    document: dict[str, Any], operations: Sequence[PatchOperation]
+) -> dict[str, Any]:
+    """Apply operations to a JSON document with the same semantics as the SQL."""
+    doc = orjson.loads(orjson.dumps(document))
+    for operation in operations:
+        op, path = operation.op, operation.path
+        if op == "add":
+            _add(doc, path, operation.value)
+        elif op in ("remove", "discard"):
+            _remove(doc, path, strict=op == "remove")
+        elif op == "replace":
+            if _get(doc, path) is _MISSING:
+                raise PatchConflict(f"{_pointer(path)} does not exist")
+            parent = _container(doc, path)
+            parent[path[-1] if isinstance(parent, dict) else int(path[-1])] = operation.value
+        elif op == "set":
+            parent = _container(doc, path)
+            if not isinstance(parent, dict):
+                raise PatchConflict(f"{_pointer(path[:-1])} is not an object")
+            parent[path[-1]] = operation.value
+        elif op == "test":
+            if _get(doc, path) != operation.value:
+                raise PatchConflict(f"Test failed at {_pointer(path)}")
+        elif op in ("move", "copy"):
+            value = _get(doc, operation.from_path or ())
+            if value is _MISSING:
+                raise PatchConflict(f"{_pointer(operation.from_path or ())} does not exist")
+            if value is None and operation.non_null:
+                raise PatchConflict(f"{_pointer(operation.from_path or ())} is null")
+            if op == "move":
+                _remove(doc, operation.from_path or ())
+            _add(doc, path, orjson.loads(orjson.dumps(value)))
+        elif op == "ensure_object":
+            if not isinstance(_get(doc, path), dict):
+                if operation.value is None:
+                    raise PatchConflict(f"{_pointer(path)} is not an object")
+                _add(doc, path, operation.value)
+    return doc
@@ -1,13 +1,36 @@
 from __future__ import annotations
 
 import json
-from typing import Any
-from uuid import UUID, uuid4
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Sequence
+from uuid import UUID
 
 import asyncpg
+from pydantic import ValidationError
 
+from app.db import Database
+from app.executor import CPUExecutor, run_cpu
+from app.repositories.partitions import (
+    created_at_for,
+    created_at_match,
+    init_partitioned_schema,
+    uuid7,
+)
+from app.repositories.plan_patch import (
+    PatchConflict,
+    PatchError,
+    PatchOperation,
+    VersionConflict,
+    apply_operations,
+    compile_patch,
+)
 from app.schemas import Plan, PlanCreateRequest, PlanDay, PlanResponse
+from app.serialization import content_hash, dump_json
 
+# The pre-partitioning table and its upgrades; only applied to an existing
+# unpartitioned ``plans`` before it is converted (see ``partitions``).
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS plans (
     id UUID PRIMARY KEY,
@@ -15,37 +38,114 @@ CREATE TABLE IF NOT EXISTS plans (
     destination TEXT NOT NULL,
     route_label TEXT,
     plan JSONB NOT NULL,
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    version BIGINT NOT NULL DEFAULT 1,
+    etag TEXT
 );
+ALTER TABLE plans ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE plans ADD COLUMN IF NOT EXISTS etag TEXT;
+UPDATE plans SET etag = md5(plan::text) WHERE etag IS NULL;
+UPDATE plans SET created_at = NOW() WHERE created_at IS NULL;
+CREATE INDEX IF NOT EXISTS plans_created_at_id ON plans (created_at, id);
 """
 
 INSERT_PLAN_SQL = """
-INSERT INTO plans (id, origin, destination, route_label, plan)
-VALUES ($1, $2, $3, $4, $5)
-RETURNING id, plan;
+INSERT INTO plans (id, origin, destination, route_label, plan, etag, created_at)
+VALUES ($1, $2, $3, $4, $5, md5($5::jsonb::text), $6)
+RETURNING id, plan, version, etag;
 """
 
-GET_PLAN_SQL = """
-SELECT id, plan
+# $2 is the id's UUIDv7 timestamp, so only that plan's partition is probed.
+GET_PLAN_SQL = f"""
+SELECT id, plan, version, etag
 FROM plans
-WHERE id = $1;
+WHERE id = $1 AND {created_at_match("$2")};
 """
 
+GET_ETAG_SQL = f"""
+SELECT etag
+FROM plans
+WHERE id = $1 AND {created_at_match("$2")};
+"""
+
+# Keyset scan over plans_created_at_id; $3/$4 resume strictly after a position.
+EXPORT_PLANS_SQL = """
+SELECT id, created_at, version, jsonb_set(plan, '{id}', to_jsonb(id))::text AS plan
+FROM plans
+WHERE created_at >= COALESCE($1::timestamptz, '-infinity')
+  AND created_at < COALESCE($2::timestamptz, 'infinity')
+  AND (created_at, id) > (
+      COALESCE($3::timestamptz, '-infinity'),
+      COALESCE($4::uuid, '00000000-0000-0000-0000-000000000000')
+  )
+ORDER BY created_at, id;
+"""
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class VersionedPlan:
+    """A plan with its edit counter and the content hash served as its ETag."""
+
+    plan: PlanResponse
+    version: int
+    etag: str
+
 
-async def init_plan_schema(pool: asyncpg.Pool) -> None:
-    """Ensure the plans table exists."""
-    async with pool.acquire() as conn:
+@dataclass(frozen=True, order=True)
+class ExportPosition:
+    """Keyset position in an export, serialized as ``<µs since epoch>:<uuid>``."""
+
+    created_at: datetime
+    id: UUID
+
+    def token(self) -> str:
+        return f"{(self.created_at - _EPOCH) // timedelta(microseconds=1)}:{self.id}"
+
+    @classmethod
+    def parse(cls, token: str) -> ExportPosition:
+        micros, _, plan_id = token.partition(":")
+        try:
+            return cls(_EPOCH + timedelta(microseconds=int(micros)), UUID(plan_id))
+        except ValueError as exc:
+            raise ValueError(f"invalid export cursor {token!r}") from exc
+
+
+@dataclass
+class ExportedPlan:
+    """A stored plan as exported: the JSON document text, not a parsed model."""
+
+    position: ExportPosition
+    version: int
+    document: str
+
+
+async def init_plan_schema(conn: asyncpg.Connection, *, months_ahead: int = 3) -> None:
+    """Ensure the partitioned plans table and its upcoming partitions exist."""
+    kind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('plans')")
+    if kind == "r":
         await conn.execute(CREATE_TABLE_SQL)
+    await init_partitioned_schema(conn, months_ahead=months_ahead)
 
 
 class PlanRepository:
     """Repository handling CRUD for plans."""
 
-    def __init__(self, pool: asyncpg.Pool) -> None:
-        self._pool = pool
+    def __init__(
+        self,
+        db: Database,
+        *,
+        executor: CPUExecutor | None = None,
+        export_db: Database | None = None,
+    ) -> None:
+        self._db = db
+        self._executor = executor
+        # Exports may read from a replica; they never borrow a pooled connection.
+        self._export_db = export_db or db
 
     async def create_plan(self, payload: PlanCreateRequest) -> PlanResponse:
-        plan_id = uuid4()
+        plan_id = uuid7()
         plan_model = Plan(
             id=plan_id,
             origin=payload.origin,
@@ -53,9 +153,9 @@ class PlanRepository:
             route_label=payload.route_label,
             days=payload.days,
         )
-        plan_json = json.dumps(plan_model.model_dump(mode="json"))
+        plan_json = dump_json(plan_model).decode()
 
-        async with self._pool.acquire() as conn:
+        async with self._db.acquire() as conn:
             row = await conn.fetchrow(
                 INSERT_PLAN_SQL,
                 plan_id,
@@ -63,36 +163,141 @@ class PlanRepository:
                 plan_model.destination,
                 plan_model.route_label,
                 plan_json,
+                created_at_for(plan_id),
             )
 
-        return self._row_to_plan_response(row)
+        return await self._row_to_plan_response(row)
 
     async def get_plan(self, plan_id: UUID) -> PlanResponse | None:
-        async with self._pool.acquire() as conn:
-            row = await conn.fetchrow(GET_PLAN_SQL, plan_id)
+        versioned = await self.get_versioned_plan(plan_id)
+        return versioned.plan if versioned else None
+
+    async def get_versioned_plan(self, plan_id: UUID) -> VersionedPlan | None:
+        async with self._db.acquire() as conn:
+            row = await conn.fetchrow(GET_PLAN_SQL, plan_id, created_at_for(plan_id))
 
         if row is None:
             return None
-        return self._row_to_plan_response(row)
+        return await self._row_to_versioned_plan(row)
 
-    def _row_to_plan_response(self, row: asyncpg.Record) -> PlanResponse:
+    async def get_plan_etag(self, plan_id: UUID) -> str | None:
+        """Read only the stored ETag, without loading or parsing the document."""
+        async with self._db.acquire() as conn:
+            return await conn.fetchval(GET_ETAG_SQL, plan_id, created_at_for(plan_id))
+
+    async def patch_plan(
+        self,
+        plan_id: UUID,
+        operations: Sequence[PatchOperation],
+        expected_etag: str | None = None,
+    ) -> VersionedPlan | None:
+        """Apply validated patch operations in one statement.
+
+        Raises :class:`VersionConflict` when ``expected_etag`` is stale and
+        :class:`PatchConflict` when an operation does not apply.
+        """
+        if not operations:
+            current = await self.get_versioned_plan(plan_id)
+            if current and expected_etag is not None and current.etag != expected_etag:
+                raise VersionConflict(current.etag)
+            return current
+
+        created_at = created_at_for(plan_id)
+        sql, params = compile_patch(operations, plan_id, expected_etag, created_at)
+        async with self._db.acquire() as conn:
+            row = await conn.fetchrow(sql, *params)
+            if row is None:
+                # Only the failure path pays for working out why.
+                etag = await conn.fetchval(GET_ETAG_SQL, plan_id, created_at)
+        if row is not None:
+            return await self._row_to_versioned_plan(row)
+        if etag is None:
+            return None
+        if expected_etag is not None and etag != expected_etag:
+            raise VersionConflict(etag)
+        raise PatchConflict("The patch does not apply to the current plan")
+
+    async def export_plans(
+        self,
+        *,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        after: ExportPosition | None = None,
+        batch_size: int = 500,
+        window_s: float = 5.0,
+    ) -> AsyncIterator[list[ExportedPlan]]:
+        """Yield plans ordered by ``(created_at, id)`` in batches of ``batch_size``.
+
+        Rows come from a server-side cursor on a dedicated connection, so
+        memory is bounded by one batch. The read-only transaction holding the
+        cursor is reopened from the last position every ``window_s`` seconds,
+        so a long export never pins an old snapshot that blocks vacuum.
+        """
+        position = after
+        async with self._export_db.connect(application_name="bifrost-export") as conn:
+            while True:
+                started = time.monotonic()
+                async with conn.transaction(readonly=True):
+                    # A client that stops reading must not leave the transaction open.
+                    await conn.execute("SET LOCAL idle_in_transaction_session_timeout = '60s'")
+                    cursor = await conn.cursor(
+                        EXPORT_PLANS_SQL,
+                        created_from,
+                        created_to,
+                        position.created_at if position else None,
+                        position.id if position else None,
+                    )
+                    while True:
+                        rows = await cursor.fetch(batch_size)
+                        if not rows:
+                            return
+                        batch = [
+                            ExportedPlan(
+                                ExportPosition(row["created_at"], row["id"]),
+                                row["version"],
+                                row["plan"],
+                            )
+                            for row in rows
+                        ]
+                        position = batch[-1].position
+                        yield batch
+                        if len(rows) < batch_size:
+                            return
+                        if time.monotonic() - started > window_s:
+                            break
+
+    async def _row_to_versioned_plan(self, row: asyncpg.Record) -> VersionedPlan:
+        plan = await self._row_to_plan_response(row)
+        return VersionedPlan(plan, row["version"], row["etag"])
+
+    async def _row_to_plan_response(self, row: asyncpg.Record) -> PlanResponse:
         raw_plan = row["plan"]
-        if isinstance(raw_plan, str):
-            data: dict[str, Any] = json.loads(raw_plan)
-        else:
-            data = dict(raw_plan)
-        data["id"] = str(row["id"])
-        return PlanResponse(**data)
+        # Multi-day plans are large; validating them must not stall the loop.
+        return await run_cpu(
+            self._executor,
+            _plan_from_json,
+            raw_plan,
+            str(row["id"]),
+            size=len(raw_plan) if isinstance(raw_plan, str) else 0,
+            label="plan_decode",
+        )
+
+
+def _plan_from_json(raw_plan: str | dict[str, Any], plan_id: str) -> PlanResponse:
+    data: dict[str, Any] = json.loads(raw_plan) if isinstance(raw_plan, str) else dict(raw_plan)
+    data["id"] = plan_id
+    return PlanResponse(**data)
 
 
 class InMemoryPlanRepository:
     """Simple in-memory repository used for testing."""
 
     def __init__(self) -> None:
-        self._store: dict[UUID, PlanResponse] = {}
+        self._store: dict[UUID, VersionedPlan] = {}
+        self._created_at: dict[UUID, datetime] = {}
 
     async def create_plan(self, payload: PlanCreateRequest) -> PlanResponse:
-        plan_id = uuid4()
+        plan_id = uuid7()
         plan = Plan(
             id=plan_id,
             origin=payload.origin,
@@ -101,8 +306,69 @@ class InMemoryPlanRepository:
             days=payload.days or [PlanDay(date="2024-01-01", summary=None, segments=[])],
         )
         response = PlanResponse(**plan.model_dump())
-        self._store[plan_id] = response
+        self._store[plan_id] = VersionedPlan(response, 1, content_hash(dump_json(response)))
+        self._created_at[plan_id] = created_at_for(plan_id)
         return response
 
     async def get_plan(self, plan_id: UUID) -> PlanResponse | None:
+        versioned = self._store.get(plan_id)
+        return versioned.plan if versioned else None
+
+    async def get_versioned_plan(self, plan_id: UUID) -> VersionedPlan | None:
         return self._store.get(plan_id)
+
+    async def get_plan_etag(self, plan_id: UUID) -> str | None:
+        versioned = self._store.get(plan_id)
+        return versioned.etag if versioned else None
+
+    async def patch_plan(
+        self,
+        plan_id: UUID,
+        operations: Sequence[PatchOperation],
+        expected_etag: str | None = None,
+    ) -> VersionedPlan | None:
+        current = self._store.get(plan_id)
+        if current is None:
+            return None
+        if expected_etag is not None and current.etag != expected_etag:
+            raise VersionConflict(current.etag)
+        if not operations:
+            return current
+
+        document = apply_operations(current.plan.model_dump(mode="json"), operations)
+        try:
+            patched = PlanResponse(**document)
+        except ValidationError as exc:
+            raise PatchError(f"The patched plan is invalid: {exc.errors()[0]['msg']}") from exc
+        versioned = VersionedPlan(patched, current.version + 1, content_hash(dump_json(patched)))
+        self._store[plan_id] = versioned
+        return versioned
+
+    async def export_plans(
+        self,
+        *,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        after: ExportPosition | None = None,
+        batch_size: int = 500,
+        window_s: float = 5.0,
+    ) -> AsyncIterator[list[ExportedPlan]]:
+        positions = sorted(
+            ExportPosition(created_at, plan_id) for plan_id, created_at in self._created_at.items()
+        )
+        selected = [
+            position
+            for position in positions
+            if (created_from is None or position.created_at >= created_from)
+            and (created_to is None or position.created_at < created_to)
+            and (after is None or position > after)
+        ]
+        for start in range(0, len(selected), batch_size):
+            yield [
+                ExportedPlan(
+                    position,
+                    self._store[position.id].version,
+                    dump_json(self._store[position.id].plan).decode(),
+                )
+                for position in selected[start : start + batch_size]
+            ]
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from app.adapters.llm import LLMAdapter
-from app.dependencies import get_llm_adapter
-from app.schemas import AIPlanRequest, AIPlanResponse
+from app.config import Settings
+from app.dependencies import get_app_settings, get_llm_adapter, get_plan_job_queue
+from app.jobs import PlanJobQueue
+from app.schemas import AIPlanJob, AIPlanJobRequest, AIPlanRequest, AIPlanResponse
+from app.serialization import model_response
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
@@ -11,6 +16,32 @@ router = APIRouter(prefix="/ai", tags=["ai"])
 async def generate_plan(
     payload: AIPlanRequest,
     adapter: LLMAdapter = Depends(get_llm_adapter),
-) -> AIPlanResponse:
+) -> Response:
     """Generate a plan via the configured LLM adapter."""
-    return await adapter.generate_plan(payload)
+    return model_response(await adapter.generate_plan(payload))
+
+
+@router.post("/plan/jobs", response_model=AIPlanJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_plan_job(
+    payload: AIPlanJobRequest,
+    queue: PlanJobQueue = Depends(get_plan_job_queue),
+) -> Response:
+    """Queue plan generation and return the job immediately."""
+    job = await queue.submit(payload)
+    response = model_response(job, status_code=status.HTTP_202_ACCEPTED)
+    response.headers["Location"] = f"{router.prefix}/plan/jobs/{job.id}"
+    return response
+
+
+@router.get("/plan/jobs/{job_id}", response_model=AIPlanJob)
+async def get_plan_job(
+    job_id: UUID,
+    wait: float = Query(0, ge=0, description="Seconds to long-poll for completion"),
+    queue: PlanJobQueue = Depends(get_plan_job_queue),
+    settings: Settings = Depends(get_app_settings),
+) -> Response:
+    """Return job state, optionally waiting until it finishes."""
+    job = await queue.wait(job_id, min(wait, settings.ai_job_max_wait_s))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return model_response(job)
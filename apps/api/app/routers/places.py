@@ -1,12 +1,18 @@
-import hashlib
-import json
-
-from fastapi import APIRouter, Depends
-from redis.asyncio import Redis
+from fastapi import APIRouter, Depends, Response
 
 from app.adapters.places import PlacesAdapter
-from app.dependencies import get_places_adapter, get_redis
+from app.cache import CacheClient
+from app.canonical import places_cache_key
+from app.dependencies import (
+    get_cache,
+    get_cpu_executor,
+    get_frequency_tracker,
+    get_places_adapter,
+)
+from app.executor import CPUExecutor, run_cpu
 from app.schemas import PlacesAlongRouteRequest, PlacesAlongRouteResponse
+from app.serialization import dump_json, json_bytes_response
+from app.warming import RequestFrequencyTracker
 
 router = APIRouter(prefix="/places", tags=["places"])
 
@@ -17,28 +23,30 @@ PLACES_CACHE_TTL = 300  # seconds
 async def places_along_route(
     payload: PlacesAlongRouteRequest,
     adapter: PlacesAdapter = Depends(get_places_adapter),
-    redis_client: Redis | None = Depends(get_redis),
-) -> PlacesAlongRouteResponse:
+    cache: CacheClient | None = Depends(get_cache),
+    tracker: RequestFrequencyTracker | None = Depends(get_frequency_tracker),
+    executor: CPUExecutor | None = Depends(get_cpu_executor),
+) -> Response:
     """Search places along a route corridor using the configured adapter."""
-    cache_key = _places_cache_key(payload)
-    if redis_client:
-        cached = await redis_client.get(cache_key)
+    # Decoding the polyline for the key is linear in its length; long routes are offloaded.
+    cache_key = await run_cpu(
+        executor, _places_cache_key, payload, size=len(payload.polyline), label="places_key"
+    )
+    if tracker:
+        tracker.record(cache_key, payload)
+    if cache:
+        cached = await cache.get(cache_key)
         if cached:
-            return PlacesAlongRouteResponse.model_validate_json(cached)
+            return json_bytes_response(cached)
 
     response = await adapter.search_along_route(payload)
+    body = dump_json(response)
 
-    if redis_client:
-        await redis_client.setex(
-            cache_key,
-            PLACES_CACHE_TTL,
-            response.model_dump_json(),
-        )
+    if cache:
+        await cache.set(cache_key, body, PLACES_CACHE_TTL)
 
-    return response
+    return json_bytes_response(body)
 
 
 def _places_cache_key(payload: PlacesAlongRouteRequest) -> str:
-    serialized = json.dumps(payload.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
-    digest = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
-    return f"places:along-route:{digest}"
+    return places_cache_key("places:along-route", payload)
@@ -1,32 +1,220 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
-from app.dependencies import get_plan_repository
-from app.repositories.plans import PlanRepository
-from app.schemas import PlanCreateRequest, PlanResponse
+from app.canonical import GeocodeResolver
+from app.dependencies import (
+    get_geocode_resolver,
+    get_live_route_hub,
+    get_plan_exporter,
+    get_plan_repository,
+    get_replanner,
+)
+from app.export import MEDIA_TYPES, ExportFormat, PlanExporter
+from app.live import LiveRouteHub, plan_route_request
+from app.replan import Replanner, ReplanError
+from app.repositories.plan_patch import (
+    JSON_PATCH_MEDIA_TYPE,
+    MERGE_PATCH_MEDIA_TYPE,
+    PatchConflict,
+    PatchError,
+    VersionConflict,
+    decode_patch,
+)
+from app.repositories.plans import ExportPosition, PlanRepository
+from app.routers.routes import live_route_response, route_cache_key
+from app.schemas import PlanCreateRequest, PlanReplanRequest, PlanReplanResponse, PlanResponse
+from app.serialization import etag_header, etag_matches, model_response, not_modified, parse_etags
 
 router = APIRouter(prefix="/plans", tags=["plans"])
 
+_PATCH_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            JSON_PATCH_MEDIA_TYPE: {"schema": {"type": "array", "items": {"type": "object"}}},
+            MERGE_PATCH_MEDIA_TYPE: {"schema": {"type": "object"}},
+        },
+    }
+}
+
+
+# Plans can be patched, so shared caches may store them but must revalidate;
+# a matching If-None-Match is answered without reading the document.
+PLAN_CACHE_CONTROL = "public, no-cache"
+
+
+def _expected_etag(if_match: str | None) -> str | None:
+    tags = parse_etags(if_match)
+    if tags is None:
+        return None
+    if len(tags) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match must name exactly one ETag",
+        )
+    return tags[0]
+
+
+def _plan_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag_header(etag), "Cache-Control": PLAN_CACHE_CONTROL}
+
 
 @router.post("", response_model=PlanResponse, status_code=status.HTTP_201_CREATED)
 async def create_plan(
     payload: PlanCreateRequest,
     repository: PlanRepository = Depends(get_plan_repository),
-) -> PlanResponse:
+) -> Response:
     """Persist a plan using the configured repository."""
-    return await repository.create_plan(payload)
+    plan = await repository.create_plan(payload)
+    return model_response(plan, status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/export")
+async def export_plans(
+    export_format: ExportFormat = Query(default="ndjson", alias="format"),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
+    after: str | None = Query(default=None, description="Resume after this record's cursor"),
+    repository: PlanRepository = Depends(get_plan_repository),
+    exporter: PlanExporter = Depends(get_plan_exporter),
+) -> StreamingResponse:
+    """Stream every plan (NDJSON) or every plan POI (GeoJSON) ordered by creation time."""
+    try:
+        position = ExportPosition.parse(after) if after else None
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    if exporter.busy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports are running",
+            headers={"Retry-After": "30"},
+        )
+    return StreamingResponse(
+        exporter.stream(
+            repository,
+            export_format,
+            created_from=_as_utc(created_from),
+            created_to=_as_utc(created_to),
+            after=position,
+        ),
+        media_type=MEDIA_TYPES[export_format],
+    )
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 
 @router.get("/{plan_id}", response_model=PlanResponse)
 async def get_plan(
     plan_id: UUID,
     repository: PlanRepository = Depends(get_plan_repository),
-) -> PlanResponse:
-    """Fetch a stored plan."""
-    plan = await repository.get_plan(plan_id)
-    if plan is None:
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Fetch a stored plan, answering 304 when the client's copy is current."""
+    if if_none_match is not None:
+        etag = await repository.get_plan_etag(plan_id)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return not_modified(etag, {"Cache-Control": PLAN_CACHE_CONTROL})
+
+    versioned = await repository.get_versioned_plan(plan_id)
+    if versioned is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
+    response = model_response(versioned.plan)
+    response.headers.update(_plan_headers(versioned.etag))
+    return response
+
+
+@router.patch("/{plan_id}", response_model=PlanResponse, openapi_extra=_PATCH_BODY)
+async def patch_plan(
+    plan_id: UUID,
+    request: Request,
+    repository: PlanRepository = Depends(get_plan_repository),
+    if_match: str | None = Header(default=None),
+    prefer: str | None = Header(default=None),
+) -> Response:
+    """Apply a JSON Patch or merge patch to a stored plan."""
+    try:
+        operations = decode_patch(await request.body(), request.headers.get("content-type", ""))
+    except PatchError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+
+    try:
+        versioned = await repository.patch_plan(plan_id, operations, _expected_etag(if_match))
+    except VersionConflict as exc:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(exc),
+            headers={"ETag": etag_header(exc.current_etag)},
+        ) from exc
+    except PatchConflict as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    except PatchError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    if versioned is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
+
+    if prefer and "return=minimal" in prefer.replace(" ", "").lower():
+        response = Response(status_code=status.HTTP_204_NO_CONTENT)
+    else:
+        response = model_response(versioned.plan)
+    response.headers.update(_plan_headers(versioned.etag))
+    return response
+
+
+@router.post("/{plan_id}/replan", response_model=PlanReplanResponse)
+async def replan_plan(
+    plan_id: UUID,
+    payload: PlanReplanRequest,
+    repository: PlanRepository = Depends(get_plan_repository),
+    replanner: Replanner = Depends(get_replanner),
+    if_match: str | None = Header(default=None),
+) -> Response:
+    """Regenerate only the days and segments a change set affects."""
+    try:
+        result = await replanner.replan(repository, plan_id, payload, _expected_etag(if_match))
+    except ReplanError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    except VersionConflict as exc:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(exc),
+            headers={"ETag": etag_header(exc.current_etag)},
+        ) from exc
+    except PatchConflict as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    except PatchError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
+
+    versioned, scopes = result
+    return model_response(
+        PlanReplanResponse(plan=versioned.plan, etag=versioned.etag, regenerated=scopes)
+    )
+
+
+@router.get("/{plan_id}/eta")
+async def live_plan_eta(
+    plan_id: UUID,
+    day: int | None = Query(default=None, ge=0),
+    repository: PlanRepository = Depends(get_plan_repository),
+    resolver: GeocodeResolver | None = Depends(get_geocode_resolver),
+    hub: LiveRouteHub = Depends(get_live_route_hub),
+) -> StreamingResponse:
+    """Stream ETA updates along a stored plan (or one ``day``) as server-sent events."""
+    versioned = await repository.get_versioned_plan(plan_id)
+    if versioned is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
-    return plan
+    try:
+        payload = plan_route_request(versioned.plan, day)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    return live_route_response(hub, await route_cache_key(payload, resolver), payload)
@@ -1,44 +1,154 @@
-import json
-import hashlib
+import asyncio
+from typing import AsyncIterator
 
-from fastapi import APIRouter, Depends
-from redis.asyncio import Redis
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.adapters.routes import RoutesAdapter
-from app.dependencies import get_redis, get_routes_adapter
+from app.cache import CacheClient
+from app.canonical import GeocodeResolver, PlaceCanonicalizer, canonical_route_request
+from app.dependencies import (
+    get_cache,
+    get_frequency_tracker,
+    get_geocode_resolver,
+    get_live_route_hub,
+    get_routes_adapter,
+)
+from app.live import LiveRouteHub, route_request_key
 from app.schemas import RoutesComputeRequest, RoutesComputeResponse
+from app.serialization import (
+    canonical_cache_key,
+    content_hash,
+    dump_json,
+    etag_header,
+    etag_matches,
+    json_bytes_response,
+    not_modified,
+)
+from app.warming import RequestFrequencyTracker
 
 router = APIRouter(prefix="/routes", tags=["routes"])
 
 ROUTE_CACHE_TTL = 300  # seconds
+ROUTE_CACHE_PREFIX = "routes:compute"
+# Shorter than the Redis TTL so shared caches never outlive the entry by much.
+ROUTE_RESULT_CACHE_CONTROL = "public, max-age=60"
+
+_default_canonicalizer = PlaceCanonicalizer()
 
 
 @router.post("/compute", response_model=RoutesComputeResponse)
 async def compute_route(
     payload: RoutesComputeRequest,
     adapter: RoutesAdapter = Depends(get_routes_adapter),
-    redis_client: Redis | None = Depends(get_redis),
-) -> RoutesComputeResponse:
+    cache: CacheClient | None = Depends(get_cache),
+    tracker: RequestFrequencyTracker | None = Depends(get_frequency_tracker),
+    resolver: GeocodeResolver | None = Depends(get_geocode_resolver),
+) -> Response:
     """Compute a route using the configured adapter."""
-    cache_key = _routes_cache_key(payload)
-    if redis_client:
-        cached = await redis_client.get(cache_key)
-        if cached:
-            return RoutesComputeResponse.model_validate_json(cached)
+    cache_key, body = await cached_route(payload, adapter, cache, resolver, tracker)
+    if cache:
+        return _result_response(cache_key, body)
+    return json_bytes_response(body)
+
 
-    response = await adapter.compute_route(payload)
+async def cached_route(
+    payload: RoutesComputeRequest,
+    adapter: RoutesAdapter,
+    cache: CacheClient | None,
+    resolver: GeocodeResolver | None,
+    tracker: RequestFrequencyTracker | None = None,
+) -> tuple[str, bytes]:
+    """Return the cache key and JSON body for a route, computing it on a miss."""
+    cache_key = await route_cache_key(payload, resolver)
+    if tracker:
+        tracker.record(cache_key, payload)
+    if cache:
+        cached = await cache.get(cache_key)
+        if cached:
+            return cache_key, cached
 
-    if redis_client:
-        await redis_client.setex(
-            cache_key,
-            ROUTE_CACHE_TTL,
-            response.model_dump_json(),
+    body = dump_json(await adapter.compute_route(payload))
+    if cache:
+        # The request is kept alongside so /results/{id}/live can poll it again.
+        await cache.set_many(
+            {cache_key: body, route_request_key(cache_key): dump_json(payload)}, ROUTE_CACHE_TTL
         )
+    return cache_key, body
+
+
+async def route_cache_key(payload: RoutesComputeRequest, resolver: GeocodeResolver | None) -> str:
+    """Cache key shared by every spelling of the same route request."""
+    if resolver:
+        key_payload = await resolver.canonical_route_request(payload)
+    else:
+        key_payload = canonical_route_request(payload, _default_canonicalizer)
+    return _routes_cache_key(key_payload)
+
+
+@router.get("/results/{result_id}", response_model=RoutesComputeResponse)
+async def get_route_result(
+    result_id: str = Path(pattern="^[0-9a-f]{32}$"),
+    cache: CacheClient | None = Depends(get_cache),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Serve a cached route result by id so GETs can be revalidated or cached by a CDN."""
+    body = await cache.get(f"{ROUTE_CACHE_PREFIX}:{result_id}") if cache else None
+    if body is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Route result expired")
+    etag = content_hash(body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, {"Cache-Control": ROUTE_RESULT_CACHE_CONTROL})
+    response = json_bytes_response(body)
+    response.headers["ETag"] = etag_header(etag)
+    response.headers["Cache-Control"] = ROUTE_RESULT_CACHE_CONTROL
+    return response
+
+
+@router.get("/results/{result_id}/live")
+async def live_route_result(
+    result_id: str = Path(pattern="^[0-9a-f]{32}$"),
+    cache: CacheClient | None = Depends(get_cache),
+    hub: LiveRouteHub = Depends(get_live_route_hub),
+) -> StreamingResponse:
+    """Stream ETA updates for a route returned by ``/routes/compute`` as server-sent events."""
+    cache_key = f"{ROUTE_CACHE_PREFIX}:{result_id}"
+    raw = await cache.get(route_request_key(cache_key)) if cache else None
+    if raw is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Route result expired")
+    return live_route_response(hub, cache_key, RoutesComputeRequest.model_validate_json(raw))
+
+
+def live_route_response(
+    hub: LiveRouteHub, cache_key: str, payload: RoutesComputeRequest
+) -> StreamingResponse:
+    """SSE response subscribed to ``hub`` for one route until the client disconnects."""
+
+    async def events() -> AsyncIterator[bytes]:
+        async with hub.subscribe(cache_key, payload) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=hub.heartbeat_s)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection while the route is stable.
+                    yield b": keep-alive\n\n"
+                    continue
+                yield event.encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
+def _result_response(cache_key: str, body: bytes) -> Response:
+    """POST response pointing at the GET-able copy of a cached result."""
+    response = json_bytes_response(body)
+    response.headers["ETag"] = etag_header(content_hash(body))
+    response.headers["Content-Location"] = f"{router.prefix}/results/{cache_key.rpartition(':')[2]}"
     return response
 
 
 def _routes_cache_key(payload: RoutesComputeRequest) -> str:
-    serialized = json.dumps(payload.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
-    digest = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
-    return f"routes:compute:{digest}"
+    return canonical_cache_key(ROUTE_CACHE_PREFIX, payload)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Literal
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class RouteComputeWaypoint(BaseModel):
@@ -111,3 +112,90 @@ class AIPlanRequest(BaseModel):
 
 class AIPlanResponse(BaseModel):
     plan: Plan
+
+
+class PlanTravelLeg(BaseModel):
+    from_name: str
+    to_name: str
+    duration_s: int
+    distance_m: int
+
+
+class AIPlanFragmentRequest(BaseModel):
+    """Regenerate ``current`` segments of one day, keeping the surrounding plan."""
+
+    origin: str
+    destination: str
+    date: str
+    day_summary: str | None = None
+    before: list[PlanSegment] = Field(default_factory=list)
+    current: list[PlanSegment] = Field(default_factory=list)
+    after: list[PlanSegment] = Field(default_factory=list)
+    instructions: list[str] = Field(default_factory=list)
+    travel: list[PlanTravelLeg] = Field(default_factory=list)
+    preferences: AIPlanPreferences | None = None
+
+
+class AIPlanFragmentResponse(BaseModel):
+    segments: list[PlanSegment]
+    summary: str | None = None
+
+
+class AIPlanJobRequest(AIPlanRequest):
+    persist: bool = False
+
+
+AIPlanJobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class AIPlanJob(BaseModel):
+    id: UUID
+    status: AIPlanJobStatus
+    created_at: datetime
+    updated_at: datetime
+    result: AIPlanResponse | None = None
+    plan_id: UUID | None = None
+    error: str | None = None
+
+
+PlanChangeType = Literal["replace_poi", "set_date", "remove_segment", "regenerate"]
+
+
+class PlanChange(BaseModel):
+    """One edit to a stored plan; ``day`` and ``segment`` are zero-based."""
+
+    type: PlanChangeType
+    day: int = Field(ge=0)
+    segment: int | None = Field(default=None, ge=0)
+    poi: PlaceItem | None = None
+    date: str | None = None
+    instructions: str | None = None
+
+    @model_validator(mode="after")
+    def _check_arguments(self) -> "PlanChange":
+        if self.type in ("replace_poi", "remove_segment") and self.segment is None:
+            raise ValueError(f"{self.type} requires a segment index")
+        if self.type == "replace_poi" and self.poi is None:
+            raise ValueError("replace_poi requires a poi")
+        if self.type == "set_date" and not self.date:
+            raise ValueError("set_date requires a date")
+        return self
+
+
+class PlanReplanRequest(BaseModel):
+    changes: list[PlanChange] = Field(min_length=1, max_length=20)
+    preferences: AIPlanPreferences | None = None
+
+
+class ReplanScope(BaseModel):
+    """Segments ``[start, end)`` of ``day`` in the returned plan were regenerated."""
+
+    day: int
+    start: int
+    end: int
+
+
+class PlanReplanResponse(BaseModel):
+    plan: PlanResponse
+    etag: str = Field(description="ETag of the updated plan, for a following If-Match")
+    regenerated: list[ReplanScope] = Field(default_factory=list)
@@ -0,0 +1,72 @@
+"""Serialization helpers shared by the routers."""
+
+from __future__ import annotations
+
+import hashlib
+
+from fastapi import Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dump_json(model: BaseModel) -> bytes:
+    """Serialize a model straight to UTF-8 JSON bytes."""
+    return model.__pydantic_serializer__.to_json(model)
+
+
+def json_bytes_response(body: bytes | str, status_code: int = 200) -> Response:
+    """Return pre-serialized JSON without passing it through ``response_model``."""
+    return Response(content=body, status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize a model once, skipping FastAPI's response re-validation."""
+    return json_bytes_response(dump_json(model), status_code=status_code)
+
+
+def canonical_cache_key(prefix: str, payload: BaseModel) -> str:
+    """Build a canonical cache key for a request model.
+
+    Pydantic emits fields in declaration order, so the compact JSON dump is
+    already canonical and needs neither ``model_dump`` nor key sorting.
+    """
+    digest = hashlib.blake2b(dump_json(payload), digest_size=16).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def content_hash(body: bytes) -> str:
+    """Hex digest used as an opaque strong entity tag."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_header(tag: str) -> str:
+    return f'"{tag}"'
+
+
+def parse_etags(header: str | None) -> list[str] | None:
+    """Opaque tags listed in If-Match / If-None-Match; ``None`` for absent or ``*``.
+
+    Weak tags keep their ``W/`` prefix so they never equal a strong tag.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        weak = tag.startswith("W/")
+        tag = tag.removeprefix("W/").strip('"')
+        tags.append(f"W/{tag}" if weak else tag)
+    return tags
+
+
+def etag_matches(if_none_match: str | None, tag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match."""
+    if if_none_match is None:
+        return False
+    tags = parse_etags(if_none_match)
+    return tags is None or any(candidate.removeprefix("W/") == tag for candidate in tags)
+
+
+def not_modified(tag: str, headers: dict[str, str] | None = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag_header(tag), **(headers or {})})
@@ -0,0 +1,197 @@
+"""Request-frequency tracking and proactive refresh of hot cache entries."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from app.adapters.circuit import CircuitBreaker
+from app.cache import CacheClient
+from app.serialization import dump_json
+
+logger = logging.getLogger(__name__)
+
+RequestT = TypeVar("RequestT", bound=BaseModel)
+
+FREQUENCY_KEY = "cache:freq"
+PAYLOADS_KEY = "cache:freq:payloads"
+WARMER_LOCK_KEY = "cache:warmer-lock"
+DECAYED_AT_KEY = "cache:freq:decayed-at"
+
+
+class RequestFrequencyTracker:
+    """Approximate top-K of requested cache keys, shared through Redis.
+
+    Counts accumulate in process and are flushed as one pipelined batch of
+    ``ZINCRBY`` calls. The sorted set is trimmed to ``capacity`` members and
+    :meth:`decay` halves its scores once per half-life, so it behaves like a
+    decaying heavy-hitters sketch. The request body behind each key is kept
+    in a hash so the warmer can replay it.
+    """
+
+    def __init__(self, redis: Redis, *, capacity: int = 1000) -> None:
+        self._redis = redis
+        self._capacity = capacity
+        self._counts: Counter[str] = Counter()
+        self._payloads: dict[str, BaseModel] = {}
+
+    def record(self, key: str, payload: BaseModel) -> None:
+        self._counts[key] += 1
+        self._payloads.setdefault(key, payload)
+
+    async def flush(self) -> None:
+        counts, self._counts = self._counts, Counter()
+        payloads, self._payloads = self._payloads, {}
+        if not counts:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, count in counts.items():
+                pipe.zincrby(FREQUENCY_KEY, count, key)
+            pipe.hset(PAYLOADS_KEY, mapping={key: dump_json(model) for key, model in payloads.items()})
+            await pipe.execute()
+        await self._trim()
+
+    async def _trim(self) -> None:
+        evicted = await self._redis.zrange(FREQUENCY_KEY, 0, -(self._capacity + 1))
+        if evicted:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.zrem(FREQUENCY_KEY, *evicted)
+                pipe.hdel(PAYLOADS_KEY, *evicted)
+                await pipe.execute()
+
+    async def decay(self, half_life_s: float, now: float | None = None) -> float:
+        """Scale scores by the time elapsed since the last decay; return the factor.
+
+        The last decay time lives in Redis, so the rate does not depend on which
+        process runs this or how often. The first call only starts the clock.
+        """
+        now = time.time() if now is None else now
+        raw = await self._redis.get(DECAYED_AT_KEY)
+        if raw is None:
+            await self._redis.set(DECAYED_AT_KEY, repr(now).encode())
+            return 1.0
+        elapsed = now - float(raw)
+        if elapsed < half_life_s:
+            return 1.0
+        factor = 0.5 ** (elapsed / half_life_s)
+        await self._redis.zunionstore(FREQUENCY_KEY, {FREQUENCY_KEY: factor})
+        await self._redis.set(DECAYED_AT_KEY, repr(now).encode())
+        return factor
+
+    async def top(self, k: int) -> list[str]:
+        return [key.decode() for key in await self._redis.zrevrange(FREQUENCY_KEY, 0, k - 1)]
+
+    async def payloads(self, keys: list[str]) -> list[bytes | None]:
+        return await self._redis.hmget(PAYLOADS_KEY, keys) if keys else []
+
+
+@dataclass
+class WarmTarget(Generic[RequestT]):
+    """How to recompute cache entries that share a key prefix."""
+
+    prefix: str
+    model: type[RequestT]
+    fetch: Callable[[RequestT], Awaitable[BaseModel]]
+    ttl_s: int
+    circuit: CircuitBreaker | None = None
+
+
+class CacheWarmer:
+    """Refresh the hottest keys shortly before they expire.
+
+    Each cycle one worker (elected through a Redis lock) checks the remaining
+    TTL of the top ``top_k`` keys and recomputes at most ``budget`` of those
+    expiring within ``refresh_before_s``, hottest first. Targets whose upstream
+    circuit is open are skipped so fallback answers never replace good entries.
+    """
+
+    def __init__(
+        self,
+        cache: CacheClient,
+        tracker: RequestFrequencyTracker,
+        targets: list[WarmTarget],
+        *,
+        top_k: int = 100,
+        budget: int = 20,
+        interval_s: float = 30.0,
+        refresh_before_s: float = 60.0,
+        decay_half_life_s: float = 3600.0,
+    ) -> None:
+        self._cache = cache
+        self._tracker = tracker
+        self._targets = {target.prefix: target for target in targets}
+        self._top_k = top_k
+        self._budget = budget
+        self._interval_s = interval_s
+        self._refresh_before_ms = refresh_before_s * 1000
+        self._decay_half_life_s = decay_half_life_s
+        self._task: asyncio.Task[None] | None = None
+
+    async def run_once(self) -> int:
+        """Run one warming cycle and return the number of refreshed keys."""
+        await self._tracker.flush()
+        redis = self._cache.redis
+        if not await redis.set(WARMER_LOCK_KEY, b"1", nx=True, px=int(self._interval_s * 900)):
+            return 0
+
+        await self._tracker.decay(self._decay_half_life_s)
+
+        keys = await self._tracker.top(self._top_k)
+        if not keys:
+            return 0
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.pttl(key)
+            remaining = await pipe.execute()
+
+        # A missing key reports -2 and counts as already expired.
+        due = [key for key, ttl in zip(keys, remaining) if ttl < self._refresh_before_ms]
+        due = [key for key in due if self._target_for(key) is not None][: self._budget]
+        refreshed = 0
+        for key, raw in zip(due, await self._tracker.payloads(due)):
+            target = self._target_for(key)
+            if raw is None or target is None:
+                continue
+            try:
+                response = await target.fetch(target.model.model_validate_json(raw))
+            except Exception:
+                logger.warning("cache warming failed for %s", key, exc_info=True)
+                continue
+            await self._cache.set(key, dump_json(response), target.ttl_s)
+            refreshed += 1
+        return refreshed
+
+    def _target_for(self, key: str) -> WarmTarget | None:
+        target = self._targets.get(key.rpartition(":")[0])
+        # The adapter claims the half-open probe itself; only peek here.
+        if target is None or (target.circuit is not None and target.circuit.state == "open"):
+            return None
+        return target
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval_s)
+            try:
+                await self.run_once()
+            except Exception:  # pragma: no cover - retry on the next tick
+                logger.warning("cache warming cycle failed", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,166 @@
+"""Worker draining the AI plan job queue.
+
+Run one or more worker processes next to the API::
+
+    python -m app.worker --concurrency 8
+
+Each process handles ``--concurrency`` jobs at a time; inference is I/O-bound,
+so scale out with more processes or containers rather than threads.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+from datetime import datetime, timezone
+
+import httpx
+from redis.asyncio import Redis
+
+from app.adapters.llm import LLMAdapter, LLMRouter
+from app.config import get_settings
+from app.db import Database
+from app.executor import CPUExecutor
+from app.jobs import PlanJobQueue, RedisPlanJobQueue
+from app.repositories.plans import PlanRepository
+from app.schemas import AIPlanJob, AIPlanJobRequest, AIPlanRequest, PlanCreateRequest
+
+logger = logging.getLogger(__name__)
+
+
+class PlanJobWorker:
+    """Claim jobs from a :class:`PlanJobQueue` and run them through an LLM adapter."""
+
+    def __init__(
+        self,
+        queue: PlanJobQueue,
+        adapter: LLMAdapter,
+        *,
+        repository: PlanRepository | None = None,
+        concurrency: int = 4,
+        poll_timeout_s: float = 5.0,
+        reclaim_interval_s: float = 60.0,
+    ) -> None:
+        self._queue = queue
+        self._adapter = adapter
+        self._repository = repository
+        self._concurrency = concurrency
+        self._poll_timeout_s = poll_timeout_s
+        self._reclaim_interval_s = reclaim_interval_s
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def process(self, job: AIPlanJob, payload: AIPlanJobRequest) -> AIPlanJob:
+        try:
+            request = AIPlanRequest.model_validate(payload.model_dump(exclude={"persist"}))
+            result = await self._adapter.generate_plan(request)
+            plan_id = None
+            if payload.persist and self._repository is not None:
+                stored = await self._repository.create_plan(
+                    PlanCreateRequest(
+                        origin=result.plan.origin,
+                        destination=result.plan.destination,
+                        route_label=result.plan.route_label,
+                        days=result.plan.days,
+                    )
+                )
+                plan_id = stored.id
+            update = {"status": "succeeded", "result": result, "plan_id": plan_id}
+        except Exception as exc:
+            logger.exception("AI plan job %s failed", job.id)
+            update = {"status": "failed", "error": str(exc) or type(exc).__name__}
+        finished = job.model_copy(update={**update, "updated_at": datetime.now(timezone.utc)})
+        await self._queue.complete(finished)
+        return finished
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                claimed = await self._queue.claim(self._poll_timeout_s)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("claiming AI plan job failed", exc_info=True)
+                await asyncio.sleep(self._poll_timeout_s)
+                continue
+            if claimed is not None:
+                await self.process(*claimed)
+
+    async def _reclaim(self) -> None:
+        assert isinstance(self._queue, RedisPlanJobQueue)
+        while True:
+            try:
+                reclaimed = await self._queue.reclaim_stale()
+                if reclaimed:
+                    logger.info("re-queued %d stale AI plan jobs", reclaimed)
+            except Exception:  # pragma: no cover - retry on the next tick
+                logger.warning("reclaiming AI plan jobs failed", exc_info=True)
+            await asyncio.sleep(self._reclaim_interval_s)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self._concurrency)]
+        if isinstance(self._queue, RedisPlanJobQueue):
+            self._tasks.append(asyncio.create_task(self._reclaim()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+async def run(concurrency: int) -> None:
+    settings = get_settings()
+    http_client = httpx.AsyncClient(timeout=httpx.Timeout(settings.ai_job_llm_timeout_s))
+    # Blocking queue reads must not trip the API's short socket timeout.
+    redis = Redis.from_url(settings.redis_url, decode_responses=False)
+    database = Database(
+        settings.database_url,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+    )
+    executor = CPUExecutor(
+        kind=settings.cpu_executor_kind,
+        max_workers=settings.cpu_executor_workers,
+        inline_threshold=settings.cpu_offload_threshold,
+    )
+    adapter = LLMRouter.from_settings(settings, client=http_client, executor=executor)
+    queue = RedisPlanJobQueue(redis, ttl_s=settings.ai_job_ttl_s)
+    worker = PlanJobWorker(
+        queue,
+        adapter,
+        repository=PlanRepository(database, executor=executor),
+        concurrency=concurrency,
+    )
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    worker.start()
+    logger.info("AI plan worker started with concurrency %d", concurrency)
+    try:
+        await stopping.wait()
+    finally:
+        await worker.stop()
+        await queue.aclose()
+        await http_client.aclose()
+        await redis.aclose()
+        await database.close()
+        executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI plan job worker")
+    parser.add_argument("--concurrency", type=int, default=get_settings().ai_worker_concurrency)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
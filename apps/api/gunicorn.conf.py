@@ -0,0 +1,36 @@
+"""Gunicorn settings for the multi-worker production server.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Worker count comes from ``WEB_CONCURRENCY`` (default: one per CPU core). The
+master applies schema migrations once before forking, and the workers are told
+to skip them, so scaling out no longer runs DDL per worker.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Importing the app in the master lets workers fork with modules already loaded.
+# Nothing connects at import time, so workers still share no sockets or pools.
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "20"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+
+
+def on_starting(server):  # noqa: ANN001 - gunicorn hook signature
+    from app.config import Settings
+    from app.migrate import migrate
+
+    settings = Settings()
+    if settings.run_migrations_on_startup:
+        migrate(settings)
+    os.environ["RUN_MIGRATIONS_ON_STARTUP"] = "0"
@@ -0,0 +1,249 @@
+"""Load generator reporting RPS, latency percentiles and allocations per endpoint.
+
+By default the API runs in-process with its adapters wired to the stub upstreams
+from :mod:`benchmarks.stubs`, so the real adapter and router code is exercised
+without network access or API keys. Pass ``--base-url`` to load a running
+deployment instead (allocation tracing is only available in-process)::
+
+    PYTHONPATH=apps/api python -m benchmarks.load --requests 2000 --concurrency 64
+    PYTHONPATH=apps/api python -m benchmarks.load --base-url http://localhost:8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+import httpx
+
+from benchmarks.results import percentile, write_results
+from benchmarks.stubs import (
+    PLACES_PATH,
+    ROUTES_PATH,
+    add_profile_arguments,
+    encode_polyline,
+    profile_from_args,
+    synthetic_path,
+    create_stub_app,
+)
+
+RequestFactory = Callable[[int], dict[str, Any]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str | Callable[[int], str]
+    body: RequestFactory | None = None
+
+    def request(self, index: int) -> dict[str, Any]:
+        path = self.path(index) if callable(self.path) else self.path
+        kwargs: dict[str, Any] = {"method": self.method, "url": path}
+        if self.body is not None:
+            kwargs["json"] = self.body(index)
+        return kwargs
+
+
+def build_scenarios(unique_keys: int, plan_ids: list[str]) -> list[Scenario]:
+    polyline = encode_polyline(synthetic_path(400))
+    origins = ["鹿児島中央駅", "指宿駅", "知覧", "開聞岳", "枕崎駅", "霧島神宮"]
+
+    def route_body(index: int) -> dict[str, Any]:
+        key = index % unique_keys
+        return {
+            "origin": origins[key % len(origins)],
+            "destination": "枕崎駅",
+            "waypoints": [f"waypoint-{key}"],
+            "preferScenic": True,
+        }
+
+    def places_body(index: int) -> dict[str, Any]:
+        return {
+            "polyline": polyline,
+            "categories": ["tourist_attraction"],
+            "corridor_width_m": 1000 + index % unique_keys,
+        }
+
+    def ai_body(index: int) -> dict[str, Any]:
+        return {"origin": origins[index % len(origins)], "destination": "枕崎駅", "date": "2024-05-01"}
+
+    def plan_body(index: int) -> dict[str, Any]:
+        return {"origin": origins[index % len(origins)], "destination": "枕崎駅", "route_label": "海沿い"}
+
+    scenarios = [
+        Scenario("healthz", "GET", "/healthz"),
+        Scenario("readyz", "GET", "/readyz"),
+        Scenario("routes_compute", "POST", "/routes/compute", route_body),
+        Scenario("places_along_route", "POST", "/places/along-route", places_body),
+        Scenario("ai_plan", "POST", "/ai/plan", ai_body),
+        Scenario("plans_create", "POST", "/plans", plan_body),
+    ]
+    if plan_ids:
+        scenarios.append(
+            Scenario("plans_get", "GET", lambda index: f"/plans/{plan_ids[index % len(plan_ids)]}")
+        )
+    return scenarios
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    *,
+    requests: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**scenario.request(index))
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+async def measure_allocations(
+    client: httpx.AsyncClient, scenario: Scenario, *, requests: int
+) -> dict[str, float]:
+    """Trace sequential requests to report peak and retained bytes per request."""
+    gc.collect()
+    tracemalloc.start()
+    peaks: list[int] = []
+    baseline, _ = tracemalloc.get_traced_memory()
+    for index in range(requests):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        await client.request(**scenario.request(index))
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "alloc_peak_kib": sum(peaks) / len(peaks) / 1024 if peaks else 0.0,
+        "retained_bytes_per_req": (retained - baseline) / requests if requests else 0.0,
+    }
+
+
+@contextlib.asynccontextmanager
+async def inprocess_client(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    """Start the API in-process with adapters pointed at stub upstreams."""
+    os.environ["TESTING"] = "1"
+
+    from app.adapters.llm import GPTOssAdapter
+    from app.adapters.places import GooglePlacesAdapter
+    from app.adapters.routes import GoogleRoutesAdapter
+    from app.config import get_settings
+    from app.main import app
+
+    get_settings.cache_clear()
+    stub = create_stub_app(profile_from_args(args))
+    upstream = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub), base_url="http://stub")
+
+    async with app.router.lifespan_context(app):
+        app.state.routes_adapter = GoogleRoutesAdapter(
+            api_key="bench", client=upstream, api_url=f"http://stub{ROUTES_PATH}"
+        )
+        app.state.places_adapter = GooglePlacesAdapter(
+            api_key="bench", client=upstream, api_url=f"http://stub{PLACES_PATH}"
+        )
+        app.state.llm_adapter = GPTOssAdapter(base_url="http://stub", api_key=None, client=upstream)
+        if args.redis_url:
+            from app.cache import CacheClient
+
+            app.state.cache = CacheClient.from_url(args.redis_url)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+        if args.redis_url:
+            await app.state.cache.aclose()
+    await upstream.aclose()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    if args.base_url:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        client_cm: Any = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0)
+    else:
+        client_cm = inprocess_client(args)
+
+    results: dict[str, Any] = {}
+    async with client_cm as client:
+        plan_ids = []
+        for index in range(min(50, args.requests)):
+            response = await client.post(
+                "/plans", json={"origin": "鹿児島中央駅", "destination": "枕崎駅", "route_label": str(index)}
+            )
+            if response.status_code < 400:
+                plan_ids.append(response.json()["id"])
+
+        for scenario in build_scenarios(args.unique_keys, plan_ids):
+            if args.only and scenario.name not in args.only:
+                continue
+            stats = await run_scenario(
+                client, scenario, requests=args.requests, concurrency=args.concurrency
+            )
+            if not args.base_url and args.alloc_requests:
+                stats.update(await measure_allocations(client, scenario, requests=args.alloc_requests))
+            results[scenario.name] = stats
+            print(
+                f"{scenario.name:<20} {stats['rps']:>9.1f} rps  "
+                f"p50 {stats['p50_ms']:>7.2f} ms  p95 {stats['p95_ms']:>7.2f} ms  "
+                f"p99 {stats['p99_ms']:>7.2f} ms  errors {stats['errors']}"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="load a running server instead of in-process")
+    parser.add_argument("--redis-url", default=None, help="attach Redis to the in-process app")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--unique-keys", type=int, default=20, help="distinct payloads per endpoint")
+    parser.add_argument("--alloc-requests", type=int, default=50, help="0 disables allocation tracing")
+    parser.add_argument("--only", nargs="*", default=None, help="scenario names to run")
+    parser.add_argument("--output", type=Path, default=None)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    path = write_results("load", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Micro-benchmarks for CPU hot paths on the request path.
+
+    PYTHONPATH=apps/api python -m benchmarks.micro [--output results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from pathlib import Path
+from typing import Any, Callable
+
+from app.adapters.places.google_places import GooglePlacesAdapter
+from app.routers.places import _places_cache_key
+from app.routers.routes import _routes_cache_key
+from app.schemas import (
+    AIPlanResponse,
+    PlacesAlongRouteRequest,
+    PlacesAlongRouteResponse,
+    RoutesComputeRequest,
+    RoutesComputeResponse,
+)
+from benchmarks.results import write_results
+from benchmarks.stubs import _places_body, _plan_body, encode_polyline, synthetic_path
+
+
+def _measure(func: Callable[[], Any], *, min_time: float = 0.2, repeat: int = 5) -> dict[str, float]:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    while number * min(timer.repeat(repeat=1, number=number)) < min_time:
+        number *= 2
+    runs = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    best = min(runs)
+    return {
+        "best_us": best * 1e6,
+        "mean_us": sum(runs) / len(runs) * 1e6,
+        "ops_per_s": 1 / best if best else 0.0,
+    }
+
+
+def build_cases() -> dict[str, Callable[[], Any]]:
+    short_polyline = encode_polyline(synthetic_path(50))
+    long_polyline = encode_polyline(synthetic_path(5000))
+
+    routes_request = RoutesComputeRequest(
+        origin="鹿児島中央駅",
+        destination="枕崎駅",
+        waypoints=["指宿", "知覧", "開聞岳"],
+        avoidTolls=False,
+        trafficAware=True,
+        preferScenic=True,
+    )
+    places_request = PlacesAlongRouteRequest(
+        polyline=long_polyline,
+        categories=["tourist_attraction", "cafe"],
+        corridor_width_m=3000,
+    )
+
+    routes_response = RoutesComputeResponse(
+        polyline=long_polyline,
+        distance_m=86000,
+        duration_s=5520,
+        alternatives=[
+            {"label": "最短", "duration_s": 5520, "distance_m": 86000, "scenic_score": 42, "toll": True},
+            {"label": "海沿い", "duration_s": 6480, "distance_m": 94000, "scenic_score": 88, "toll": False},
+        ],
+    )
+    routes_json = routes_response.model_dump_json()
+
+    places_payload = {
+        "items": [
+            {"id": place["id"], "name": place["displayName"]["text"], "lat": 31.4, "lng": 130.5, "rating": place["rating"]}
+            for place in _places_body(20)["places"]
+        ]
+    }
+    places_json = PlacesAlongRouteResponse.model_validate(places_payload).model_dump_json()
+
+    plan_payload = _plan_body({"origin": "鹿児島中央駅", "destination": "枕崎駅"}, days=5)
+    plan_response = AIPlanResponse.model_validate(plan_payload)
+    plan_json = plan_response.model_dump_json()
+
+    return {
+        "decode_polyline_50pt": lambda: GooglePlacesAdapter._decode_polyline(short_polyline),
+        "decode_polyline_5000pt": lambda: GooglePlacesAdapter._decode_polyline(long_polyline),
+        "routes_cache_key": lambda: _routes_cache_key(routes_request),
+        "places_cache_key_5000pt": lambda: _places_cache_key(places_request),
+        "routes_response_validate_json": lambda: RoutesComputeResponse.model_validate_json(routes_json),
+        "routes_response_dump_json": routes_response.model_dump_json,
+        "places_response_validate_json": lambda: PlacesAlongRouteResponse.model_validate_json(places_json),
+        "ai_plan_validate_python_5d": lambda: AIPlanResponse.model_validate(plan_payload),
+        "ai_plan_validate_json_5d": lambda: AIPlanResponse.model_validate_json(plan_json),
+        "ai_plan_dump_json_5d": plan_response.model_dump_json,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run cases containing this substring")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    for name, func in build_cases().items():
+        if args.filter not in name:
+            continue
+        results[name] = _measure(func)
+        print(f"{name:<32} {results[name]['best_us']:>10.2f} us  {results[name]['ops_per_s']:>12.0f} ops/s")
+
+    path = write_results("micro", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
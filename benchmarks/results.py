@@ -0,0 +1,82 @@
+"""Persist benchmark results as JSON and compare runs across commits.
+
+    PYTHONPATH=apps/api python -m benchmarks.results compare old.json new.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def write_results(suite: str, results: dict[str, Any], output: Path | None = None) -> Path:
+    revision = git_revision()
+    document = {
+        "suite": suite,
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{suite}-{revision}.json"
+    output.write_text(json.dumps(document, indent=2, ensure_ascii=False) + "\n")
+    return output
+
+
+def compare(old_path: Path, new_path: Path) -> list[str]:
+    """Return one line per shared metric with the relative change."""
+    old = json.loads(old_path.read_text())["results"]
+    new = json.loads(new_path.read_text())["results"]
+    lines = []
+    for name in sorted(old.keys() & new.keys()):
+        for metric, old_value in old[name].items():
+            new_value = new[name].get(metric)
+            if not isinstance(old_value, (int, float)) or not isinstance(new_value, (int, float)):
+                continue
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            lines.append(f"{name:<32} {metric:<18} {old_value:>12.3f} -> {new_value:>12.3f} ({change:+.1f}%)")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark result utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compare_parser = sub.add_parser("compare", help="diff two result files")
+    compare_parser.add_argument("old", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    args = parser.parse_args()
+    print("\n".join(compare(args.old, args.new)))
+
+
+if __name__ == "__main__":
+    main()
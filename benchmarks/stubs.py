@@ -0,0 +1,204 @@
+"""Local stand-ins for Google Routes, Google Places and GPT-OSS.
+
+The stub app can be mounted in-process through ``httpx.ASGITransport`` or served
+on a port so a deployed API can be pointed at it via ``GOOGLE_ROUTES_API_URL``,
+``GOOGLE_PLACES_API_URL`` and ``GPT_OSS_BASE_URL``::
+
+    PYTHONPATH=apps/api python -m benchmarks.stubs --port 9000 --latency lognormal --latency-ms 120
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import random
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.geo import encode_polyline
+
+LatencyKind = Literal["none", "fixed", "uniform", "exponential", "lognormal"]
+
+ROUTES_PATH = "/directions/v2:computeRoutes"
+PLACES_PATH = "/v1/places:searchNearby"
+PLAN_PATH = "/v1/plan"
+
+
+@dataclass
+class StubProfile:
+    """Latency distribution and failure rate applied to every stub call."""
+
+    latency: LatencyKind = "lognormal"
+    latency_ms: float = 80.0
+    spread: float = 0.5
+    error_rate: float = 0.0
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+
+    def sample_delay(self) -> float:
+        """Return a delay in seconds drawn from the configured distribution."""
+        mean = self.latency_ms / 1000
+        if self.latency == "none" or mean <= 0:
+            return 0.0
+        if self.latency == "fixed":
+            return mean
+        if self.latency == "uniform":
+            return self._rng.uniform(mean * (1 - self.spread), mean * (1 + self.spread))
+        if self.latency == "exponential":
+            return self._rng.expovariate(1 / mean)
+        # Log-normal with the requested mean: mu = ln(mean) - sigma^2 / 2.
+        mu = math.log(mean) - self.spread**2 / 2
+        return self._rng.lognormvariate(mu, self.spread)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+
+def synthetic_path(points: int, *, seed: int = 0) -> list[tuple[float, float]]:
+    """Random walk from Kagoshima-Chuo towards Makurazaki."""
+    rng = random.Random(seed)
+    lat, lng = 31.584, 130.541
+    path = [(lat, lng)]
+    for _ in range(points - 1):
+        lat -= rng.uniform(0.0, 0.0008)
+        lng -= rng.uniform(-0.0004, 0.0006)
+        path.append((lat, lng))
+    return path
+
+
+def _routes_body(route_points: int) -> dict[str, Any]:
+    routes = []
+    for index in range(3):
+        polyline = encode_polyline(synthetic_path(route_points, seed=index))
+        routes.append(
+            {
+                "duration": f"{5520 + index * 480}s",
+                "distanceMeters": 86000 + index * 4000,
+                "polyline": {"encodedPolyline": polyline},
+                "travelAdvisory": {"tollInfo": {}} if index == 0 else {},
+                "routeLabels": ["DEFAULT_ROUTE" if index == 0 else "DEFAULT_ROUTE_ALTERNATE"],
+            }
+        )
+    return {"routes": routes}
+
+
+def _places_body(count: int) -> dict[str, Any]:
+    places = []
+    for index in range(count):
+        places.append(
+            {
+                "id": f"stub-place-{index}",
+                "displayName": {"text": f"スタブ観光地 {index}", "languageCode": "ja"},
+                "location": {"latitude": 31.4 - index * 0.01, "longitude": 130.5 + index * 0.005},
+                "rating": round(3.5 + (index % 15) / 10, 1),
+                "currentOpeningHours": {"openNow": index % 3 != 0},
+                "shortFormattedAddress": f"鹿児島県南九州市 {index}",
+            }
+        )
+    return {"places": places}
+
+
+def _plan_body(payload: dict[str, Any], days: int) -> dict[str, Any]:
+    plan_days = []
+    for day in range(days):
+        segments = []
+        for slot in range(6):
+            hour = 8 + slot * 2
+            segments.append(
+                {
+                    "start_time": f"{hour:02d}:00",
+                    "end_time": f"{hour + 1:02d}:30",
+                    "title": f"Day {day + 1} stop {slot + 1}",
+                    "description": "スタブが生成した行程です。",
+                    "poi": {
+                        "id": f"stub-poi-{day}-{slot}",
+                        "name": f"スタブ観光地 {slot}",
+                        "lat": 31.4 - slot * 0.01,
+                        "lng": 130.5 + slot * 0.005,
+                    },
+                    "travel_mode": "stop" if slot % 2 else "drive",
+                }
+            )
+        plan_days.append({"date": f"2024-05-{day + 1:02d}", "segments": segments})
+    return {
+        "plan": {
+            "origin": payload.get("origin", "鹿児島中央駅"),
+            "destination": payload.get("destination", "枕崎駅"),
+            "route_label": "海沿い",
+            "days": plan_days,
+        }
+    }
+
+
+def create_stub_app(
+    profile: StubProfile | None = None,
+    *,
+    route_points: int = 400,
+    place_count: int = 10,
+    plan_days: int = 3,
+) -> FastAPI:
+    """Build an app answering the three upstream APIs with canned payloads."""
+    profile = profile or StubProfile()
+    stub = FastAPI()
+    routes_body = _routes_body(route_points)
+    places_body = _places_body(place_count)
+
+    async def _simulate() -> JSONResponse | None:
+        await asyncio.sleep(profile.sample_delay())
+        if profile.should_fail():
+            return JSONResponse({"error": {"code": 503, "status": "UNAVAILABLE"}}, status_code=503)
+        return None
+
+    @stub.post(ROUTES_PATH)
+    async def compute_routes() -> JSONResponse:
+        return await _simulate() or JSONResponse(routes_body)
+
+    @stub.post(PLACES_PATH)
+    async def search_nearby() -> JSONResponse:
+        return await _simulate() or JSONResponse(places_body)
+
+    @stub.post(PLAN_PATH)
+    async def generate_plan(request: Request) -> JSONResponse:
+        payload = await request.json()
+        return await _simulate() or JSONResponse(_plan_body(payload, plan_days))
+
+    return stub
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", choices=["none", "fixed", "uniform", "exponential", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="mean upstream latency")
+    parser.add_argument("--spread", type=float, default=0.5, help="uniform half-width ratio or lognormal sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls returning 503")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profile_from_args(args: argparse.Namespace) -> StubProfile:
+    return StubProfile(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        spread=args.spread,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(profile_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
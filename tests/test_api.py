@@ -72,3 +72,102 @@ async def test_ai_plan(client):
     body = response.json()
     assert "plan" in body
     assert body["plan"]["origin"] == payload["origin"]
+
+
+@pytest.mark.asyncio
+async def test_readyz(client):
+    response = await client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert set(body["checks"]) == {"redis", "database", "upstreams"}
+    assert body["checks"]["upstreams"]["google_routes"]["state"] == "closed"
+    assert body["saturation"]["saturated"] is False
+
+
+def test_routes_cache_key_is_canonical():
+    from app.routers.routes import _routes_cache_key
+    from app.schemas import RoutesComputeRequest
+
+    implicit = RoutesComputeRequest(origin="鹿児島中央駅", destination="枕崎駅")
+    explicit = RoutesComputeRequest.model_validate_json(
+        '{"destination": "枕崎駅", "origin": "鹿児島中央駅", "waypoints": []}'
+    )
+    assert _routes_cache_key(implicit) == _routes_cache_key(explicit)
+    assert _routes_cache_key(implicit).startswith("routes:compute:")
+
+
+@pytest.mark.asyncio
+async def test_ai_plan_job_round_trip(client):
+    submitted = await client.post(
+        "/ai/plan/jobs",
+        json={"origin": "鹿児島中央駅", "destination": "枕崎駅", "persist": True},
+    )
+    assert submitted.status_code == 202
+    job = submitted.json()
+    assert job["status"] == "queued"
+    assert submitted.headers["location"] == f"/ai/plan/jobs/{job['id']}"
+
+    polled = await client.get(f"/ai/plan/jobs/{job['id']}", params={"wait": 5})
+    assert polled.status_code == 200
+    finished = polled.json()
+    assert finished["status"] == "succeeded"
+    assert finished["result"]["plan"]["destination"] == "枕崎駅"
+
+    stored = await client.get(f"/plans/{finished['plan_id']}")
+    assert stored.status_code == 200
+
+    missing = await client.get("/ai/plan/jobs/00000000-0000-0000-0000-000000000000")
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_patch_plan_with_etag(client):
+    created = await client.post(
+        "/plans",
+        json={"origin": "鹿児島中央駅", "destination": "枕崎駅", "days": []},
+    )
+    plan_id = created.json()["id"]
+    fetched = await client.get(f"/plans/{plan_id}")
+    etag = fetched.headers["etag"]
+
+    patched = await client.patch(
+        f"/plans/{plan_id}",
+        content='{"route_label": "海沿い"}'.encode(),
+        headers={"Content-Type": "application/merge-patch+json", "If-Match": etag},
+    )
+    assert patched.status_code == 200
+    assert patched.json()["route_label"] == "海沿い"
+    assert patched.headers["etag"] != etag
+    assert patched.headers["cache-control"] == "public, no-cache"
+
+    revalidated = await client.get(
+        f"/plans/{plan_id}", headers={"If-None-Match": patched.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    stale = await client.patch(
+        f"/plans/{plan_id}",
+        content=b'[{"op": "replace", "path": "/destination", "value": "x"}]',
+        headers={"Content-Type": "application/json-patch+json", "If-Match": etag},
+    )
+    assert stale.status_code == 412
+
+    minimal = await client.patch(
+        f"/plans/{plan_id}",
+        content=b'[{"op": "add", "path": "/days/-", "value": {"date": "2024-05-02"}}]',
+        headers={"Content-Type": "application/json-patch+json", "Prefer": "return=minimal"},
+    )
+    assert minimal.status_code == 204
+
+
+def test_etag_comparison():
+    from app.serialization import content_hash, etag_matches, parse_etags
+
+    tag = content_hash(b'{"ok":true}')
+    assert etag_matches(f'W/"other", "{tag}"', tag)
+    assert etag_matches(f'W/"{tag}"', tag)
+    assert etag_matches("*", tag)
+    assert not etag_matches(None, tag)
+    assert parse_etags(f'W/"{tag}"') == [f"W/{tag}"]
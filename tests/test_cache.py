@@ -0,0 +1,199 @@
+import time
+
+import pytest
+
+from app.adapters.circuit import CircuitBreaker
+from app.cache import CacheClient, decode_value, encode_value
+from app.cache_store import PersistentCacheStore
+from app.schemas import RoutesComputeRequest
+from app.warming import (
+    DECAYED_AT_KEY,
+    FREQUENCY_KEY,
+    PAYLOADS_KEY,
+    CacheWarmer,
+    RequestFrequencyTracker,
+    WarmTarget,
+)
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the tracker and warmer."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.expires: dict[str, float] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.hashes: dict[str, dict[str, bytes]] = {}
+
+    async def set(self, key, value, *, nx=False, ex=None, px=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        if ex is not None or px is not None:
+            self.expires[key] = time.monotonic() + (ex if ex is not None else px / 1000)
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def pttl(self, key):
+        if key not in self.values:
+            return -2
+        if key not in self.expires:
+            return -1
+        return int((self.expires[key] - time.monotonic()) * 1000)
+
+    async def zincrby(self, name, amount, member):
+        zset = self.zsets.setdefault(name, {})
+        zset[member] = zset.get(member, 0) + amount
+
+    def _ranked(self, name):
+        return sorted(self.zsets.get(name, {}).items(), key=lambda item: (item[1], item[0]))
+
+    async def zrange(self, name, start, end):
+        members = [member for member, _ in self._ranked(name)]
+        return [member.encode() for member in members[start : len(members) + end + 1]]
+
+    async def zrevrange(self, name, start, end):
+        members = [member for member, _ in reversed(self._ranked(name))]
+        return [member.encode() for member in members[start : end + 1]]
+
+    async def zrem(self, name, *members):
+        for member in members:
+            self.zsets.get(name, {}).pop(member.decode(), None)
+
+    async def zunionstore(self, dest, weights):
+        [(source, weight)] = weights.items()
+        self.zsets[dest] = {member: score * weight for member, score in self.zsets[source].items()}
+
+    async def hset(self, name, mapping):
+        self.hashes.setdefault(name, {}).update(mapping)
+
+    async def hdel(self, name, *keys):
+        for key in keys:
+            self.hashes.get(name, {}).pop(key.decode(), None)
+
+    async def hmget(self, name, keys):
+        return [self.hashes.get(name, {}).get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self._redis, name)
+        return lambda *args, **kwargs: self._calls.append(method(*args, **kwargs))
+
+    async def execute(self):
+        return [await call for call in self._calls]
+
+
+def test_large_values_are_compressed_and_round_trip():
+    value = b'{"polyline": "' + b"_p~iF~ps|U" * 500 + b'"}'
+    encoded = encode_value(value, threshold=1024, level=6)
+    assert len(encoded) < len(value)
+    assert decode_value(encoded) == value
+
+
+def test_small_values_are_stored_raw():
+    value = b'{"items": []}'
+    assert encode_value(value, threshold=1024, level=6) == value
+    assert decode_value(value) == value
+
+
+@pytest.mark.asyncio
+async def test_persistent_store_keeps_entries_and_ranks_hot_keys(tmp_path):
+    store = PersistentCacheStore(tmp_path / "cache.sqlite3", ttl_s=3600)
+    try:
+        await store.put_many({"routes:a": b"A", "routes:b": b"B"}, ttl_s=300)
+        await store.record_hits({"routes:b": 3, "routes:a": 1})
+
+        assert await store.get("routes:a") == (b"A", 300)
+        assert await store.get("routes:missing") is None
+        hottest = await store.hottest(1)
+        assert hottest == [("routes:b", b"B", 300)]
+        assert await store.compact() == 0
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_hit_decay_runs_once_per_interval_across_workers(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    workers = [PersistentCacheStore(path, decay_interval_s=3600) for _ in range(3)]
+    try:
+        await workers[0].put_many({"routes:a": b"A"}, ttl_s=300)
+        await workers[0].record_hits({"routes:a": 8})
+        for store in workers:
+            await store.compact()
+
+        def hits(conn):
+            return conn.execute("SELECT hits FROM entries WHERE key = 'routes:a'").fetchone()[0]
+
+        assert await workers[0]._run(hits) == 4
+    finally:
+        for store in workers:
+            await store.close()
+
+
+@pytest.mark.asyncio
+async def test_warmer_refreshes_hottest_due_keys_within_budget():
+    redis = FakeRedis()
+    cache = CacheClient(redis)
+    tracker = RequestFrequencyTracker(redis, capacity=3)
+    for name, count in (("a", 1), ("b", 2), ("c", 3), ("d", 4)):
+        for _ in range(count):
+            tracker.record(f"routes:compute:{name}", RoutesComputeRequest(origin=name, destination="x"))
+    await cache.set("routes:compute:d", b"fresh", 3600)
+    # Two half-lives have passed since the last decay, whichever process did it.
+    await redis.set(DECAYED_AT_KEY, repr(time.time() - 7200).encode())
+
+    fetched = []
+
+    async def fetch(payload: RoutesComputeRequest) -> RoutesComputeRequest:
+        fetched.append(payload.origin)
+        return payload
+
+    target = WarmTarget(prefix="routes:compute", model=RoutesComputeRequest, fetch=fetch, ttl_s=300)
+    warmer = CacheWarmer(cache, tracker, [target], budget=1, decay_half_life_s=3600)
+    assert await warmer.run_once() == 1
+
+    # "a" was trimmed, "d" is not due yet, and the budget leaves "b" for later.
+    assert set(redis.zsets[FREQUENCY_KEY]) == {"routes:compute:b", "routes:compute:c", "routes:compute:d"}
+    assert "routes:compute:a" not in redis.hashes[PAYLOADS_KEY]
+    assert fetched == ["c"]
+    assert await cache.get("routes:compute:c") is not None
+    assert redis.zsets[FREQUENCY_KEY]["routes:compute:d"] == pytest.approx(1.0, rel=1e-3)
+
+    # Another worker in the same interval loses the lock and does nothing.
+    other = CacheWarmer(cache, RequestFrequencyTracker(redis), [target], budget=1)
+    assert await other.run_once() == 0
+    assert fetched == ["c"]
+
+
+def test_warmer_skips_targets_with_open_circuit():
+    circuit = CircuitBreaker("routes", failure_threshold=1)
+    target = WarmTarget(
+        prefix="routes:compute",
+        model=RoutesComputeRequest,
+        fetch=None,
+        ttl_s=300,
+        circuit=circuit,
+    )
+    warmer = CacheWarmer(None, None, [target])
+
+    assert warmer._target_for("routes:compute:abc") is target
+    assert warmer._target_for("places:along-route:abc") is None
+    circuit.record_failure()
+    assert warmer._target_for("routes:compute:abc") is None
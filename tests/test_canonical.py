@@ -0,0 +1,59 @@
+import httpx
+import pytest
+
+from app.canonical import (
+    GeocodeResolver,
+    PlaceCanonicalizer,
+    normalize_place_name,
+    places_cache_key,
+)
+from app.geo import encode_polyline
+from app.schemas import PlacesAlongRouteRequest, RoutesComputeRequest
+
+
+def test_place_names_fold_width_whitespace_and_aliases():
+    canonicalizer = PlaceCanonicalizer({"鹿児島中央": "鹿児島中央駅"})
+
+    assert normalize_place_name("　鹿児島 中央駅 ") == "鹿児島中央駅"
+    assert normalize_place_name("Kagoshima  Chuo-Station") == "kagoshima chuo station"
+    assert normalize_place_name("３１．５８４,１３０．５４１") == "31.58400,130.54100"
+    assert canonicalizer.canonical("鹿児島中央") == "鹿児島中央駅"
+
+
+def test_places_request_rounds_polyline_and_sorts_categories():
+    a = PlacesAlongRouteRequest(
+        polyline=encode_polyline([(31.58401, 130.54102), (31.2701, 130.3001)]),
+        categories=["cafe", "museum", "cafe"],
+    )
+    b = PlacesAlongRouteRequest(
+        polyline=encode_polyline([(31.58399, 130.54098), (31.27012, 130.30009)]),
+        categories=["museum", "cafe"],
+    )
+    assert places_cache_key("places", a) == places_cache_key("places", b)
+    c = b.model_copy(update={"polyline": encode_polyline([(31.58399, 130.54098), (31.2711, 130.3001)])})
+    assert places_cache_key("places", c) != places_cache_key("places", b)
+    broken = a.model_copy(update={"polyline": "not a polyline~"})
+    assert places_cache_key("places", broken).startswith("places:")
+
+
+@pytest.mark.asyncio
+async def test_resolver_shares_one_lookup_per_name():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["address"])
+        return httpx.Response(200, json={"status": "OK", "results": [{"place_id": "ChIJ-chuo"}]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        resolver = GeocodeResolver(PlaceCanonicalizer(), client=client, api_key="test")
+        first = await resolver.canonical_route_request(
+            RoutesComputeRequest(origin="鹿児島中央駅", destination="31.27,130.30")
+        )
+        second = await resolver.canonical_route_request(
+            RoutesComputeRequest(origin="鹿児島中央駅 ", destination="31.270000,130.3")
+        )
+
+    assert first == second
+    assert first.origin == "place:ChIJ-chuo"
+    assert first.destination == "geo:31.27000,130.30000"
+    assert calls == ["鹿児島中央駅"]
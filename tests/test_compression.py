@@ -0,0 +1,91 @@
+import gzip
+import zlib
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from app.compression import CompressionMiddleware, ResponseCompressor
+
+BODY = b'{"polyline":"' + b"}_ilF~kbkV" * 400 + b'"}'
+
+
+def _app(compressor: ResponseCompressor) -> Starlette:
+    async def plan(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": '"abc"'})
+
+    async def small(request):
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    async def stream(request):
+        async def lines():
+            for _ in range(3):
+                yield BODY + b"\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def events(request):
+        return StreamingResponse(iter([b"data: 1\n\n"]), media_type="text/event-stream")
+
+    app = Starlette(
+        routes=[
+            Route("/plan", plan),
+            Route("/small", small),
+            Route("/stream", stream),
+            Route("/events", events),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware)
+    app.state.compression = compressor
+    return app
+
+
+def test_negotiation_honours_q_values_and_server_preference():
+    compressor = ResponseCompressor(encodings=("gzip",))
+    assert compressor.negotiate("gzip, deflate") == "gzip"
+    assert compressor.negotiate("gzip;q=0") is None
+    assert compressor.negotiate("*;q=0.5") == "gzip"
+    assert compressor.negotiate("identity") is None
+    assert compressor.level_for("text/event-stream", "gzip") is None
+    assert compressor.level_for("application/problem+json", "gzip") == 6
+
+
+@pytest.mark.asyncio
+async def test_buffered_and_streamed_bodies_are_compressed():
+    compressor = ResponseCompressor(encodings=("gzip",))
+    transport = httpx.ASGITransport(app=_app(compressor))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for _ in range(2):
+            response = await client.get("/plan", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert response.headers["etag"] == '"abc"'
+            assert int(response.headers["content-length"]) < len(BODY) // 10
+            assert response.content == BODY
+        assert compressor.cache_hits == 1
+
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
+        streamed = await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert streamed.headers["content-encoding"] == "gzip"
+        assert streamed.content == (BODY + b"\n") * 3
+
+        events = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in events.headers
+
+        identity = await client.get("/plan", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers
+        assert identity.content == BODY
+
+
+def test_streamed_chunks_decode_independently():
+    compressor = ResponseCompressor(encodings=("gzip",))
+    encoder = compressor.encoder("gzip", 4)
+    decoder = zlib.decompressobj(31)
+    first = encoder.compress(b"line-1\n") + encoder.flush()
+    assert decoder.decompress(first) == b"line-1\n"
+    rest = encoder.compress(b"line-2\n") + encoder.finish()
+    assert gzip.decompress(first + rest) == b"line-1\nline-2\n"
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import Settings
+from app.executor import CPUExecutor, run_cpu
+
+
+def _thread_name() -> str:
+    return threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_small_inputs_run_inline_and_large_ones_are_offloaded():
+    executor = CPUExecutor(max_workers=1, inline_threshold=100)
+    try:
+        assert await executor.run(_thread_name, size=10, label="t") == threading.current_thread().name
+        assert (await executor.run(_thread_name, size=100, label="t")).startswith("cpu")
+        assert (await executor.run(_thread_name, size=None, label="t")).startswith("cpu")
+        stats = executor.stats()["tasks"]["t"]
+        assert stats["inline"] == 1
+        assert stats["offloaded"] == 2
+        assert await run_cpu(None, _thread_name, size=None) == threading.current_thread().name
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_offloaded_work_does_not_block_the_loop():
+    executor = CPUExecutor(max_workers=1, inline_threshold=0)
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        # time.sleep stands in for a long GIL-releasing computation.
+        await executor.run(time.sleep, 0.1, size=1)
+        assert ticks >= 5
+        assert executor.stats()["tasks"]["cpu"]["max_run_ms"] >= 100
+    finally:
+        task.cancel()
+        executor.shutdown()
+
+
+def test_blank_worker_count_means_one_per_core():
+    assert Settings(CPU_EXECUTOR_WORKERS="").cpu_executor_workers is None
+    assert Settings(CPU_EXECUTOR_WORKERS="3").cpu_executor_workers == 3
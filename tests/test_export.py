@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.repositories.plans import ExportPosition
+
+
+def _plan(name: str) -> dict:
+    return {
+        "origin": "鹿児島中央駅",
+        "destination": "枕崎駅",
+        "days": [
+            {
+                "date": "2024-05-01",
+                "segments": [
+                    {"start_time": "09:00", "end_time": "10:00", "title": "出発"},
+                    {
+                        "start_time": "11:00",
+                        "end_time": "12:00",
+                        "title": name,
+                        "poi": {"id": name, "name": name, "lat": 31.2, "lng": 130.5},
+                    },
+                ],
+            }
+        ],
+    }
+
+
+def test_export_position_token_round_trips():
+    position = ExportPosition(datetime(2024, 5, 1, 9, 0, 0, 123456, tzinfo=timezone.utc), uuid4())
+    assert ExportPosition.parse(position.token()) == position
+    with pytest.raises(ValueError):
+        ExportPosition.parse("yesterday")
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_geojson_and_resumes(client):
+    ids = [(await client.post("/plans", json=_plan(name))).json()["id"] for name in ("a", "b", "c")]
+
+    response = await client.get("/plans/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["plan"]["id"] for record in records] == ids
+    assert records[0]["version"] == 1
+
+    resumed = await client.get("/plans/export", params={"after": records[0]["cursor"]})
+    assert [json.loads(line)["plan"]["id"] for line in resumed.text.splitlines()] == ids[1:]
+
+    geojson = await client.get("/plans/export", params={"format": "geojson"})
+    assert geojson.headers["content-type"].startswith("application/geo+json")
+    collection = geojson.json()
+    assert collection["type"] == "FeatureCollection"
+    assert [feature["properties"]["name"] for feature in collection["features"]] == ["a", "b", "c"]
+    assert collection["features"][0]["geometry"] == {"type": "Point", "coordinates": [130.5, 31.2]}
+
+    later = await client.get("/plans/export", params={"created_from": "2999-01-01T00:00:00"})
+    assert later.text == ""
+    assert (await client.get("/plans/export", params={"after": "nope"})).status_code == 422
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.jobs import CLAIMING_KEY, PROCESSING_KEY, QUEUE_KEY, RedisPlanJobQueue
+from app.schemas import AIPlanJobRequest
+
+
+class FakeRedis:
+    """The list, hash and string commands the job queue uses."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.lists: dict[str, list[bytes]] = {}
+        self.hashes: dict[str, dict[str, bytes]] = {}
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value.encode())
+
+    async def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    async def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value.encode() in items:
+            items.remove(value.encode())
+            return 1
+        return 0
+
+    async def blmove(self, source, destination, timeout, src, dest):
+        items = self.lists.get(source, [])
+        if not items:
+            return None
+        value = items.pop()
+        self.lists.setdefault(destination, []).insert(0, value)
+        return value
+
+    async def hsetnx(self, name, key, value):
+        self.hashes.setdefault(name, {}).setdefault(key, value.encode())
+
+    async def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    async def hdel(self, name, key):
+        self.hashes.get(name, {}).pop(key, None)
+
+    async def publish(self, channel, message):
+        return 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self._redis = redis
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self._redis, name)
+        return lambda *args, **kwargs: self._calls.append(method(*args, **kwargs))
+
+    async def execute(self):
+        return [await call for call in self._calls]
+
+
+@pytest.mark.asyncio
+async def test_reclaim_leaves_jobs_being_claimed_alone_for_a_lease():
+    redis = FakeRedis()
+    queue = RedisPlanJobQueue(redis, lease_s=0.05)
+    job = await queue.submit(AIPlanJobRequest(origin="鹿児島中央駅", destination="枕崎駅"))
+    await asyncio.sleep(0.06)
+
+    # A worker has moved the id but not yet marked it running.
+    await redis.blmove(QUEUE_KEY, PROCESSING_KEY, 0, "RIGHT", "LEFT")
+    assert await queue.reclaim_stale() == 0
+    assert redis.lists[PROCESSING_KEY] == [str(job.id).encode()]
+
+    await asyncio.sleep(0.06)
+    # Still not running a lease after reclaim first saw it: the worker is gone.
+    assert await queue.reclaim_stale() == 1
+    assert redis.lists[QUEUE_KEY] == [str(job.id).encode()]
+    assert str(job.id) not in redis.hashes[CLAIMING_KEY]
+
+    running, _ = await queue.claim(0)
+    assert running.status == "running"
+    assert await queue.reclaim_stale() == 0
+    await asyncio.sleep(0.06)
+    assert await queue.reclaim_stale() == 1
@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.adapters.routes import RoutesAdapter
+from app.live import LiveRouteHub, plan_route_request
+from app.schemas import (
+    PlaceItem,
+    Plan,
+    PlanDay,
+    PlanSegment,
+    RouteAlternative,
+    RoutesComputeRequest,
+    RoutesComputeResponse,
+)
+
+REQUEST = RoutesComputeRequest(origin="鹿児島中央駅", destination="枕崎駅")
+
+
+class ChangingRoutesAdapter(RoutesAdapter):
+    def __init__(self) -> None:
+        self.calls = 0
+        self.duration_s = 3600
+
+    async def compute_route(self, payload: RoutesComputeRequest) -> RoutesComputeResponse:
+        self.calls += 1
+        alternative = RouteAlternative(
+            label="最短", duration_s=3600, distance_m=50000, scenic_score=3, toll=False
+        )
+        return RoutesComputeResponse(
+            polyline="abc", distance_m=50000, duration_s=self.duration_s, alternatives=[alternative]
+        )
+
+
+async def _next(queue):
+    return await asyncio.wait_for(queue.get(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_one_poller_and_receive_only_deltas():
+    adapter = ChangingRoutesAdapter()
+    hub = LiveRouteHub(adapter, min_interval_s=0.01, max_interval_s=0.02)
+
+    async with hub.subscribe("routes:compute:k", REQUEST) as first:
+        async with hub.subscribe("routes:compute:k", REQUEST) as second:
+            snapshots = [await _next(first), await _next(second)]
+            assert [event.kind for event in snapshots] == ["route", "route"]
+            assert adapter.calls == 1
+            assert hub.stats()["subscribers"] == 2
+
+            adapter.duration_s = 4200
+            delta = await _next(first)
+            assert delta.kind == "delta"
+            assert delta.data == {"duration_s": 4200}
+            assert (await _next(second)).version == delta.version == 2
+            assert b"event: delta\nid: 2\n" in delta.encode()
+
+        # A late subscriber starts from the current state, not from the beginning.
+        async with hub.subscribe("routes:compute:k", REQUEST) as late:
+            assert (await _next(late)).data["duration_s"] == 4200
+
+    assert hub.stats()["routes"] == 0
+    calls = adapter.calls
+    await asyncio.sleep(0.05)
+    assert adapter.calls == calls
+
+
+def test_plan_route_request_covers_the_trip_or_one_day():
+    def stop(name: str, lat: float) -> PlanSegment:
+        poi = PlaceItem(id=name, name=name, lat=lat, lng=130.5)
+        return PlanSegment(start_time="09:00", end_time="10:00", title=name, poi=poi)
+
+    plan = Plan(
+        origin="鹿児島中央駅",
+        destination="枕崎駅",
+        days=[
+            PlanDay(date="2024-05-01", segments=[stop("a", 31.1), stop("b", 31.2)]),
+            PlanDay(date="2024-05-02", segments=[stop("c", 31.3)]),
+        ],
+    )
+    trip = plan_route_request(plan)
+    assert (trip.origin, trip.destination) == ("鹿児島中央駅", "枕崎駅")
+    assert trip.waypoints == ["31.10000,130.50000", "31.20000,130.50000", "31.30000,130.50000"]
+
+    first_day = plan_route_request(plan, 0)
+    assert (first_day.origin, first_day.destination) == ("鹿児島中央駅", "31.20000,130.50000")
+    assert first_day.waypoints == ["31.10000,130.50000"]
+    second_day = plan_route_request(plan, 1)
+    assert (second_day.origin, second_day.destination) == ("31.20000,130.50000", "枕崎駅")
+
+    with pytest.raises(ValueError):
+        plan_route_request(plan, 2)
+
+
+@pytest.mark.asyncio
+async def test_live_endpoints_reject_unknown_routes_and_plans(client):
+    assert (await client.get(f"/routes/results/{'0' * 32}/live")).status_code == 404
+    assert (await client.get(f"/plans/{uuid.uuid4()}/eta")).status_code == 404
+
+    created = await client.post("/plans", json={"origin": "鹿児島中央駅", "destination": "枕崎駅"})
+    response = await client.get(f"/plans/{created.json()['id']}/eta", params={"day": 3})
+    assert response.status_code == 422
@@ -0,0 +1,113 @@
+import json
+
+import httpx
+import pytest
+
+from app.adapters.llm import GPTOssAdapter, LLMBackendError
+from app.adapters.llm.output import OutputError, OutputValidators, complete_json
+from app.config import Settings
+from app.schemas import AIPlanRequest, AIPlanResponse
+
+VALIDATORS = OutputValidators()
+
+PLAN = {
+    "plan": {
+        "origin": "鹿児島中央駅",
+        "destination": "枕崎駅",
+        "days": [
+            {
+                "date": "2024-05-01",
+                "segments": [
+                    {
+                        "start_time": "09:00",
+                        "end_time": "10:30",
+                        "title": "出発",
+                        "travel_mode": "drive",
+                    },
+                    {
+                        "start_time": "11:00",
+                        "end_time": "12:30",
+                        "title": "長崎鼻灯台",
+                        "poi": {"id": "p1", "name": "長崎鼻灯台", "lat": 31.238, "lng": 130.501},
+                        "travel_mode": "stop",
+                    },
+                ],
+            }
+        ],
+    }
+}
+
+
+def test_valid_output_takes_the_fast_path():
+    validator = VALIDATORS.plan
+    before = validator.stats()
+    result = validator.parse(json.dumps(PLAN, ensure_ascii=False).encode())
+    assert result.plan.days[0].segments[1].poi.lat == 31.238
+    assert validator.stats()["valid"] == before["valid"] + 1
+
+
+def test_common_mistakes_are_repaired_instead_of_rejected():
+    output = json.loads(json.dumps(PLAN))
+    day = output["plan"]["days"][0]
+    day["date"] = "2024/5/1"
+    day["weather"] = "晴れ"
+    first, second = day["segments"]
+    first.update(start_time="9時", end_time="10:30:00", description=None, travel_mode="Drive")
+    second["poi"] = {"id": "p1", "name": "長崎鼻灯台"}
+    text = "```json\n" + json.dumps(output, ensure_ascii=False) + "\n```"
+
+    result = VALIDATORS.plan.parse(text)
+    repaired_day = result.plan.days[0]
+    assert repaired_day.date == "2024-05-01"
+    assert (repaired_day.segments[0].start_time, repaired_day.segments[0].end_time) == ("09:00", "10:30")
+    assert repaired_day.segments[0].travel_mode == "drive"
+    # A POI without coordinates is dropped rather than losing the whole plan.
+    assert repaired_day.segments[1].poi is None
+
+
+def test_truncated_output_is_completed_and_the_partial_value_dropped():
+    text = json.dumps(PLAN, ensure_ascii=False)
+    cut = text[: text.index('"lat"') + len('"lat": 31.')]
+    assert json.loads(complete_json('{"a": [1, {"b": "tex')) == {"a": [1, {"b": "tex"}]}
+
+    result = VALIDATORS.plan.parse(cut)
+    segments = result.plan.days[0].segments
+    assert [segment.title for segment in segments] == ["出発", "長崎鼻灯台"]
+    # The cut POI lacks coordinates, so only it is dropped.
+    assert segments[1].poi is None
+
+    cut = text[: text.index('"end_time": "12:30"')]
+    assert [segment.title for segment in VALIDATORS.plan.parse(cut).plan.days[0].segments] == ["出発"]
+
+    with pytest.raises(OutputError):
+        VALIDATORS.plan.parse(b'{"plan": {"origin": "x"}}')
+
+
+@pytest.mark.asyncio
+async def test_gpt_oss_requests_schema_constrained_decoding():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, content=json.dumps(PLAN)[:-20].encode())
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        adapter = GPTOssAdapter(
+            base_url="http://gpu:8001", api_key=None, client=client, output=VALIDATORS, constrained=True
+        )
+        result = await adapter.request_plan(AIPlanRequest(origin="鹿児島中央駅", destination="枕崎駅"))
+        assert isinstance(result, AIPlanResponse)
+
+        schema = bodies[0]["response_format"]["json_schema"]["schema"]
+        assert "$ref" not in json.dumps(schema)
+        assert schema["properties"]["plan"]["required"] == ["origin", "destination", "days"]
+
+        adapter.output = None
+        with pytest.raises(LLMBackendError):
+            await adapter.request_plan(AIPlanRequest(origin="鹿児島中央駅", destination="枕崎駅"))
+
+
+def test_blank_schema_dir_falls_back_to_the_bundled_schemas():
+    settings = Settings(SHARED_SCHEMA_DIR="")
+    assert settings.shared_schema_dir is None
+    assert OutputValidators(settings.shared_schema_dir).plan.json_schema() == VALIDATORS.plan.json_schema()
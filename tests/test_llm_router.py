@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.adapters.circuit import CircuitBreaker
+from app.adapters.llm import GoogleAIAdapter, GPTOssAdapter, LLMBackend, LLMBackendError, LLMRouter
+from app.adapters.llm.base import fallback_plan
+from app.config import Settings
+from app.schemas import AIPlanRequest, AIPlanResponse
+
+REQUEST = AIPlanRequest(origin="鹿児島中央駅", destination="枕崎駅")
+
+
+class FakeBackend(LLMBackend):
+    def __init__(self, name: str, *, delay_s: float = 0.0, fail: bool = False) -> None:
+        self.name = name
+        self.circuit = CircuitBreaker(name, failure_threshold=1)
+        self.delay_s = delay_s
+        self.fail = fail
+        self.calls = 0
+
+    async def request_plan(self, payload: AIPlanRequest) -> AIPlanResponse:
+        self.calls += 1
+        await asyncio.sleep(self.delay_s)
+        if self.fail:
+            self.circuit.record_failure()
+            raise LLMBackendError(f"{self.name} down")
+        plan = fallback_plan(payload).plan.model_copy(update={"route_label": self.name})
+        return AIPlanResponse(plan=plan)
+
+
+@pytest.mark.asyncio
+async def test_router_prefers_fast_idle_backends_within_the_primary_tier():
+    fast, slow = FakeBackend("fast", delay_s=0.005), FakeBackend("slow", delay_s=0.05)
+    cloud = FakeBackend("cloud")
+    router = LLMRouter([(fast, 0), (slow, 0), (cloud, 1)])
+    for _ in range(4):
+        await router.generate_plan(REQUEST)
+    assert cloud.calls == 0
+    assert router.candidates()[0] is fast
+
+    # Queue depth counts too: with many requests in flight on "fast", "slow" wins.
+    router._states[0].inflight = 50
+    assert router.candidates()[0] is slow
+
+
+@pytest.mark.asyncio
+async def test_router_fails_over_and_falls_back_only_when_everything_failed():
+    broken, cloud = FakeBackend("broken", fail=True), FakeBackend("cloud")
+    router = LLMRouter([(broken, 0), (cloud, 1)])
+    result = await router.generate_plan(REQUEST)
+    assert result.plan.route_label == "cloud"
+    # The broken backend's circuit is now open, so it is skipped entirely.
+    assert router.candidates() == [cloud]
+
+    cloud.fail = True
+    result = await router.generate_plan(REQUEST)
+    assert result.plan.route_label == "海沿い"
+    assert router.snapshot()["fallbacks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_from_settings_builds_tiers_from_llm_provider():
+    settings = Settings(
+        GPT_OSS_BASE_URLS="http://gpu-1:8001, http://gpu-2:8001",
+        GOOGLE_AI_API_KEY="key",
+        LLM_PROVIDER="gpt-oss",
+    )
+    async with httpx.AsyncClient() as client:
+        router = LLMRouter.from_settings(settings, client=client)
+    snapshot = router.snapshot()["backends"]
+    assert [type(backend) for backend in router.backends] == [GPTOssAdapter, GPTOssAdapter, GoogleAIAdapter]
+    assert snapshot["gpt_oss"]["priority"] == snapshot["gpt_oss_2"]["priority"] == 0
+    assert snapshot["google_ai"]["priority"] == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_circuit_lets_a_single_probe_through():
+    recovering, cloud = FakeBackend("recovering", delay_s=0.02), FakeBackend("cloud")
+    recovering.circuit = CircuitBreaker("recovering", failure_threshold=1, reset_timeout_s=0.01)
+    recovering.circuit.record_failure()
+    await asyncio.sleep(0.02)
+    assert recovering.circuit.state == "half_open"
+
+    router = LLMRouter([(recovering, 0), (cloud, 1)])
+    results = await asyncio.gather(*(router.generate_plan(REQUEST) for _ in range(5)))
+    assert recovering.calls == 1
+    assert sorted(result.plan.route_label for result in results) == ["cloud"] * 4 + ["recovering"]
+    # FakeBackend does not report success itself; a real adapter would.
+    recovering.circuit.record_success()
+    assert recovering.circuit.state == "closed"
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from app.adapters.routes import LocalRoutesAdapter, RoadGraph
+from app.adapters.routes.local_graph import build_graph
+from app.geo import decode_polyline
+from app.schemas import RoutesComputeRequest
+
+NODES = [
+    {"id": "a", "lat": 31.584, "lng": 130.541, "name": "鹿児島中央駅"},
+    {"id": "b", "lat": 31.500, "lng": 130.520},
+    {"id": "c", "lat": 31.420, "lng": 130.480},
+    {"id": "d", "lat": 31.272, "lng": 130.297, "name": "枕崎駅"},
+    {"id": "e", "lat": 31.450, "lng": 130.600},
+]
+EDGES = [
+    # Expressway a-b-d: fast but tolled.
+    {"from": "a", "to": "b", "length_m": 10000, "speed_kmh": 80, "toll": True},
+    {"from": "b", "to": "d", "length_m": 30000, "speed_kmh": 80, "toll": True},
+    # Local roads a-c-d: slightly shorter, slower, free.
+    {"from": "a", "to": "c", "length_m": 19000, "speed_kmh": 40},
+    {"from": "c", "to": "d", "length_m": 20000, "speed_kmh": 40},
+    # One-way spur that cannot be used to return.
+    {"from": "e", "to": "a", "length_m": 9000, "speed_kmh": 40, "oneway": True},
+]
+
+
+@pytest.fixture
+def graph(tmp_path):
+    path = tmp_path / "test.graph"
+    path.write_bytes(build_graph(NODES, EDGES))
+    graph = RoadGraph.open(path)
+    yield graph
+    graph.close()
+
+
+def test_fastest_and_toll_free_paths(graph):
+    fastest = graph.shortest_path(0, 3, metric="time")
+    assert fastest.nodes == [0, 1, 3]
+    assert fastest.toll is True
+
+    toll_free = graph.shortest_path(0, 3, metric="time", avoid_tolls=True)
+    assert toll_free.nodes == [0, 2, 3]
+    assert toll_free.toll is False
+
+    shortest = graph.shortest_path(0, 3, metric="distance")
+    assert shortest.nodes == [0, 2, 3]
+    assert shortest.distance_m == pytest.approx(39000)
+
+
+def test_oneway_edges_are_respected(graph):
+    assert graph.shortest_path(4, 3) is not None
+    assert graph.shortest_path(3, 4) is None
+
+
+def test_matches_dijkstra_on_random_grid(tmp_path):
+    rng = random.Random(7)
+    size = 12
+    nodes = [
+        {"id": f"{row}:{col}", "lat": 31.0 + row * 0.01, "lng": 130.0 + col * 0.01}
+        for row in range(size)
+        for col in range(size)
+    ]
+    edges = []
+    for row in range(size):
+        for col in range(size):
+            for d_row, d_col in ((0, 1), (1, 0)):
+                if row + d_row < size and col + d_col < size:
+                    edges.append(
+                        {
+                            "from": f"{row}:{col}",
+                            "to": f"{row + d_row}:{col + d_col}",
+                            "length_m": 1100 + rng.random() * 1500,
+                            "speed_kmh": rng.choice([30, 50, 80]),
+                        }
+                    )
+    path = tmp_path / "grid.graph"
+    path.write_bytes(build_graph(nodes, edges))
+    graph = RoadGraph.open(path)
+
+    adjacency: dict[int, list[tuple[int, float]]] = {}
+    index = {node["id"]: position for position, node in enumerate(nodes)}
+    for edge in edges:
+        duration = edge["length_m"] / (edge["speed_kmh"] / 3.6)
+        source, target = index[edge["from"]], index[edge["to"]]
+        adjacency.setdefault(source, []).append((target, duration))
+        adjacency.setdefault(target, []).append((source, duration))
+
+    def dijkstra(source: int, target: int) -> float:
+        import heapq
+
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if node == target:
+                return cost
+            if cost > best[node]:
+                continue
+            for nxt, weight in adjacency.get(node, []):
+                if cost + weight < best.get(nxt, float("inf")):
+                    best[nxt] = cost + weight
+                    heapq.heappush(heap, (cost + weight, nxt))
+        return float("inf")
+
+    for _ in range(20):
+        source, target = rng.randrange(len(nodes)), rng.randrange(len(nodes))
+        result = graph.shortest_path(source, target)
+        assert result.duration_s == pytest.approx(dijkstra(source, target), rel=1e-4)
+    graph.close()
+
+
+@pytest.mark.asyncio
+async def test_local_adapter_returns_toll_free_alternative(graph):
+    adapter = LocalRoutesAdapter(graph)
+    response = await adapter.compute_route(
+        RoutesComputeRequest(origin="鹿児島中央駅", destination="31.272,130.297")
+    )
+    assert [alt.toll for alt in response.alternatives] == [True, False]
+    points = decode_polyline(response.polyline)
+    assert points[0] == pytest.approx((31.584, 130.541))
+    assert points[-1] == pytest.approx((31.272, 130.297))
+
+    with pytest.raises(LookupError):
+        await adapter.compute_route(RoutesComputeRequest(origin="東京駅", destination="枕崎駅"))
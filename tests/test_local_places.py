@@ -0,0 +1,72 @@
+import pytest
+
+from app.adapters.places import LocalPlacesAdapter, PlacesAdapter, PoiIndex
+from app.adapters.places.local_index import build_index
+from app.geo import encode_polyline
+from app.schemas import PlaceItem, PlacesAlongRouteRequest, PlacesAlongRouteResponse
+
+# A straight north-south road along lng 130.50 from lat 31.60 to 31.20.
+ROAD = encode_polyline([(31.60, 130.50), (31.40, 130.50), (31.20, 130.50)])
+
+POIS = [
+    {"id": "near", "name": "近い展望所", "lat": 31.50, "lng": 130.505, "rating": 4.0, "categories": ["tourist_attraction"]},
+    {"id": "cafe", "name": "海辺のカフェ", "lat": 31.30, "lng": 130.495, "rating": 4.6, "categories": ["cafe"]},
+    {"id": "far", "name": "遠い神社", "lat": 31.45, "lng": 130.60, "rating": 4.9, "categories": ["tourist_attraction"]},
+    {"id": "beyond", "name": "終点の先", "lat": 31.10, "lng": 130.50, "categories": ["tourist_attraction"]},
+]
+
+
+class RecordingUpstream(PlacesAdapter):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def search_along_route(self, payload):
+        self.calls += 1
+        return PlacesAlongRouteResponse(items=[PlaceItem(id="g", name="upstream", lat=0, lng=0)])
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "pois.idx"
+    path.write_bytes(build_index(POIS))
+    index = PoiIndex.open(path)
+    yield index
+    index.close()
+
+
+def test_corridor_filters_by_distance_and_category(index):
+    adapter = LocalPlacesAdapter(index)
+    response = adapter.search(
+        PlacesAlongRouteRequest(polyline=ROAD, categories=[], corridor_width_m=1000)
+    )
+    # Both sit ~480 m from the road, so the better-rated cafe ranks first.
+    assert [item.id for item in response.items] == ["cafe", "near"]
+
+    cafes = adapter.search(
+        PlacesAlongRouteRequest(polyline=ROAD, categories=["cafe"], corridor_width_m=1000)
+    )
+    assert [item.id for item in cafes.items] == ["cafe"]
+    assert cafes.items[0].rating == pytest.approx(4.6)
+
+    wide = adapter.search(
+        PlacesAlongRouteRequest(polyline=ROAD, categories=["tourist_attraction"], corridor_width_m=20000)
+    )
+    assert {item.id for item in wide.items} == {"near", "far", "beyond"}
+
+
+@pytest.mark.asyncio
+async def test_prefilter_only_calls_upstream_when_short(index):
+    upstream = RecordingUpstream()
+    adapter = LocalPlacesAdapter(index, upstream=upstream, min_results=1)
+
+    local = await adapter.search_along_route(
+        PlacesAlongRouteRequest(polyline=ROAD, categories=["cafe"], corridor_width_m=1000)
+    )
+    assert local.items[0].id == "cafe"
+    assert upstream.calls == 0
+
+    fallback = await adapter.search_along_route(
+        PlacesAlongRouteRequest(polyline=ROAD, categories=["restaurant"], corridor_width_m=1000)
+    )
+    assert fallback.items[0].id == "g"
+    assert upstream.calls == 1
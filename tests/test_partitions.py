@@ -0,0 +1,144 @@
+import csv
+import gzip
+import os
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import asyncpg
+import pytest
+
+from app.db import Database
+from app.repositories.partitions import (
+    Partition,
+    PlanPartitionMaintainer,
+    add_months,
+    created_at_for,
+    ensure_partitions,
+    month_start,
+    partition_name,
+    uuid7,
+)
+from app.repositories.plan_patch import compile_patch, decode_patch
+from app.repositories.plans import CREATE_TABLE_SQL, PlanRepository, init_plan_schema
+from app.schemas import PlanCreateRequest
+
+# Integration tests drop and recreate ``plans``: point this at a disposable database.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+requires_postgres = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+RESET_SQL = """
+DO $$
+DECLARE name text;
+BEGIN
+    DROP TABLE IF EXISTS plans CASCADE;
+    FOR name IN SELECT tablename FROM pg_tables
+                WHERE schemaname = current_schema() AND tablename LIKE 'plans\\_%'
+    LOOP
+        EXECUTE format('DROP TABLE IF EXISTS %I CASCADE', name);
+    END LOOP;
+END $$;
+"""
+
+
+class RecordingConnection:
+    def __init__(self, partitions: list[str]) -> None:
+        self.partitions = partitions
+        self.statements: list[str] = []
+
+    async def fetch(self, sql: str, *args):
+        return [{"relname": name, "inhdetachpending": False} for name in self.partitions]
+
+    async def execute(self, sql: str, *args):
+        self.statements.append(sql)
+
+
+def test_uuid7_is_ordered_and_carries_its_creation_time():
+    ms = int(datetime(2024, 5, 31, 23, 59, 59, 999000, tzinfo=timezone.utc).timestamp() * 1000)
+    ids = [uuid7(ms) for _ in range(100)]
+    assert ids == sorted(ids)
+    assert {plan_id.version for plan_id in ids} == {7}
+    assert created_at_for(ids[0]) == datetime(2024, 5, 31, 23, 59, 59, 999000, tzinfo=timezone.utc)
+    assert created_at_for(uuid4()) is None
+
+
+def test_partition_names_encode_their_upper_bound():
+    may = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    assert partition_name(may) == "plans_y2024m05"
+    assert add_months(may, 8) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert add_months(may, -5) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+    assert Partition.from_name("plans_y2024m12").upper == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    legacy = Partition.from_name(partition_name(may, before=True))
+    assert legacy is not None and legacy.upper == may
+    assert Partition.from_name("plans_archive") is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_only_missing_months():
+    conn = RecordingConnection(["plans_before_y2024m06", "plans_y2024m06"])
+    created = await ensure_partitions(
+        conn, now=datetime(2024, 5, 20, tzinfo=timezone.utc), months_ahead=3
+    )
+    assert created == ["plans_y2024m07", "plans_y2024m08"]
+    assert "FOR VALUES FROM ('2024-08-01T00:00:00+00:00') TO ('2024-09-01T00:00:00+00:00')" in (
+        conn.statements[-1]
+    )
+
+
+def test_patch_is_confined_to_the_plans_partition():
+    plan_id = uuid7()
+    operations = decode_patch(b'{"destination": "\\u6307\\u5bbf\\u99c5"}', "application/merge-patch+json")
+    sql, params = compile_patch(operations, plan_id, None, created_at_for(plan_id))
+    assert params[:3] == [plan_id, None, created_at_for(plan_id)]
+    assert sql.count("COALESCE($3::timestamptz") == 4
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_existing_plans_table_is_converted_then_archived(tmp_path):
+    legacy_id = uuid4()
+    conn = await asyncpg.connect(TEST_DATABASE_URL)
+    try:
+        await conn.execute(RESET_SQL)
+        await conn.execute(CREATE_TABLE_SQL)
+        await conn.execute(
+            "INSERT INTO plans (id, origin, destination, plan, created_at) "
+            "VALUES ($1, '鹿児島中央駅', '枕崎駅', $2::jsonb, NOW() - interval '1 year')",
+            legacy_id,
+            '{"origin": "鹿児島中央駅", "destination": "枕崎駅", "days": []}',
+        )
+
+        await init_plan_schema(conn)
+        # Running it again on the partitioned table is a no-op.
+        await init_plan_schema(conn)
+        assert await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = 'plans'::regclass") == "p"
+        legacy = partition_name(add_months(month_start(datetime.now(timezone.utc)), 1), before=True)
+        assert await conn.fetchval(
+            "SELECT count(*) FROM pg_inherits WHERE inhrelid = $1::regclass", legacy
+        ) == 1
+    finally:
+        await conn.close()
+
+    db = Database(TEST_DATABASE_URL)
+    try:
+        repository = PlanRepository(db)
+        created = await repository.create_plan(
+            PlanCreateRequest(origin="鹿児島中央駅", destination="指宿駅")
+        )
+        assert created.id.version == 7
+        assert (await repository.get_plan(created.id)).destination == "指宿駅"
+        assert (await repository.get_plan(legacy_id)).destination == "枕崎駅"
+        operations = decode_patch(b'{"destination": "\\u679a\\u5d0e"}', "application/merge-patch+json")
+        assert (await repository.patch_plan(created.id, operations)).version == 2
+
+        maintainer = PlanPartitionMaintainer(db, archive_dir=tmp_path, retention_months=1)
+        result = await maintainer.run_once(now=datetime.now(timezone.utc) + timedelta(days=124))
+        assert legacy in result["archived"]
+        with gzip.open(tmp_path / f"{legacy}.csv.gz", "rt") as archive:
+            rows = list(csv.DictReader(archive))
+        assert [row["id"] for row in rows] == [str(legacy_id)]
+        assert await repository.get_plan(legacy_id) is None
+        assert not list(tmp_path.glob("*.partial"))
+    finally:
+        await db.close()
@@ -0,0 +1,119 @@
+import pytest
+
+from app.repositories.plan_patch import (
+    PatchConflict,
+    PatchError,
+    apply_operations,
+    compile_patch,
+    decode_patch,
+)
+
+PLAN = {
+    "id": "5f0c3f52-8d43-4b71-9d7e-3e1f3d7f6a10",
+    "origin": "鹿児島中央駅",
+    "destination": "枕崎駅",
+    "route_label": None,
+    "days": [
+        {
+            "date": "2024-05-01",
+            "summary": None,
+            "segments": [
+                {"start_time": "09:00", "end_time": "10:00", "title": "出発"},
+                {"start_time": "11:00", "end_time": "12:00", "title": "灯台"},
+            ],
+        }
+    ],
+}
+
+
+def test_json_patch_applies_in_order():
+    body = """[
+        {"op": "test", "path": "/days/0/segments/1/title", "value": "灯台"},
+        {"op": "replace", "path": "/days/0/segments/1/title", "value": "長崎鼻灯台"},
+        {"op": "add", "path": "/days/0/segments/-",
+         "value": {"start_time": "13:00", "end_time": "14:00", "title": "昼食"}},
+        {"op": "remove", "path": "/days/0/segments/0"}
+    ]"""
+    operations = decode_patch(body.encode(), "application/json-patch+json")
+    patched = apply_operations(PLAN, operations)
+
+    titles = [segment["title"] for segment in patched["days"][0]["segments"]]
+    assert titles == ["長崎鼻灯台", "昼食"]
+    assert PLAN["days"][0]["segments"][0]["title"] == "出発"
+
+
+def test_merge_patch_sets_and_removes_members():
+    operations = decode_patch(
+        '{"route_label": "海沿い", "days": null}'.encode(), "application/merge-patch+json"
+    )
+    assert [operation.op for operation in operations] == ["set", "discard"]
+    with pytest.raises(PatchError):
+        # days has a default, but origin is required
+        decode_patch(b'{"origin": null}', "application/merge-patch+json")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'[{"op": "replace", "path": "/id", "value": "x"}]',
+        b'[{"op": "replace", "path": "/days/0/segments/0/travel_mode", "value": "fly"}]',
+        b'[{"op": "add", "path": "/days/0/colour", "value": "red"}]',
+        b'[{"op": "remove", "path": "/days/0/date"}]',
+    ],
+)
+def test_invalid_operations_are_rejected_before_touching_the_plan(body):
+    with pytest.raises(PatchError):
+        decode_patch(body, "application/json-patch+json")
+
+
+def test_failed_preconditions_conflict():
+    operations = decode_patch(
+        b'[{"op": "replace", "path": "/days/3/summary", "value": "x"}]',
+        "application/json-patch+json",
+    )
+    with pytest.raises(PatchConflict):
+        apply_operations(PLAN, operations)
+
+
+def test_compiled_statement_updates_only_touched_columns():
+    operations = decode_patch(
+        '{"destination": "指宿駅", "days": []}'.encode(), "application/merge-patch+json"
+    )
+    sql, params = compile_patch(operations, PLAN["id"], 3)
+
+    assert sql.count("UPDATE plans") == 1
+    assert "destination = patched.doc ->> 'destination'" in sql
+    assert "origin = " not in sql
+    assert params[:2] == [PLAN["id"], 3]
+    assert '"指宿駅"' in params
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'[{"op": "copy", "from": "/route_label", "path": "/origin"}]',
+        b'[{"op": "move", "from": "/days/0/summary", "path": "/days/0/segments/0/title"}]',
+    ],
+)
+def test_null_source_cannot_fill_a_required_field(body):
+    operations = decode_patch(body, "application/json-patch+json")
+    with pytest.raises(PatchConflict):
+        apply_operations(PLAN, operations)
+    sql, _ = compile_patch(operations, PLAN["id"], None)
+    assert "jsonb_typeof(doc #> $4::text[]) <> 'null'" in sql
+
+    # The same operation is fine once the source holds a value.
+    filled = {**PLAN, "route_label": "海沿い", "days": [{**PLAN["days"][0], "summary": "岬めぐり"}]}
+    assert apply_operations(filled, operations)
+
+
+@pytest.mark.asyncio
+async def test_patch_endpoint_rejects_a_null_copy_without_breaking_the_plan(client):
+    created = (await client.post("/plans", json={"origin": "鹿児島中央駅", "destination": "枕崎駅"})).json()
+    response = await client.patch(
+        f"/plans/{created['id']}",
+        content=b'[{"op": "copy", "from": "/route_label", "path": "/origin"}]',
+        headers={"Content-Type": "application/json-patch+json"},
+    )
+    assert response.status_code == 409
+    assert (await client.get(f"/plans/{created['id']}")).json()["origin"] == "鹿児島中央駅"
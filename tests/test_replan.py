@@ -0,0 +1,149 @@
+import pytest
+
+from app.adapters.llm import LLMAdapter
+from app.repositories.plans import InMemoryPlanRepository
+from app.replan import Replanner, edit_plan
+from app.schemas import (
+    AIPlanFragmentRequest,
+    AIPlanFragmentResponse,
+    PlaceItem,
+    PlanChange,
+    PlanCreateRequest,
+    PlanDay,
+    PlanReplanRequest,
+    PlanSegment,
+    RoutesComputeRequest,
+    RoutesComputeResponse,
+)
+
+NEW_POI = PlaceItem(id="n1", name="番所鼻自然公園", lat=31.25, lng=130.55)
+
+
+def _day(date: str, count: int) -> PlanDay:
+    return PlanDay(
+        date=date,
+        summary=f"{date} のドライブ",
+        segments=[
+            PlanSegment(
+                start_time=f"{9 + i:02d}:00",
+                end_time=f"{9 + i:02d}:30",
+                title=f"{date} stop {i}",
+                poi=PlaceItem(id=f"{date}-{i}", name=f"stop {i}", lat=31.0 + i / 10, lng=130.5),
+                travel_mode="stop" if i % 2 else "drive",
+            )
+            for i in range(count)
+        ],
+    )
+
+
+class RecordingLLM(LLMAdapter):
+    def __init__(self) -> None:
+        self.requests: list[AIPlanFragmentRequest] = []
+
+    async def generate_plan(self, payload):  # pragma: no cover - not used here
+        raise NotImplementedError
+
+    async def generate_fragment(self, payload: AIPlanFragmentRequest) -> AIPlanFragmentResponse:
+        self.requests.append(payload)
+        # Each revised window runs 45 minutes past the last original end.
+        segments = [segment.model_copy(update={"description": "revised"}) for segment in payload.current]
+        last = segments[-1]
+        hours, minutes = map(int, last.end_time.split(":"))
+        segments[-1] = last.model_copy(update={"end_time": f"{hours + (minutes + 45) // 60:02d}:{(minutes + 45) % 60:02d}"})
+        return AIPlanFragmentResponse(segments=segments, summary="new summary")
+
+
+def test_changes_map_to_merged_minimal_windows():
+    days = [_day("2024-05-01", 5), _day("2024-05-02", 4), _day("2024-05-03", 3)]
+    plan = PlanCreateRequest(origin="鹿児島", destination="枕崎", days=days)
+    edited = edit_plan(
+        plan,
+        [
+            PlanChange(type="replace_poi", day=0, segment=2, poi=NEW_POI),
+            PlanChange(type="regenerate", day=0, segment=4),
+            PlanChange(type="set_date", day=1, date="2024-05-09"),
+        ],
+    )
+    windows = [(w.day, w.start, w.end, w.whole_day) for w in edited.windows]
+    # Segments 1-3 around the swap merge with the adjacent regenerate of 4.
+    assert windows == [(0, 1, 5, False), (1, 0, 4, True)]
+    assert edited.days[0].segments[2].poi == NEW_POI
+    assert edited.days[1].date == "2024-05-09"
+
+
+@pytest.mark.asyncio
+async def test_replan_regenerates_only_the_window_and_shifts_the_rest():
+    repository = InMemoryPlanRepository()
+    plan = await repository.create_plan(
+        PlanCreateRequest(
+            origin="鹿児島", destination="枕崎", days=[_day("2024-05-01", 6), _day("2024-05-02", 3)]
+        )
+    )
+    llm = RecordingLLM()
+    lookups: list[RoutesComputeRequest] = []
+
+    async def route_lookup(payload: RoutesComputeRequest) -> bytes:
+        lookups.append(payload)
+        return RoutesComputeResponse(polyline="", distance_m=1000, duration_s=600).model_dump_json().encode()
+
+    result = await Replanner(llm, route_lookup=route_lookup).replan(
+        repository,
+        plan.id,
+        PlanReplanRequest(changes=[PlanChange(type="replace_poi", day=0, segment=2, poi=NEW_POI)]),
+    )
+    assert result is not None
+    versioned, scopes = result
+
+    (request,) = llm.requests
+    assert [s.title for s in request.current] == [
+        "2024-05-01 stop 1",
+        "2024-05-01 番所鼻自然公園",
+        "2024-05-01 stop 3",
+    ]
+    assert [s.title for s in request.before] == ["2024-05-01 stop 0"]
+    assert [s.title for s in request.after] == ["2024-05-01 stop 4", "2024-05-01 stop 5"]
+    assert {leg.to_name for leg in request.travel} >= {"番所鼻自然公園"}
+    assert lookups
+
+    day = versioned.plan.days[0]
+    assert [scope.model_dump() for scope in scopes] == [{"day": 0, "start": 1, "end": 4}]
+    assert day.segments[0].description is None
+    assert day.segments[3].end_time == "13:15"
+    # Later segments keep their gap: both move by the 45 minutes the window grew.
+    assert (day.segments[4].start_time, day.segments[5].start_time) == ("13:45", "14:45")
+    assert versioned.plan.days[1] == plan.days[1]
+    assert versioned.version == 2
+
+
+@pytest.mark.asyncio
+async def test_replan_endpoint_applies_the_swap_when_no_llm_answers(client):
+    created = await client.post(
+        "/plans",
+        json={
+            "origin": "鹿児島中央駅",
+            "destination": "枕崎駅",
+            "days": [_day("2024-05-01", 3).model_dump(mode="json")],
+        },
+    )
+    plan_id = created.json()["id"]
+    etag = (await client.get(f"/plans/{plan_id}")).headers["etag"]
+
+    body = {
+        "changes": [
+            {"type": "replace_poi", "day": 0, "segment": 1, "poi": NEW_POI.model_dump(mode="json")}
+        ]
+    }
+    response = await client.post(f"/plans/{plan_id}/replan", json=body, headers={"If-Match": etag})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["plan"]["days"][0]["segments"][1]["poi"]["id"] == "n1"
+    assert payload["regenerated"] == [{"day": 0, "start": 0, "end": 3}]
+
+    stale = await client.post(f"/plans/{plan_id}/replan", json=body, headers={"If-Match": etag})
+    assert stale.status_code == 412
+
+    missing = await client.post(
+        f"/plans/{plan_id}/replan",
+        json={"changes": [{"type": "remove_segment", "day": 3, "segment": 0}]},
+    )
+    assert missing.status_code == 422